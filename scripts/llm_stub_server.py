@@ -0,0 +1,675 @@
+#!/usr/bin/env python3
+"""
+Servidor LLM falso (stub) para testes de carga e latencia offline, sem custo de provedor.
+
+Fala o suficiente das APIs HTTP do OpenAI (/v1/chat/completions), Gemini
+(/v1beta/models/{model}:generateContent, :streamGenerateContent e /v1beta/cachedContents)
+e Ollama (/api/chat) para que as conexoes do threat-analyzer conversem com ele, com ou
+sem streaming e com ou sem structured output. Responde JSON de guardrail, diagrama,
+STRIDE e DREAD (templates gerados a partir do prompt ou fixtures em --fixtures) e
+injeta latencia, erros e truncamento configuraveis, com --seed para reprodutibilidade.
+
+Uso (na raiz do projeto):
+  python scripts/llm_stub_server.py --port 8090 --latency-ms 800 --latency-dist lognormal
+
+  # threat-analyzer apontando para o stub (.env ou variaveis de ambiente):
+  OPENAI_API_KEY=stub OPENAI_BASE_URL=http://localhost:8090/v1
+  GOOGLE_API_KEY=stub GEMINI_BASE_URL=http://localhost:8090
+  OLLAMA_BASE_URL=http://localhost:8090
+
+  # Erros e truncamento:
+  python scripts/llm_stub_server.py --error-rate 0.1 --error-status 503,429 --truncate-rate 0.05
+
+Fixtures: arquivos guardrail.json, diagram.json, stride.json e dread.json em --fixtures
+substituem o template do estagio correspondente.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8090
+
+STRIDE_CATEGORIES = [
+    "Spoofing",
+    "Tampering",
+    "Repudiation",
+    "Information Disclosure",
+    "Denial of Service",
+    "Elevation of Privilege",
+]
+
+CANNED_DIAGRAM = {
+    "model": "llm-stub",
+    "components": [
+        {"id": "user", "type": "User", "name": "End user"},
+        {"id": "gw", "type": "Gateway", "name": "API Gateway"},
+        {"id": "api", "type": "API", "name": "Orders API"},
+        {"id": "db", "type": "Database", "name": "PostgreSQL"},
+        {"id": "queue", "type": "Queue", "name": "Event queue"},
+    ],
+    "connections": [
+        {"from": "user", "to": "gw", "protocol": "HTTPS", "encrypted": True},
+        {"from": "gw", "to": "api", "protocol": "HTTP", "encrypted": False},
+        {"from": "api", "to": "db", "protocol": "TCP", "encrypted": True},
+        {"from": "api", "to": "queue", "protocol": "AMQP", "encrypted": False},
+    ],
+    "boundaries": [
+        {"name": "Internet", "components": ["user"]},
+        {"name": "VPC", "components": ["gw", "api", "db", "queue"]},
+    ],
+}
+
+# "- [id] Type: Name", optionally followed by " (zone: ...)" graph annotations
+_COMPONENT_LINE_RE = re.compile(
+    r"^- \[([^\]]+)\] ([^:]+): (.+?)(?: \(zone: [^)]*\))?$", re.MULTILINE
+)
+_STAGE_BY_SCHEMA = {
+    "architecture_diagram_check": "guardrail",
+    "diagram_data": "diagram",
+    "stride_threats": "stride",
+    "dread_scored_threats": "dread",
+}
+
+
+class StubConfig:
+    """Latency, error and truncation behavior shared by all request handlers."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.latency_ms = args.latency_ms
+        self.latency_dist = args.latency_dist
+        self.latency_jitter = args.latency_jitter
+        self.ttft_ratio = args.ttft_ratio
+        self.chunks = max(args.chunks, 1)
+        self.error_rate = args.error_rate
+        self.error_statuses = [int(s) for s in args.error_status.split(",") if s]
+        self.retry_after = args.retry_after
+        self.truncate_rate = args.truncate_rate
+        self.threats_per_component = args.threats_per_component
+        self.fixtures = _load_fixtures(args.fixtures)
+        self._rng = random.Random(args.seed)
+        self._lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        """Total response time in seconds drawn from the configured distribution."""
+        mean = self.latency_ms / 1000
+        with self._lock:
+            if self.latency_dist == "uniform":
+                spread = mean * self.latency_jitter
+                return max(self._rng.uniform(mean - spread, mean + spread), 0.0)
+            if self.latency_dist == "lognormal":
+                return mean * self._rng.lognormvariate(0.0, self.latency_jitter)
+            if self.latency_dist == "exponential":
+                return self._rng.expovariate(1 / mean) if mean else 0.0
+            return mean
+
+    def sample_error(self) -> int | None:
+        """HTTP status to fail this request with, or None."""
+        with self._lock:
+            if self.error_statuses and self._rng.random() < self.error_rate:
+                return self._rng.choice(self.error_statuses)
+        return None
+
+    def sample_truncation(self, text: str) -> str | None:
+        """Cut text somewhere in its second half (simulates max_tokens), or None."""
+        with self._lock:
+            if len(text) < 2 or self._rng.random() >= self.truncate_rate:
+                return None
+            return text[: self._rng.randint(len(text) // 2, len(text) - 1)]
+
+
+def _load_fixtures(path: str | None) -> dict[str, Any]:
+    if not path:
+        return {}
+    fixtures = {}
+    for stage in ("guardrail", "diagram", "stride", "dread"):
+        file = Path(path) / f"{stage}.json"
+        if file.exists():
+            fixtures[stage] = json.loads(file.read_text(encoding="utf-8"))
+    return fixtures
+
+
+def _score(seed: str, dimension: str) -> int:
+    """Deterministic 1-10 score per threat and DREAD dimension."""
+    digest = hashlib.sha256(f"{seed}:{dimension}".encode()).digest()
+    return 1 + digest[0] % 10
+
+
+def _stride_threats(prompt: str, per_component: int) -> list[dict[str, Any]]:
+    # Components only: in delta mode the prompt also lists rule baseline threats
+    diagram_part = prompt.split("\nBaseline threats", 1)[0]
+    components = _COMPONENT_LINE_RE.findall(diagram_part) or [
+        (c["id"], c["type"], c["name"]) for c in CANNED_DIAGRAM["components"]
+    ]
+    threats = []
+    for index, (component_id, component_type, name) in enumerate(components):
+        for offset in range(per_component):
+            category = STRIDE_CATEGORIES[(index + offset) % len(STRIDE_CATEGORIES)]
+            threats.append(
+                {
+                    "component_id": component_id,
+                    "threat_type": category,
+                    "description": f"{category} against {component_type} {name}",
+                    "mitigation": f"Apply {category.lower()} controls to {name}",
+                }
+            )
+    return threats
+
+
+def _dread_threats(prompt: str) -> list[dict[str, Any]]:
+    start = prompt.find("[")
+    try:
+        threats = json.loads(prompt[start:]) if start >= 0 else []
+    except json.JSONDecodeError:
+        threats = []
+    dimensions = (
+        "damage",
+        "reproducibility",
+        "exploitability",
+        "affected_users",
+        "discoverability",
+    )
+    scored = []
+    for threat in threats if isinstance(threats, list) else []:
+        seed = f"{threat.get('component_id')}:{threat.get('description')}"
+        details = {d: _score(seed, d) for d in dimensions}
+        scored.append(
+            {
+                **threat,
+                "dread_score": round(sum(details.values()) / len(details), 2),
+                "dread_details": details,
+            }
+        )
+    return scored
+
+
+def detect_stage(text: str, schema_name: str | None, has_image: bool) -> str:
+    """Pipeline stage of a request, from the structured-output schema or the prompt."""
+    if schema_name in _STAGE_BY_SCHEMA:
+        return _STAGE_BY_SCHEMA[schema_name]
+    if "STRIDE threat modeling" in text:
+        return "stride"
+    if "DREAD risk scoring" in text:
+        return "dread"
+    if "determine if it is an architecture diagram" in text:
+        return "guardrail"
+    return "diagram" if has_image else "stride"
+
+
+def build_answer(
+    config: StubConfig, text: str, schema: dict[str, Any] | None, has_image: bool
+) -> str:
+    """JSON answer text for a request (wrapped under "threats" for structured lists)."""
+    schema_name = (schema or {}).get("name")
+    stage = detect_stage(text, schema_name, has_image)
+    if stage in config.fixtures:
+        value = config.fixtures[stage]
+    elif stage == "guardrail":
+        value = {"is_architecture_diagram": True, "reason": "Stub: diagram accepted"}
+    elif stage == "diagram":
+        value = CANNED_DIAGRAM
+    elif stage == "stride":
+        value = _stride_threats(text, config.threats_per_component)
+    else:
+        value = _dread_threats(text)
+    properties = ((schema or {}).get("schema") or {}).get("properties") or {}
+    if isinstance(value, list) and "threats" in properties:
+        value = {"threats": value}
+    return json.dumps(value)
+
+
+def _tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Routes OpenAI, Gemini and Ollama endpoints to the shared stub behavior."""
+
+    config: StubConfig
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:  # type: ignore[attr-defined]
+            super().log_message(format, *args)
+
+    def do_GET(self) -> None:
+        if self.path.startswith("/api/tags"):
+            self._send_json(200, {"models": [{"name": "llm-stub"}]})
+        else:
+            self._send_json(200, {"status": "ok"})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "invalid JSON body"}})
+            return
+        path = self.path.split("?", 1)[0]
+        if path.endswith("/chat/completions"):
+            self._handle(body, *_parse_openai(body), self._openai)
+        elif path.endswith("/cachedContents"):
+            self._send_json(200, _gemini_cached_content(body))
+        elif ":generateContent" in path or ":streamGenerateContent" in path:
+            body["stream"] = ":streamGenerateContent" in path
+            body["model"] = path.rsplit("/", 1)[-1].split(":", 1)[0]
+            self._handle(body, *_parse_gemini(body), self._gemini)
+        elif path.endswith("/api/chat"):
+            body.setdefault("stream", True)
+            self._handle(body, *_parse_ollama(body), self._ollama)
+        else:
+            self._send_json(404, {"error": {"message": f"unknown path {path}"}})
+
+    def _handle(
+        self,
+        body: dict[str, Any],
+        text: str,
+        schema: dict[str, Any] | None,
+        has_image: bool,
+        respond: Any,
+    ) -> None:
+        config = self.config
+        latency = config.sample_latency()
+        status = config.sample_error()
+        if status is not None:
+            time.sleep(latency * config.ttft_ratio)
+            self._send_error_status(status)
+            return
+        answer = build_answer(config, text, schema, has_image)
+        truncated = config.sample_truncation(answer)
+        usage = (_tokens(text), _tokens(truncated or answer))
+        respond(body, truncated or answer, truncated is not None, usage, latency)
+
+    # --- OpenAI -------------------------------------------------------------
+
+    def _openai(
+        self,
+        body: dict[str, Any],
+        answer: str,
+        truncated: bool,
+        usage: tuple[int, int],
+        latency: float,
+    ) -> None:
+        base = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "created": int(time.time()),
+            "model": body.get("model", "llm-stub"),
+        }
+        usage_body = {
+            "prompt_tokens": usage[0],
+            "completion_tokens": usage[1],
+            "total_tokens": sum(usage),
+        }
+        finish = "length" if truncated else "stop"
+        if not body.get("stream"):
+            time.sleep(latency)
+            message = {"role": "assistant", "content": answer}
+            self._send_json(
+                200,
+                {
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [
+                        {"index": 0, "message": message, "finish_reason": finish}
+                    ],
+                    "usage": usage_body,
+                },
+            )
+            return
+        events = [
+            {
+                **base,
+                "object": "chat.completion.chunk",
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"role": "assistant", "content": piece},
+                        "finish_reason": None,
+                    }
+                ],
+            }
+            for piece in _split(answer, self.config.chunks)
+        ]
+        events[-1]["choices"][0]["finish_reason"] = finish
+        if (body.get("stream_options") or {}).get("include_usage"):
+            events.append(
+                {
+                    **base,
+                    "object": "chat.completion.chunk",
+                    "choices": [],
+                    "usage": usage_body,
+                }
+            )
+        self._stream(
+            [f"data: {json.dumps(e)}\n\n" for e in events] + ["data: [DONE]\n\n"],
+            latency,
+            "text/event-stream",
+        )
+
+    # --- Gemini -------------------------------------------------------------
+
+    def _gemini(
+        self,
+        body: dict[str, Any],
+        answer: str,
+        truncated: bool,
+        usage: tuple[int, int],
+        latency: float,
+    ) -> None:
+        cached = usage[0] if body.get("cachedContent") else 0
+        usage_body = {
+            "promptTokenCount": usage[0] + cached,
+            "candidatesTokenCount": usage[1],
+            "totalTokenCount": sum(usage) + cached,
+        }
+        if cached:
+            usage_body["cachedContentTokenCount"] = cached
+
+        def candidate(text: str, finish: str | None) -> dict[str, Any]:
+            item: dict[str, Any] = {
+                "content": {"role": "model", "parts": [{"text": text}]},
+                "index": 0,
+            }
+            if finish:
+                item["finishReason"] = finish
+            return item
+
+        finish = "MAX_TOKENS" if truncated else "STOP"
+        if not body["stream"]:
+            time.sleep(latency)
+            self._send_json(
+                200,
+                {
+                    "candidates": [candidate(answer, finish)],
+                    "usageMetadata": usage_body,
+                    "modelVersion": body["model"],
+                },
+            )
+            return
+        pieces = _split(answer, self.config.chunks)
+        events = [
+            {"candidates": [candidate(piece, None)], "modelVersion": body["model"]}
+            for piece in pieces
+        ]
+        events[-1]["candidates"][0]["finishReason"] = finish
+        events[-1]["usageMetadata"] = usage_body
+        self._stream(
+            [f"data: {json.dumps(e)}\r\n\r\n" for e in events],
+            latency,
+            "text/event-stream",
+        )
+
+    # --- Ollama -------------------------------------------------------------
+
+    def _ollama(
+        self,
+        body: dict[str, Any],
+        answer: str,
+        truncated: bool,
+        usage: tuple[int, int],
+        latency: float,
+    ) -> None:
+        base = {
+            "model": body.get("model", "llm-stub"),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        done = {
+            **base,
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "done_reason": "length" if truncated else "stop",
+            "total_duration": int(latency * 1e9),
+            "prompt_eval_count": usage[0],
+            "eval_count": usage[1],
+        }
+        if not body.get("stream"):
+            time.sleep(latency)
+            done["message"]["content"] = answer
+            self._send_json(200, done)
+            return
+        events = [
+            {**base, "message": {"role": "assistant", "content": piece}, "done": False}
+            for piece in _split(answer, self.config.chunks)
+        ]
+        self._stream(
+            [json.dumps(e) + "\n" for e in [*events, done]],
+            latency,
+            "application/x-ndjson",
+        )
+
+    # --- Transport ----------------------------------------------------------
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 429 and self.config.retry_after is not None:
+            self.send_header("Retry-After", f"{self.config.retry_after:g}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error_status(self, status: int) -> None:
+        reason = {
+            429: "RESOURCE_EXHAUSTED",
+            500: "INTERNAL",
+            502: "UNAVAILABLE",
+            503: "UNAVAILABLE",
+            504: "DEADLINE_EXCEEDED",
+        }.get(status, "INTERNAL")
+        message = f"Stub injected error {status}"
+        self._send_json(
+            status,
+            {
+                "error": {
+                    "code": status,
+                    "message": message,
+                    "status": reason,
+                    "type": reason.lower(),
+                }
+            },
+        )
+
+    def _stream(self, events: list[str], latency: float, content_type: str) -> None:
+        """Send events as a chunked response: first after ttft, rest spread evenly."""
+        ttft = latency * self.config.ttft_ratio
+        gap = (latency - ttft) / max(len(events) - 1, 1)
+        time.sleep(ttft)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for index, event in enumerate(events):
+            if index:
+                time.sleep(gap)
+            data = event.encode()
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def _split(text: str, parts: int) -> list[str]:
+    size = max(-(-len(text) // parts), 1)
+    return [text[i : i + size] for i in range(0, len(text), size)] or [""]
+
+
+def _content_text(content: Any) -> tuple[str, bool]:
+    """Text of an OpenAI/LangChain content (str or parts list) and whether it has an image."""
+    if isinstance(content, str):
+        return content, False
+    texts, has_image = [], False
+    for part in content or []:
+        if part.get("type") == "text":
+            texts.append(part.get("text", ""))
+        elif part.get("type") in ("image_url", "image"):
+            has_image = True
+    return "\n".join(texts), has_image
+
+
+def _parse_openai(body: dict[str, Any]) -> tuple[str, dict[str, Any] | None, bool]:
+    texts, has_image = [], False
+    for message in body.get("messages", []):
+        text, image = _content_text(message.get("content"))
+        texts.append(text)
+        has_image = has_image or image
+    response_format = body.get("response_format") or {}
+    return "\n".join(texts), response_format.get("json_schema"), has_image
+
+
+def _parse_gemini(body: dict[str, Any]) -> tuple[str, dict[str, Any] | None, bool]:
+    texts, has_image = [], False
+    system = body.get("systemInstruction") or body.get("system_instruction") or {}
+    contents = [system, *body.get("contents", [])]
+    cached = _gemini_caches.get(body.get("cachedContent") or "")
+    if cached:
+        texts.append(cached)
+    for content in contents:
+        for part in content.get("parts", []):
+            if "text" in part:
+                texts.append(part["text"])
+            elif "inlineData" in part or "inline_data" in part:
+                has_image = True
+    config = body.get("generationConfig") or body.get("generation_config") or {}
+    schema = config.get("responseJsonSchema") or config.get("responseSchema")
+    named = {"name": _schema_name(schema), "schema": schema} if schema else None
+    return "\n".join(texts), named, has_image
+
+
+def _parse_ollama(body: dict[str, Any]) -> tuple[str, dict[str, Any] | None, bool]:
+    texts, has_image = [], False
+    for message in body.get("messages", []):
+        texts.append(message.get("content") or "")
+        has_image = has_image or bool(message.get("images"))
+    schema = body.get("format")
+    named = (
+        {"name": _schema_name(schema), "schema": schema}
+        if isinstance(schema, dict)
+        else None
+    )
+    return "\n".join(texts), named, has_image
+
+
+def _schema_name(schema: dict[str, Any]) -> str | None:
+    """Gemini/Ollama receive the bare schema: infer the stage name from its properties."""
+    properties = schema.get("properties") or {}
+    if "is_architecture_diagram" in properties:
+        return "architecture_diagram_check"
+    if "components" in properties:
+        return "diagram_data"
+    threats = (properties.get("threats") or {}).get("items", {}).get("properties", {})
+    if "dread_score" in threats:
+        return "dread_scored_threats"
+    return "stride_threats" if threats else None
+
+
+# cachedContents/{id} -> system instruction text
+_gemini_caches: dict[str, str] = {}
+
+
+def _gemini_cached_content(body: dict[str, Any]) -> dict[str, Any]:
+    name = f"cachedContents/stub-{uuid.uuid4().hex[:12]}"
+    system = body.get("systemInstruction") or body.get("system_instruction") or {}
+    _gemini_caches[name] = "\n".join(
+        part.get("text", "") for part in system.get("parts", [])
+    )
+    return {"name": name, "model": body.get("model"), "ttl": body.get("ttl")}
+
+
+def build_server(args: argparse.Namespace) -> ThreadingHTTPServer:
+    """HTTP server bound to args.host:args.port (port 0 = any free port)."""
+    handler = type(
+        "ConfiguredStubHandler", (StubHandler,), {"config": StubConfig(args)}
+    )
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    server.verbose = args.verbose  # type: ignore[attr-defined]
+    return server
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Stub OpenAI/Gemini/Ollama para testes de carga do threat-analyzer."
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--latency-ms", type=float, default=500.0, help="Latencia media por resposta"
+    )
+    parser.add_argument(
+        "--latency-dist",
+        choices=("fixed", "uniform", "lognormal", "exponential"),
+        default="fixed",
+    )
+    parser.add_argument(
+        "--latency-jitter",
+        type=float,
+        default=0.5,
+        help="uniform: +/- fracao da media; lognormal: sigma",
+    )
+    parser.add_argument(
+        "--ttft-ratio",
+        type=float,
+        default=0.3,
+        help="Fracao da latencia ate o primeiro chunk (streaming)",
+    )
+    parser.add_argument("--chunks", type=int, default=8, help="Chunks por resposta")
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Fracao de requisicoes com erro"
+    )
+    parser.add_argument(
+        "--error-status",
+        default="503",
+        help="Status HTTP sorteados para erros (ex.: 503,429,500)",
+    )
+    parser.add_argument(
+        "--retry-after",
+        type=float,
+        default=None,
+        help="Header Retry-After (segundos) nas respostas 429",
+    )
+    parser.add_argument(
+        "--truncate-rate",
+        type=float,
+        default=0.0,
+        help="Fracao de respostas cortadas (finish_reason=length)",
+    )
+    parser.add_argument("--threats-per-component", type=int, default=2)
+    parser.add_argument(
+        "--fixtures",
+        default=None,
+        help="Pasta com {guardrail,diagram,stride,dread}.json",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="Loga cada requisicao")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    server = build_server(args)
+    host, port = server.server_address[:2]
+    print(f"LLM stub ouvindo em http://{host}:{port}", file=sys.stderr)
+    print(f"  OPENAI_BASE_URL=http://{host}:{port}/v1", file=sys.stderr)
+    print(f"  GEMINI_BASE_URL=http://{host}:{port}", file=sys.stderr)
+    print(f"  OLLAMA_BASE_URL=http://{host}:{port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
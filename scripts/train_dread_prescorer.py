@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Treina o pre-scorer DREAD local (regressao ridge) a partir de analises ja concluidas.
+
+Entrada: arquivos JSON com o resultado do threat-analyzer (AnalysisResponse, com
+components, connections e threats com dread_details) ou registros do threat-service
+com esse resultado em "result". Saida: modelo no formato de
+threat-analyzer/app/threat_analysis/dread_prescorer.json, usado via DREAD_PRESCORER_PATH.
+
+Uso (na raiz do projeto):
+  python scripts/train_dread_prescorer.py --input resultados/ --output configs/dread_prescorer.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_PROJECT_ROOT / "threat-analyzer"))
+
+from app.threat_analysis.dread_prescorer import fit  # noqa: E402
+
+
+def load_samples(
+    paths: list[Path],
+) -> list[tuple[dict[str, Any], list[dict[str, Any]]]]:
+    """(diagram_data, threats) de cada resultado encontrado nos arquivos/pastas."""
+    files = [
+        f for p in paths for f in (sorted(p.glob("*.json")) if p.is_dir() else [p])
+    ]
+    samples = []
+    for file in files:
+        data = json.loads(file.read_text(encoding="utf-8"))
+        for record in data if isinstance(data, list) else [data]:
+            result = record.get("result") or record
+            if not isinstance(result, dict) or not result.get("threats"):
+                continue
+            diagram = {
+                "components": result.get("components", []),
+                "connections": [
+                    {
+                        **c,
+                        "from": c.get("from", c.get("from_id")),
+                        "to": c.get("to", c.get("to_id")),
+                    }
+                    for c in result.get("connections", [])
+                ],
+            }
+            samples.append((diagram, result["threats"]))
+    return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Treina o pre-scorer DREAD local")
+    parser.add_argument("--input", type=Path, action="append", required=True)
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--ridge", type=float, default=1.0)
+    parser.add_argument("--min-samples", type=int, default=10)
+    args = parser.parse_args()
+
+    samples = load_samples(args.input)
+    try:
+        model = fit(samples, ridge=args.ridge, min_samples=args.min_samples)
+    except ValueError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    args.output.write_text(json.dumps(model, indent=2) + "\n", encoding="utf-8")
+    print(f"{len(samples)} analises, {model['samples']} ameacas -> {args.output}")
+    for key, value in sorted(model["confidence"].items()):
+        print(f"  confianca {key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,7 @@
 
 from functools import lru_cache
 from pathlib import Path
+from typing import Literal
 
 from pydantic import Field, field_validator
 from threat_modeling_shared.config import BaseSettings
@@ -17,6 +18,9 @@ class Settings(BaseSettings):
     # LLM Provider Settings
     google_api_key: str | None = None
     openai_api_key: str | None = None
+    # Override provider endpoints (e.g. scripts/llm_stub_server.py for offline load tests)
+    openai_base_url: str | None = None
+    gemini_base_url: str | None = None
     ollama_base_url: str = "http://localhost:11434"
     ollama_model: str = "qwen2-vl"
 
@@ -24,13 +28,91 @@ class Settings(BaseSettings):
     primary_model: str = "gemini-1.5-pro"
     fallback_model: str = "gpt-4o"
     fast_model: str = "gemini-1.5-flash"
+    openai_fast_model: str = "gpt-4o-mini"
+    ollama_fast_model: str | None = None  # None = same as ollama_model
+    # "local:hashed-ngram[:dimensions]" = offline CPU embeddings (app/services/embeddings.py)
     embedding_model: str = "models/embedding-001"
     llm_temperature: float = 0.0
 
+    # Model tier per pipeline stage ("fast" = fast_model / openai_fast_model)
+    guardrail_model_tier: Literal["fast", "primary"] = "fast"
+    diagram_model_tier: Literal["fast", "primary"] = "primary"
+    stride_model_tier: Literal["fast", "primary"] = "primary"
+    dread_model_tier: Literal["fast", "primary"] = "fast"
+    # Retry on the primary model when fast-model output fails validation
+    llm_escalate_on_invalid: bool = True
+    # Provider-native JSON-schema output (falls back to text mode when rejected)
+    llm_structured_output: bool = True
+    # Truncated JSON arrays: follow-up requests for the missing remainder (0 = off)
+    llm_max_continuations: int = 1
+    # Stream responses (records time to first token); concurrent calls per provider (0 = unbounded)
+    llm_stream: bool = True
+    llm_max_concurrency: int = 0
+    # Same-provider retries for transient/rate-limit errors (client SDK retries are off)
+    llm_max_retries: int = 2
+    llm_retry_base_delay_seconds: float = 0.5
+    llm_retry_max_delay_seconds: float = 8.0
+    # Request deadline (X-Request-Timeout header overrides); share of the stage's
+    # remaining time given to each provider attempt except the last
+    analysis_timeout_seconds: float = 280.0
+    llm_attempt_budget_fraction: float = Field(default=0.6, gt=0, le=1)
+    # Gemini explicit context cache for long static system prompts (STRIDE/DREAD + RAG)
+    gemini_context_cache: bool = False
+    gemini_context_cache_ttl_seconds: int = 3600
+    gemini_context_cache_min_chars: int = 16000  # ~4k tokens, provider minimum
+    # Record/replay of provider responses (tests/benchmarks/test_replay_pipeline.py)
+    llm_cassette_mode: Literal["off", "record", "replay"] = "off"
+    llm_cassette_dir: Path | None = None
+    llm_cassette_latency_scale: float = Field(default=1.0, ge=0)  # 0 = no wait
+    # Near-duplicate STRIDE threats merged before DREAD (MinHash/LSH per component and type)
+    threat_consolidation: bool = True
+    threat_similarity_threshold: float = Field(default=0.7, gt=0, le=1)
+    threat_minhash_permutations: int = Field(default=32, ge=1)
+    threat_lsh_bands: int = Field(default=16, ge=1)
+    threat_shingle_size: int = Field(default=1, ge=1)
+    # Rule-based STRIDE baseline (stride_rules.json): "merge" adds it to the full LLM
+    # analysis, "delta" asks the LLM only for threats beyond it
+    stride_rule_mode: Literal["off", "merge", "delta"] = "delta"
+    stride_rules_path: Path | None = None  # None = bundled rules
+    # Diagram graph in the STRIDE prompt: "annotate" adds boundary / fan-in/out facts
+    # and orders connections by risk; "restrict" (diagrams with at least
+    # stride_focus_min_components) sends only high-risk edges and their components
+    stride_graph_focus: Literal["off", "annotate", "restrict"] = "annotate"
+    stride_focus_min_components: int = Field(default=30, ge=0)
+    # Local DREAD pre-scorer (dread_prescorer.json); less confident threats go to the LLM.
+    # Off by default: the bundled confidences are hand-set, not fitted; enable with a
+    # model trained on recorded results (scripts/train_dread_prescorer.py)
+    dread_prescore: bool = False
+    dread_prescore_min_confidence: float = Field(default=0.7, ge=0, le=1)
+    dread_prescorer_path: Path | None = None  # None = bundled model
+    # Top attack paths (User/ExternalService -> Database/Storage) in the response
+    attack_paths: bool = True
+    attack_path_count: int = Field(default=5, ge=1)
+    attack_path_max_hops: int = Field(default=8, ge=1)
+
     # RAG Settings
     knowledge_base_path: Path | None = None
     rag_chunk_size: int = 800
     rag_chunk_overlap: int = 80
+    # Incremental indexing: new chunks embedded rag_index_batch_size at a time,
+    # up to rag_index_concurrency batches in parallel
+    rag_index_batch_size: int = Field(default=64, ge=1)
+    rag_index_concurrency: int = Field(default=4, ge=1)
+    # "numpy" = memory-mapped vectors.npy + JSON sidecar instead of Chroma (no SQLite)
+    rag_vector_store: Literal["chroma", "numpy"] = "chroma"
+    # STRIDE retrieval: one query per component type/protocol (up to rag_max_queries),
+    # rag_top_k chunks each, packed into rag_context_max_tokens by marginal relevance
+    # (app/services/context_packing.py); chunks whose word 3-grams are already this
+    # covered by the packed context are dropped
+    rag_max_queries: int = Field(default=8, ge=1)
+    rag_top_k: int = Field(default=3, ge=1)
+    rag_context_max_tokens: int = Field(default=1200, ge=0)
+    rag_context_duplicate_threshold: float = Field(default=0.8, gt=0, le=1)
+    # "hybrid" fuses Chroma and BM25 rankings (RRF); "lexical" = BM25 only, no embeddings
+    rag_retrieval_mode: Literal["vector", "hybrid", "lexical"] = "hybrid"
+    # Retrieval runs in its own thread pool (embedding HTTP + Chroma SQLite block)
+    rag_max_concurrency: int = Field(default=2, ge=1)
+    rag_timeout_seconds: float = Field(default=10.0, gt=0)
 
     # File Upload Settings
     max_upload_size_mb: int = 10
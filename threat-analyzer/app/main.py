@@ -1,6 +1,8 @@
 """Threat Modeling AI - FastAPI Application."""
 
 from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import Any
 
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
@@ -9,7 +11,7 @@ from threat_modeling_shared.logging import get_logger, setup_logging
 
 from app.config import get_settings
 from app.routers import ROUTERS
-from app.services.rag_service import RAGService
+from app.services.rag_service import get_rag_service, shutdown_rag_services
 from app.threat_analysis.exceptions import (
     ArchitectureDiagramValidationError,
     InvalidFileTypeError,
@@ -20,15 +22,23 @@ _settings = get_settings()
 logger = get_logger("main")
 
 
+@asynccontextmanager
 async def _lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    """Startup: logging, warm RAG cache. Shutdown: log."""
+    """Startup: logging, background warm-up of the shared RAG service (readiness
+    does not wait for it). Shutdown: stop the RAG thread pool, log."""
     setup_logging(_settings.log_level)
     logger.info("Starting %s v%s", _settings.app_name, _settings.app_version)
-    RAGService(_settings).get_retriever()
+    get_rag_service(_settings).start_warmup()
     yield
+    shutdown_rag_services()
     logger.info("Shutting down %s", _settings.app_name)
 
 
+def _readiness_details() -> dict[str, Any]:
+    """RAG warm-up state in /health/ready (informational: RAG is optional)."""
+    return {"rag": get_rag_service(_settings).status()}
+
+
 async def _handle_exception(_request: Request, exc: Exception) -> JSONResponse:
     """Generic handler: map exception type to status and detail."""
     if isinstance(exc, ArchitectureDiagramValidationError):
@@ -52,7 +62,9 @@ app = create_app(
     version=_settings.app_version,
     routers=ROUTERS,
     settings=_settings,
+    lifespan=_lifespan,
     health_system_name=_settings.app_name,
+    readiness_details=_readiness_details,
     check_database=False,
     exception_handlers=[(Exception, _handle_exception)],
     exception_pass_through=(
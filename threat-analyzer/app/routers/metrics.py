@@ -0,0 +1,21 @@
+"""Metrics router - LLM usage counters in Prometheus text format."""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.threat_analysis.llm.metrics import registry
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="LLM Metrics",
+    description="LLM calls, tokens, queue wait, time to first token and latency by stage, provider, model, mode and outcome.",
+)
+async def llm_metrics() -> PlainTextResponse:
+    """Expose process-wide LLM usage in the Prometheus text exposition format."""
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -2,10 +2,11 @@
 
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
 
 from app.dependencies import SettingsDep
 from app.threat_analysis.controllers import ThreatAnalysisController
+from app.threat_analysis.deadline import REQUEST_TIMEOUT_HEADER
 from app.threat_analysis.schemas import (
     AnalysisRequest,
     AnalysisResponse,
@@ -28,10 +29,18 @@ async def analyze_diagram(
     service: ServiceDep,
     settings: SettingsDep,
     request: Annotated[AnalysisRequest, Depends(get_analysis_request)],
+    request_timeout: Annotated[
+        float | None,
+        Header(
+            alias=REQUEST_TIMEOUT_HEADER,
+            description="Seconds the caller will wait; the pipeline budgets stages and LLM attempts within it.",
+        ),
+    ] = None,
 ) -> AnalysisResponse:
     """Analyze an architecture diagram for security threats."""
     contents = await request.file.read()
     return await ThreatAnalysisController(service, settings).analyze(
         contents,
         content_type=request.file.content_type,
+        timeout_seconds=request_timeout,
     )
@@ -1,5 +1,9 @@
 """Application services — RAG, etc."""
 
-from app.services.rag_service import RAGService
+from app.services.rag_service import (
+    RAGService,
+    get_rag_service,
+    shutdown_rag_services,
+)
 
-__all__ = ["RAGService"]
+__all__ = ["RAGService", "get_rag_service", "shutdown_rag_services"]
@@ -0,0 +1,39 @@
+"""Gravação atômica dos arquivos de índice (manifesto, BM25, NumpyVectorStore).
+
+Cada gravação usa um temporário de nome único na pasta do destino e termina com
+replace: workers que sincronizam o mesmo índice ao mesmo tempo não escrevem no
+mesmo temporário, e quem lê vê o arquivo antigo ou o novo, nunca um pela metade.
+"""
+
+import os
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO
+
+# Temporários nascem 0600; o arquivo final fica legível como os demais do índice
+_FILE_MODE = 0o644
+
+
+@contextmanager
+def atomic_open(path: Path) -> Iterator[IO[bytes]]:
+    """Arquivo binário temporário que substitui path ao sair sem erro."""
+    f = tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False
+    )
+    tmp = Path(f.name)
+    try:
+        with f:
+            yield f
+        os.chmod(tmp, _FILE_MODE)
+        tmp.replace(path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Grava text (UTF-8) em path atomicamente."""
+    with atomic_open(path) as f:
+        f.write(text.encode("utf-8"))
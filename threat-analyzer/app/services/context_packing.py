@@ -0,0 +1,135 @@
+"""Contexto RAG do prompt: chunks com score empacotados em um orçamento de tokens.
+
+Os chunks recuperados (RAGService.retrieve_scored) se repetem: o divisor copia
+rag_chunk_overlap caracteres entre chunks vizinhos, e a mesma passagem pode
+estar em mais de um arquivo. Em vez de concatenar na ordem:
+
+- chunk cujo texto já está quase todo no contexto (fração dos seus 3-gramas de
+  palavras já cobertos >= duplicate_threshold) é descartado;
+- chunks vizinhos ou sobrepostos do mesmo arquivo (metadata source e
+  start_index) viram um trecho só, sem repetir a sobreposição;
+- a escolha é gulosa por relevância marginal: a cada passo entra o chunk de
+  maior score x fração de texto novo entre os que ainda cabem no orçamento
+  (~4 caracteres por token, contando o que a emenda economiza).
+
+Os trechos saem em ordem decrescente de score (o maior dos seus chunks).
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any
+
+# Estimativa de tokens do orçamento de contexto
+_CHARS_PER_TOKEN = 4
+_WORD = re.compile(r"\w+")
+# Chunks separados por até isso (espaços/quebras removidos pelo divisor) são vizinhos
+_MAX_GAP = 8
+
+
+@dataclass(frozen=True)
+class _Passage:
+    text: str
+    score: float
+    source: Any = None
+    start: int | None = None
+
+    @property
+    def end(self) -> int:
+        return (self.start or 0) + len(self.text)
+
+
+def pack_context(
+    chunks: list[tuple[Any, float]],
+    max_tokens: int,
+    duplicate_threshold: float = 0.8,
+) -> str:
+    """Texto dos chunks (Document, score) escolhidos, até max_tokens."""
+    budget = max_tokens * _CHARS_PER_TOKEN
+    candidates: list[tuple[_Passage, set[tuple[str, ...]]]] = []
+    seen: set[str] = set()
+    for doc, score in chunks:
+        text = doc.page_content.strip()
+        key = " ".join(text.lower().split())
+        if not text or key in seen:
+            continue
+        seen.add(key)
+        metadata = doc.metadata if isinstance(doc.metadata, dict) else {}
+        start = metadata.get("start_index")
+        if isinstance(start, int):
+            # start_index aponta para o texto antes do strip
+            start += len(doc.page_content) - len(doc.page_content.lstrip())
+        else:
+            start = None
+        passage = _Passage(text, score, metadata.get("source"), start)
+        candidates.append((passage, _trigrams(text)))
+
+    passages: list[_Passage] = []
+    covered: set[tuple[str, ...]] = set()
+    while candidates:
+        best: tuple[float, int, list[_Passage]] | None = None
+        remaining = []
+        for chunk, grams in candidates:
+            novelty = 1 - len(grams & covered) / len(grams) if grams else 1.0
+            if 1 - novelty >= duplicate_threshold:
+                continue
+            remaining.append((chunk, grams))
+            placed = _place(passages, chunk)
+            if _length(placed) > budget:
+                continue
+            gain = chunk.score * novelty
+            if best is None or gain > best[0]:
+                best = (gain, len(remaining) - 1, placed)
+        if best is None:
+            break
+        _, index, passages = best
+        covered |= remaining.pop(index)[1]
+        candidates = remaining
+    ordered = sorted(passages, key=lambda p: p.score, reverse=True)
+    return "\n".join(p.text for p in ordered)
+
+
+def _trigrams(text: str) -> set[tuple[str, ...]]:
+    """3-gramas de palavras (em minúsculas) do texto."""
+    words = _WORD.findall(text.lower())
+    if len(words) < 3:
+        return {tuple(words)} if words else set()
+    return set(zip(words, words[1:], words[2:], strict=False))
+
+
+def _place(passages: list[_Passage], chunk: _Passage) -> list[_Passage]:
+    """Trechos com o chunk incluído, emendado aos vizinhos do mesmo arquivo."""
+    pending = list(passages)
+    merged = chunk
+    joined = True
+    while joined:
+        joined = False
+        for i, passage in enumerate(pending):
+            combined = _merge(passage, merged)
+            if combined is not None:
+                merged = combined
+                del pending[i]
+                joined = True
+                break
+    return [*pending, merged]
+
+
+def _merge(a: _Passage, b: _Passage) -> _Passage | None:
+    """a e b em um trecho só, se forem vizinhos ou sobrepostos no mesmo arquivo."""
+    if a.source is None or a.source != b.source or a.start is None or b.start is None:
+        return None
+    if b.start < a.start:
+        a, b = b, a
+    if b.start > a.end + _MAX_GAP:
+        return None
+    if b.end <= a.end:
+        text = a.text
+    elif b.start >= a.end:
+        text = a.text + ("\n" if b.start > a.end else "") + b.text
+    else:
+        text = a.text + b.text[a.end - b.start :]
+    return _Passage(text, max(a.score, b.score), a.source, a.start)
+
+
+def _length(passages: list[_Passage]) -> int:
+    """Caracteres do contexto (trechos separados por quebra de linha)."""
+    return sum(len(p.text) for p in passages) + max(len(passages) - 1, 0)
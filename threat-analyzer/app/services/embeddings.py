@@ -0,0 +1,90 @@
+"""Backends de embedding da base RAG, escolhidos por Settings.embedding_model.
+
+Modelos com prefixo "local:" rodam na CPU, sem rede nem chave de API, tanto na
+construção do índice quanto nas queries; os demais usam a API do Gemini.
+
+local:hashed-ngram[:dimensões] — n-gramas de caracteres (3 a 5, dentro de cada
+palavra) e palavras inteiras, com o truque do hashing (índice e sinal pelo CRC32)
+e peso 1 + log(tf); o vetor é normalizado (L2), então a distância L2 do Chroma
+ordena como o cosseno. Sem vocabulário nem treino: o mesmo texto gera o mesmo
+vetor em qualquer processo.
+"""
+
+import math
+import re
+import zlib
+from collections import Counter
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+from app.config import Settings
+
+LOCAL_PREFIX = "local:"
+HASHED_NGRAM = "hashed-ngram"
+DEFAULT_DIMENSIONS = 1024
+
+_WORD = re.compile(r"\w+")
+
+
+class HashedNgramEmbeddings(Embeddings):
+    """Embeddings locais por hashing de n-gramas (CPU, determinístico)."""
+
+    def __init__(
+        self,
+        dimensions: int = DEFAULT_DIMENSIONS,
+        ngram_range: tuple[int, int] = (3, 5),
+    ) -> None:
+        if dimensions < 1:
+            raise ValueError("dimensions must be positive")
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+
+    def embed_documents(
+        self, texts: list[str], task_type: str | None = None
+    ) -> list[list[float]]:
+        """Vetores dos textos; task_type é aceito pela compatibilidade com o Gemini."""
+        return [self._vector(text).tolist() for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._vector(text).tolist()
+
+    def _features(self, text: str) -> Counter[str]:
+        low, high = self.ngram_range
+        counts: Counter[str] = Counter()
+        for word in _WORD.findall(text.lower()):
+            counts["w:" + word] += 1
+            padded = f" {word} "
+            for n in range(low, high + 1):
+                for i in range(len(padded) - n + 1):
+                    counts[padded[i : i + n]] += 1
+        return counts
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions)
+        for feature, count in self._features(text).items():
+            h = zlib.crc32(feature.encode())
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dimensions] += sign * (1 + math.log(count))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+def is_local(model: str) -> bool:
+    return model.startswith(LOCAL_PREFIX)
+
+
+def get_embeddings(settings: Settings) -> Embeddings:
+    """Backend de embedding do embedding_model configurado."""
+    model = settings.embedding_model
+    if not is_local(model):
+        return GoogleGenerativeAIEmbeddings(
+            model=model, google_api_key=settings.google_api_key
+        )
+    name, _, dimensions = model[len(LOCAL_PREFIX) :].partition(":")
+    if name != HASHED_NGRAM:
+        raise ValueError(f"Unknown local embedding model: {model}")
+    return HashedNgramEmbeddings(
+        dimensions=int(dimensions) if dimensions else DEFAULT_DIMENSIONS
+    )
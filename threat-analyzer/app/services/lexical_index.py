@@ -0,0 +1,142 @@
+"""Índice lexical (BM25) dos chunks da base RAG e fusão por rank (RRF).
+
+Busca vetorial perde termos exatos (protocolos, CWE-89, nomes de produto); o
+BM25 os acha sem chamada de embedding. Os pesos BM25 de cada (termo, chunk) são
+calculados na construção e persistidos, então a busca é só somar (NumPy) os
+pesos das listas invertidas dos termos da query e pegar os k maiores
+(argpartition).
+
+Termos: palavras em minúsculas; termos compostos (cwe-89, tls1.2, oauth2/oidc)
+entram inteiros e também por partes.
+"""
+
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app.services.atomic_file import atomic_write_text
+
+FORMAT_VERSION = 1
+# Constante do reciprocal-rank fusion (1 / (RRF_K + posição))
+RRF_K = 60
+
+_TERM = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    terms = []
+    for term in _TERM.findall(text.lower()):
+        terms.append(term)
+        parts = _PART.findall(term)
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+
+class BM25Index:
+    """Listas invertidas termo -> [(chunk, peso BM25)] com os chunks (texto e metadata)."""
+
+    def __init__(
+        self,
+        documents: list[dict[str, Any]],
+        postings: dict[str, list[list[float]]],
+        key: Any = None,
+    ) -> None:
+        self.documents = documents
+        self.postings = postings
+        self.key = key
+        self._arrays = {
+            term: (
+                np.array([int(p[0]) for p in entries], dtype=np.int32),
+                np.array([p[1] for p in entries]),
+            )
+            for term, entries in postings.items()
+        }
+
+    @classmethod
+    def build(
+        cls,
+        documents: list[dict[str, Any]],
+        key: Any = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ) -> "BM25Index":
+        """Índice dos documentos ({page_content, metadata})."""
+        counts = [Counter(tokenize(d["page_content"])) for d in documents]
+        lengths = [sum(c.values()) for c in counts]
+        average = sum(lengths) / len(lengths) if lengths else 0.0
+        frequency: Counter[str] = Counter(t for c in counts for t in c)
+        total = len(documents)
+        postings: dict[str, list[list[float]]] = defaultdict(list)
+        for doc, (terms, length) in enumerate(zip(counts, lengths, strict=True)):
+            norm = k1 * (1 - b + b * length / average) if average else k1
+            for term, tf in terms.items():
+                idf = math.log(
+                    1 + (total - frequency[term] + 0.5) / (frequency[term] + 0.5)
+                )
+                postings[term].append(
+                    [doc, round(idf * tf * (k1 + 1) / (tf + norm), 6)]
+                )
+        return cls(documents, dict(postings), key)
+
+    def search(self, query: str, k: int) -> list[Document]:
+        """Os k chunks de maior score BM25 (sem nenhum termo em comum: fora)."""
+        scores = np.zeros(len(self.documents))
+        for term in set(tokenize(query)):
+            if term in self._arrays:
+                docs, weights = self._arrays[term]
+                scores[docs] += weights  # um chunk aparece uma vez por termo
+        matched = np.flatnonzero(scores)
+        if k <= 0 or not len(matched):
+            return []
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        best = sorted(matched.tolist(), key=lambda doc: (-scores[doc], doc))
+        return [Document(**self.documents[doc]) for doc in best]
+
+    def save(self, path: Path) -> None:
+        """Grava atomicamente em JSON."""
+        atomic_write_text(
+            path,
+            json.dumps(
+                {
+                    "version": FORMAT_VERSION,
+                    "key": self.key,
+                    "documents": self.documents,
+                    "postings": self.postings,
+                }
+            ),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index | None":
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != FORMAT_VERSION:
+            return None
+        return cls(data["documents"], data["postings"], data.get("key"))
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[Document]], k: int, key: Any = None
+) -> list[Document]:
+    """Top k por soma de 1 / (RRF_K + posição) nas listas; key identifica o chunk."""
+    key = key or (lambda doc: doc.page_content)
+    scores: dict[Any, float] = defaultdict(float)
+    first: dict[Any, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            identity = key(doc)
+            scores[identity] += 1 / (RRF_K + rank)
+            first.setdefault(identity, doc)
+    ordered = sorted(scores, key=scores.__getitem__, reverse=True)
+    return [first[identity] for identity in ordered[:k]]
@@ -0,0 +1,203 @@
+"""Vector store leve em NumPy: matriz float32 memory-mapped (.npy) + sidecar JSON.
+
+Alternativa ao Chroma para bases pequenas/médias: abrir o índice é um np.load
+com mmap_mode="r" (sem SQLite, sem cliente Chroma, sem importar chromadb), e as
+páginas do arquivo ficam no page cache do SO, compartilhadas entre os workers
+do uvicorn. Os vetores são gravados normalizados (L2), então a busca é um
+produto escalar vetorizado (cosseno) e argpartition para o top-k.
+
+vectors.npy tem uma linha por chunk; vectors.json guarda ids, textos e metadata
+na mesma ordem. Alterações (sincronização do índice) ficam em memória até
+persist(), que regrava os dois arquivos (temporário + replace).
+"""
+
+import json
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from threat_modeling_shared.logging import get_logger
+
+from app.services.atomic_file import atomic_open, atomic_write_text
+
+logger = get_logger("services.numpy_store")
+
+VECTORS_NAME = "vectors.npy"
+SIDECAR_NAME = "vectors.json"
+FORMAT_VERSION = 1
+
+
+class NumpyVectorStore(VectorStore):
+    """Busca por cosseno sobre vectors.npy (memory-mapped) em persist_dir."""
+
+    def __init__(self, persist_dir: Path, embedding: Embeddings) -> None:
+        self.persist_dir = Path(persist_dir)
+        self._embedding = embedding
+        self._ids: list[str] = []
+        self._documents: list[dict[str, Any]] = []
+        self._matrix: np.ndarray = np.zeros((0, 0), dtype=np.float32)
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def similarity_search(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> list[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k)
+
+    def similarity_search_by_vector(
+        self, embedding: list[float], k: int = 4, **kwargs: Any
+    ) -> list[Document]:
+        """Os k chunks de maior cosseno com o vetor."""
+        if k <= 0 or not self._ids:
+            return []
+        query = _normalized(np.asarray(embedding, dtype=np.float32)[None, :])[0]
+        if query.shape[0] != self._matrix.shape[1]:
+            raise ValueError(
+                f"Query has {query.shape[0]} dimensions, index has "
+                f"{self._matrix.shape[1]}"
+            )
+        scores = self._matrix @ query
+        top = (
+            np.argpartition(-scores, k - 1)[:k]
+            if len(scores) > k
+            else np.arange(len(scores))
+        )
+        best = top[np.argsort(-scores[top], kind="stable")]
+        return [Document(**self._documents[i]) for i in best.tolist()]
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: list[dict[str, Any]] | None = None,
+        *,
+        ids: list[str] | None = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(len(self._ids) + i) for i in range(len(texts))]
+        documents = [
+            Document(page_content=t, metadata=m)
+            for t, m in zip(texts, metadatas, strict=True)
+        ]
+        self.upsert_vectors(ids, self._embedding.embed_documents(texts), documents)
+        self.persist()
+        return ids
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: list[dict[str, Any]] | None = None,
+        *,
+        ids: list[str] | None = None,
+        persist_directory: str | Path = ".",
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        store = cls(Path(persist_directory), embedding)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+    # Sincronização do índice (app.services.rag_index.VectorIndex)
+
+    def indexed_ids(self) -> list[str]:
+        return list(self._ids)
+
+    def delete_ids(self, ids: list[str]) -> None:
+        drop = set(ids)
+        keep = [i for i, chunk_id in enumerate(self._ids) if chunk_id not in drop]
+        self._matrix = np.asarray(self._matrix[keep])
+        self._ids = [self._ids[i] for i in keep]
+        self._documents = [self._documents[i] for i in keep]
+
+    def upsert_vectors(
+        self, ids: list[str], vectors: list[list[float]], documents: list[Document]
+    ) -> None:
+        rows = _normalized(np.asarray(vectors, dtype=np.float32))
+        if not len(rows):
+            return
+        matrix = (
+            np.array(self._matrix)  # cópia em memória (o mmap é só leitura)
+            if self._ids
+            else np.zeros((0, rows.shape[1]), dtype=np.float32)
+        )
+        position = {chunk_id: i for i, chunk_id in enumerate(self._ids)}
+        appended = []
+        for chunk_id, row, doc in zip(ids, rows, documents, strict=True):
+            entry = {"page_content": doc.page_content, "metadata": doc.metadata}
+            if chunk_id in position:
+                matrix[position[chunk_id]] = row
+                self._documents[position[chunk_id]] = entry
+            else:
+                position[chunk_id] = len(self._ids)
+                self._ids.append(chunk_id)
+                self._documents.append(entry)
+                appended.append(row)
+        self._matrix = np.vstack([matrix, *appended]) if appended else matrix
+
+    def update_metadata(self, ids: list[str], documents: list[Document]) -> None:
+        position = {chunk_id: i for i, chunk_id in enumerate(self._ids)}
+        for chunk_id, doc in zip(ids, documents, strict=True):
+            self._documents[position[chunk_id]]["metadata"] = doc.metadata
+
+    def persist(self) -> None:
+        """Grava vectors.npy e vectors.json e volta a ler a matriz por mmap."""
+        self.persist_dir.mkdir(parents=True, exist_ok=True)
+        vectors, sidecar = self._paths()
+        with atomic_open(vectors) as f:
+            np.save(f, np.ascontiguousarray(self._matrix, dtype=np.float32))
+        atomic_write_text(
+            sidecar,
+            json.dumps(
+                {
+                    "version": FORMAT_VERSION,
+                    "shape": list(self._matrix.shape),
+                    "ids": self._ids,
+                    "documents": self._documents,
+                }
+            ),
+        )
+        self._load()
+
+    def _paths(self) -> tuple[Path, Path]:
+        return self.persist_dir / VECTORS_NAME, self.persist_dir / SIDECAR_NAME
+
+    def _load(self) -> None:
+        """Abre o índice persistido; ausente ou inconsistente = índice vazio."""
+        vectors, sidecar = self._paths()
+        if not vectors.exists() or not sidecar.exists():
+            return
+        try:
+            meta = json.loads(sidecar.read_text(encoding="utf-8"))
+            shape = tuple(meta["shape"])
+            if meta.get("version") != FORMAT_VERSION or len(meta["ids"]) != shape[0]:
+                raise ValueError("unsupported or inconsistent sidecar")
+            matrix = (
+                np.load(vectors, mmap_mode="r")
+                if shape[0]
+                else np.zeros(shape, dtype=np.float32)
+            )
+            if matrix.shape != shape:
+                raise ValueError(f"vectors {matrix.shape} != sidecar {shape}")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("NumPy vector index unreadable, rebuilding: %s", e)
+            return
+        self._matrix = matrix
+        self._ids = list(meta["ids"])
+        self._documents = meta["documents"]
+
+
+def _normalized(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
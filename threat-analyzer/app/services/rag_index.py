@@ -0,0 +1,337 @@
+"""Indexação incremental da base RAG (arquivos .md -> vector store persistido).
+
+O vector store é o Chroma ou o NumpyVectorStore (RAG_VECTOR_STORE), ambos vistos
+pela interface VectorIndex. Um manifesto (manifest.json, na pasta do índice) guarda o hash de cada
+arquivo, os ids dos seus chunks e as posições (start_index); o id de um chunk é
+o hash do caminho e do texto. Na inicialização só os arquivos com hash diferente
+são lidos e divididos, e só os chunks novos são embedados (em lotes, com
+concorrência limitada); chunks que só mudaram de posição têm a metadata
+atualizada, sem novo embedding; chunks que sumiram e arquivos removidos são
+apagados do índice. Índice sem manifesto,
+com ids diferentes dos do manifesto ou construído com outro modelo de embedding /
+tamanho ou formato de chunk / vector store é refeito do zero.
+
+O índice lexical (BM25, bm25.json) usa os mesmos chunks e não depende de
+embeddings; é reconstruído inteiro quando algum arquivo ou a divisão em chunks
+muda (só tokenização, sem chamadas externas).
+"""
+
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Protocol
+
+from langchain_community.document_loaders import TextLoader
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from threat_modeling_shared.logging import get_logger
+
+from app.config import Settings
+from app.services.atomic_file import atomic_write_text
+from app.services.lexical_index import BM25Index
+
+logger = get_logger("services.rag_index")
+
+MANIFEST_NAME = "manifest.json"
+LEXICAL_INDEX_NAME = "bm25.json"
+MANIFEST_VERSION = 1
+# Subpasta do Chroma persistido (modelos locais: chroma_db-<modelo>); as pastas
+# de índice dentro da base não são fontes
+INDEX_DIR_PREFIX = "chroma_db"
+# Formato dos chunks (2: metadata com start_index, usado na montagem do contexto);
+# mudar refaz os índices
+CHUNK_FORMAT = 2
+
+
+class VectorIndex(Protocol):
+    """Operações de escrita usadas na sincronização do vector store."""
+
+    def indexed_ids(self) -> list[str]: ...
+
+    def delete_ids(self, ids: list[str]) -> None: ...
+
+    def upsert_vectors(
+        self, ids: list[str], vectors: list[list[float]], documents: list[Document]
+    ) -> None: ...
+
+    def update_metadata(self, ids: list[str], documents: list[Document]) -> None: ...
+
+    def persist(self) -> None: ...
+
+
+class ChromaIndex:
+    """VectorIndex sobre o Chroma do LangChain."""
+
+    def __init__(self, store: Any) -> None:
+        self.store = store
+
+    def indexed_ids(self) -> list[str]:
+        return self.store.get(include=[])["ids"]
+
+    def delete_ids(self, ids: list[str]) -> None:
+        self.store.delete(ids=ids)
+
+    def upsert_vectors(
+        self, ids: list[str], vectors: list[list[float]], documents: list[Document]
+    ) -> None:
+        # Vetores já calculados vão direto para a coleção (o wrapper embedaria de novo)
+        self.store._collection.upsert(
+            ids=ids,
+            embeddings=vectors,
+            documents=[d.page_content for d in documents],
+            metadatas=[d.metadata for d in documents],
+        )
+
+    def update_metadata(self, ids: list[str], documents: list[Document]) -> None:
+        self.store._collection.update(
+            ids=ids, metadatas=[d.metadata for d in documents]
+        )
+
+    def persist(self) -> None:
+        """O Chroma grava cada operação."""
+
+
+def scan_sources(kb_path: Path) -> dict[str, Path]:
+    """Caminho relativo -> arquivo, para os .md da base (fora dos índices)."""
+    sources = {}
+    for file_path in sorted(kb_path.rglob("*.md")):
+        relative = file_path.relative_to(kb_path)
+        if any(part.startswith(INDEX_DIR_PREFIX) for part in relative.parts[:-1]):
+            continue
+        sources[relative.as_posix()] = file_path
+    return sources
+
+
+def file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def chunk_ids(relative: str, texts: list[str]) -> list[str]:
+    """Ids estáveis pelo conteúdo; textos repetidos no arquivo ganham sufixo."""
+    ids: list[str] = []
+    seen: dict[str, int] = {}
+    for text in texts:
+        digest = hashlib.sha256(f"{relative}\0{text}".encode()).hexdigest()[:32]
+        count = seen.get(digest, 0)
+        seen[digest] = count + 1
+        ids.append(f"{digest}-{count}" if count else digest)
+    return ids
+
+
+def splitter(settings: Settings) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=settings.rag_chunk_size,
+        chunk_overlap=settings.rag_chunk_overlap,
+        add_start_index=True,
+    )
+
+
+def split_source(
+    file_path: Path, text_splitter: RecursiveCharacterTextSplitter
+) -> list[Document]:
+    """Chunks (Documents) de um .md."""
+    return text_splitter.split_documents(
+        TextLoader(str(file_path), encoding="utf-8").load()
+    )
+
+
+def index_config(settings: Settings) -> dict[str, Any]:
+    """Parâmetros que, se mudarem, invalidam todos os vetores."""
+    return {
+        "embedding_model": settings.embedding_model,
+        "chunk_size": settings.rag_chunk_size,
+        "chunk_overlap": settings.rag_chunk_overlap,
+        "chunk_format": CHUNK_FORMAT,
+        "vector_store": settings.rag_vector_store,
+    }
+
+
+def load_manifest(persist_dir: Path) -> dict[str, Any] | None:
+    try:
+        manifest = json.loads((persist_dir / MANIFEST_NAME).read_text("utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(persist_dir: Path, manifest: dict[str, Any]) -> None:
+    """Grava atomicamente (arquivo temporário + replace)."""
+    atomic_write_text(persist_dir / MANIFEST_NAME, json.dumps(manifest, sort_keys=True))
+
+
+def manifest_ids(manifest: dict[str, Any]) -> set[str]:
+    return {i for entry in manifest["files"].values() for i in entry["chunks"]}
+
+
+def index_version(manifest: dict[str, Any]) -> str:
+    """Muda quando qualquer chunk, sua posição ou a configuração do índice muda."""
+    chunks = sorted(
+        (chunk_id, start)
+        for entry in manifest["files"].values()
+        for chunk_id, start in zip(
+            entry["chunks"],
+            entry.get("starts") or [None] * len(entry["chunks"]),
+            strict=True,
+        )
+    )
+    content = json.dumps([manifest["config"], chunks])
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+
+def embed_batches(
+    embeddings: Embeddings, texts: list[str], batch_size: int, concurrency: int
+) -> list[list[float]]:
+    """Vetores dos textos em lotes de batch_size, até concurrency lotes por vez."""
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    if len(batches) <= 1 or concurrency <= 1:
+        return [v for batch in batches for v in embeddings.embed_documents(batch)]
+    with ThreadPoolExecutor(
+        max_workers=min(concurrency, len(batches)), thread_name_prefix="rag-index"
+    ) as pool:
+        return [
+            v
+            for vectors in pool.map(embeddings.embed_documents, batches)
+            for v in vectors
+        ]
+
+
+def sync_index(
+    index: VectorIndex,
+    embeddings: Embeddings,
+    kb_path: Path,
+    persist_dir: Path,
+    settings: Settings,
+) -> dict[str, Any]:
+    """Alinha o vector store aos .md da base e devolve o manifesto gravado."""
+    config = index_config(settings)
+    manifest = load_manifest(persist_dir)
+    saved = manifest
+    current = index.indexed_ids()
+    removed_stale = False
+    if (
+        manifest is None
+        or manifest.get("config") != config
+        or set(current) != manifest_ids(manifest)
+    ):
+        if current:
+            logger.info("RAG index is stale (%d chunks), rebuilding", len(current))
+            index.delete_ids(current)
+            removed_stale = True
+        manifest = {"version": MANIFEST_VERSION, "config": config, "files": {}}
+    indexed: dict[str, dict[str, Any]] = manifest["files"]
+
+    sources = scan_sources(kb_path)
+    text_splitter = splitter(settings)
+    files: dict[str, dict[str, Any]] = {}
+    new_ids: list[str] = []
+    new_docs: list[Any] = []
+    moved_ids: list[str] = []
+    moved_docs: list[Any] = []
+    removed: list[str] = []
+    for relative in indexed.keys() - sources.keys():
+        removed.extend(indexed[relative]["chunks"])
+    for relative, file_path in sources.items():
+        digest = file_hash(file_path)
+        previous = indexed.get(relative)
+        if previous is not None and previous["sha256"] == digest:
+            files[relative] = previous
+            continue
+        try:
+            chunks = split_source(file_path, text_splitter)
+        except Exception as e:
+            logger.warning("Failed to load %s: %s", file_path.name, e)
+            if previous is not None:
+                files[relative] = previous
+            continue
+        ids = chunk_ids(relative, [c.page_content for c in chunks])
+        starts = [c.metadata.get("start_index") for c in chunks]
+        known = set(previous["chunks"]) if previous else set()
+        # Manifestos sem "starts": a posição dos chunks mantidos é desconhecida
+        known_starts = (
+            dict(zip(previous["chunks"], previous.get("starts", [])))
+            if previous
+            else {}
+        )
+        for chunk_id, chunk, start in zip(ids, chunks, starts, strict=True):
+            if chunk_id not in known:
+                new_ids.append(chunk_id)
+                new_docs.append(chunk)
+            elif known_starts.get(chunk_id) != start:
+                # Texto igual em outra posição: start_index novo para o contexto
+                moved_ids.append(chunk_id)
+                moved_docs.append(chunk)
+        removed.extend(known - set(ids))
+        files[relative] = {"sha256": digest, "chunks": ids, "starts": starts}
+
+    if removed:
+        index.delete_ids(removed)
+    if new_docs:
+        vectors = embed_batches(
+            embeddings,
+            [d.page_content for d in new_docs],
+            settings.rag_index_batch_size,
+            settings.rag_index_concurrency,
+        )
+        batch = settings.rag_index_batch_size
+        for i in range(0, len(new_docs), batch):
+            index.upsert_vectors(
+                new_ids[i : i + batch],
+                vectors[i : i + batch],
+                new_docs[i : i + batch],
+            )
+    if moved_docs:
+        index.update_metadata(moved_ids, moved_docs)
+    # Sem mudanças nada é regravado (reinício sem edição não toca o disco)
+    if new_docs or moved_docs or removed or removed_stale:
+        index.persist()
+    manifest = {"version": MANIFEST_VERSION, "config": config, "files": files}
+    if manifest != saved:
+        save_manifest(persist_dir, manifest)
+    if new_docs or moved_docs or removed:
+        logger.info(
+            "RAG index updated: %d chunks embedded, %d moved, %d removed (%d files)",
+            len(new_docs),
+            len(moved_docs),
+            len(removed),
+            len(files),
+        )
+    return manifest
+
+
+def load_or_build_lexical_index(
+    kb_path: Path, persist_dir: Path, settings: Settings
+) -> BM25Index | None:
+    """BM25 persistido se ainda corresponde aos .md da base; senão reconstruído."""
+    sources = scan_sources(kb_path)
+    key = {
+        "chunk_size": settings.rag_chunk_size,
+        "chunk_overlap": settings.rag_chunk_overlap,
+        "chunk_format": CHUNK_FORMAT,
+        "files": {relative: file_hash(path) for relative, path in sources.items()},
+    }
+    if not sources:
+        return None
+    path = persist_dir / LEXICAL_INDEX_NAME
+    index = BM25Index.load(path)
+    if index is not None and index.key == key:
+        return index if index.documents else None
+    text_splitter = splitter(settings)
+    documents = []
+    for file_path in sources.values():
+        try:
+            chunks = split_source(file_path, text_splitter)
+        except Exception as e:
+            logger.warning("Failed to load %s: %s", file_path.name, e)
+            continue
+        documents.extend(
+            {"page_content": c.page_content, "metadata": c.metadata} for c in chunks
+        )
+    index = BM25Index.build(documents, key=key)
+    persist_dir.mkdir(parents=True, exist_ok=True)
+    index.save(path)
+    logger.info("RAG lexical index built: %d chunks", len(documents))
+    return index if documents else None
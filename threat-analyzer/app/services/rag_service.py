@@ -1,41 +1,398 @@
 """RAG service — base de conhecimento em disco (Chroma persist) e retriever com cache por processo."""
 
+import asyncio
+import re
+import shutil
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
-from langchain_community.document_loaders import TextLoader
 from langchain_community.vectorstores import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from threat_modeling_shared.logging import get_logger
 
-from app.config import Settings
+from app.config import Settings, get_settings
+from app.services.embeddings import get_embeddings, is_local
+from app.services.lexical_index import RRF_K, BM25Index, reciprocal_rank_fusion
+from app.services.numpy_store import NumpyVectorStore
+from app.services.rag_index import (
+    INDEX_DIR_PREFIX,
+    MANIFEST_NAME,
+    ChromaIndex,
+    VectorIndex,
+    index_version,
+    load_or_build_lexical_index,
+    scan_sources,
+    sync_index,
+)
+from app.threat_analysis.deadline import current_deadline
+from app.threat_analysis.llm.cache import LLMCacheService
+from app.threat_analysis.llm.metrics import record_retrieval
 
 logger = get_logger("services.rag")
 
 # Pasta padrão da base RAG (relativo ao app)
 _DEFAULT_RAG_DATA_DIR = Path(__file__).resolve().parent.parent / "rag_data"
-# Subpasta para persistência do Chroma (cache confiável em disco)
-_CHROMA_PERSIST_SUBDIR = "chroma_db"
+# Vetores de query e resultados guardados em memória (tipos/protocolos se repetem)
+_MEMORY_CACHE_SIZE = 1024
+
+# Pool de threads das buscas (fora do event loop) e, por event loop, o semáforo que
+# limita as buscas em andamento (a espera pela vaga é medida)
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_retrieval_slots: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, asyncio.Semaphore
+] = weakref.WeakKeyDictionary()
+# Instâncias compartilhadas do processo, uma por configuração (get_rag_service)
+_services: dict[str, "RAGService"] = {}
+_services_lock = threading.Lock()
+
+
+class _MemoryCache:
+    """Cache em memória limitado, compartilhado pelas threads do pool de busca.
+
+    No limite descarta a entrada mais antiga; leitura e escrita sob um lock.
+    """
+
+    def __init__(self, size: int = _MEMORY_CACHE_SIZE) -> None:
+        self._entries: dict[Any, Any] = {}
+        self._size = size
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any | None:
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: Any, value: Any) -> None:
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self._size:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = value
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
 
 
 class RAGService:
     """
-    Serviço RAG com persistência em disco (Chroma).
-    Retriever é construído uma vez por processo e reutilizado (propriedade com cache).
+    Serviço RAG com persistência em disco (Chroma ou NumpyVectorStore).
+
+    Use get_rag_service(): uma instância por processo, aquecida em segundo plano
+    no startup (start_warmup) e com estado em status() para o /health/ready.
     """
 
     def __init__(self, settings: Settings) -> None:
         self._settings = settings
         self._retriever: Any = None  # cache por processo (lazy)
+        self._vectorstore: Any = None
+        self._embeddings: Any = None
+        self._index_version = ""
+        self._lexical: BM25Index | None = None
+        self._lexical_loaded = False
+        # Caches em memória; o backend compartilhado (Redis) serve os outros workers
+        self._query_vectors = _MemoryCache()
+        self._results = _MemoryCache()
+        self._cache = LLMCacheService(redis_url=settings.redis_url)
+        # Vector store e BM25 carregam em locks separados: o BM25 não espera a
+        # sincronização (embeddings) do vector store
+        self._load_lock = threading.Lock()
+        self._lexical_lock = threading.Lock()
+        # Aquecimento: idle -> warming -> ready | unavailable (sem base) | failed
+        self._state = "idle"
+        self._error: str | None = None
+        self._warmup: asyncio.Future | None = None
+        self._warmup_seconds: float | None = None
+
+    def warm(self) -> None:
+        """Carrega os índices do modo configurado (BM25 primeiro, é o mais rápido)."""
+        self._state = "warming"
+        start = time.perf_counter()
+        try:
+            mode = self._settings.rag_retrieval_mode
+            lexical = self.get_lexical_index() if mode != "vector" else None
+            vectorstore = self.get_vectorstore() if mode != "lexical" else None
+            loaded = vectorstore is not None or lexical is not None
+            self._state = "ready" if loaded else "unavailable"
+        except Exception as e:
+            logger.error("RAG warm-up failed: %s", e)
+            self._state, self._error = "failed", str(e)
+        finally:
+            self._warmup_seconds = time.perf_counter() - start
+        logger.info("RAG warm-up %s in %.2fs", self._state, self._warmup_seconds or 0.0)
+
+    def start_warmup(self) -> asyncio.Future:
+        """
+        warm() em uma thread própria, sem esperar: o app fica pronto antes e
+        buscas durante o aquecimento não esperam a carga (ver aretrieve). Fora
+        do pool de buscas, a sincronização do vector store (que pode embedar a
+        base inteira) não ocupa uma das rag_max_concurrency threads.
+        """
+        if self._warmup is None:
+            self._state = "warming"
+            executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="rag-warmup"
+            )
+            self._warmup = asyncio.get_running_loop().run_in_executor(
+                executor, self.warm
+            )
+            self._warmup.add_done_callback(lambda _: executor.shutdown(wait=False))
+        return self._warmup
+
+    def status(self) -> dict[str, Any]:
+        """Estado do aquecimento e dos índices carregados (para /health/ready)."""
+        return {
+            "state": self._state,
+            "retrieval_mode": self._settings.rag_retrieval_mode,
+            "vector_store": self._vectorstore is not None,
+            "lexical_index": self._lexical is not None,
+            "index_version": self._index_version or None,
+            "warmup_seconds": (
+                round(self._warmup_seconds, 3)
+                if self._warmup_seconds is not None
+                else None
+            ),
+            "error": self._error,
+        }
 
     def get_retriever(self) -> Any | None:
         """
         Retorna o retriever RAG (construído uma vez e cacheado).
         Usa Chroma persistido em disco para cache confiável entre reinícios.
         """
-        if self._retriever is not None:
-            return self._retriever
+        if self._retriever is None:
+            vectorstore = self.get_vectorstore()
+            if vectorstore is not None:
+                self._retriever = vectorstore.as_retriever()
+        return self._retriever
+
+    async def aretrieve(
+        self, queries: list[str], k: int = 3, scored: bool = False
+    ) -> list[Any]:
+        """
+        retrieve() (retrieve_scored() se scored) no pool de threads do RAG, sem
+        bloquear o event loop.
+
+        No máximo rag_max_concurrency buscas por vez; espera pela vaga e busca
+        somam no máximo rag_timeout_seconds (ou o prazo restante da etapa, se
+        menor), senão asyncio.TimeoutError. Espera e latência vão para as métricas.
+
+        Durante o aquecimento usa só os índices já carregados (no modo híbrido,
+        o BM25 antes do vector store); sem nenhum, devolve lista vazia na hora,
+        sem ocupar uma thread do pool.
+        """
+        loaded = self._vectorstore is not None or self._lexical is not None
+        if self._state == "warming" and not loaded:
+            record_retrieval(0.0, 0.0, "warming")
+            return []
+        limit = self._settings.rag_max_concurrency
+        timeout = self._settings.rag_timeout_seconds
+        deadline = current_deadline()
+        if deadline is not None:
+            timeout = min(timeout, deadline.remaining())
+        loop = asyncio.get_running_loop()
+        semaphore = _retrieval_slots.setdefault(loop, asyncio.Semaphore(limit))
+        start = time.perf_counter()
+        queue_wait = 0.0
+
+        async def run() -> list[Any]:
+            nonlocal queue_wait
+            async with semaphore:
+                queue_wait = time.perf_counter() - start
+                return await loop.run_in_executor(
+                    _get_executor(limit),
+                    self.retrieve_scored if scored else self.retrieve,
+                    queries,
+                    k,
+                )
+
+        outcome = "ok"
+        try:
+            return await asyncio.wait_for(run(), timeout=timeout)
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            record_retrieval(queue_wait, time.perf_counter() - start, outcome)
+
+    def retrieve(self, queries: list[str], k: int = 3) -> list[Any]:
+        """Chunks de retrieve_scored(), sem os scores."""
+        return [doc for doc, _ in self.retrieve_scored(queries, k)]
+
+    def retrieve_scored(
+        self, queries: list[str], k: int = 3
+    ) -> list[tuple[Any, float]]:
+        """
+        (chunk, score) das queries, sem repetição, conforme rag_retrieval_mode.
+
+        "vector": busca no Chroma (embeddings calculados em um único lote);
+        "lexical": só BM25, sem embedding; "hybrid": as duas listas (2k candidatos
+        cada) fundidas por reciprocal-rank fusion. No modo híbrido, sem vector
+        store ou com falha de embedding, segue só com o BM25.
+
+        Resultados vetoriais ficam em cache por (query normalizada, k, versão do
+        índice), em memória e no backend compartilhado; só queries sem resultado
+        em cache são embutidas. O score de um chunk é a soma, nas queries em que
+        aparece, de 1 / (RRF_K + posição): a ordem decrescente intercala os
+        resultados por posição (1º de cada query, depois o 2º...) e sobe os
+        chunks achados por várias queries, para que um orçamento de contexto
+        corte os menos relevantes de todas. Lista vazia se a base não estiver
+        disponível.
+        """
+        mode = self._settings.rag_retrieval_mode
+        if not queries:
+            return []
+        # Durante o aquecimento só o que já carregou, sem esperar os locks de carga
+        warming = self._state == "warming"
+        lexical = vectorstore = None
+        if mode != "vector":
+            lexical = self._lexical if warming else self.get_lexical_index()
+        if mode != "lexical":
+            vectorstore = self._vectorstore if warming else self.get_vectorstore()
+        if vectorstore is None and lexical is None:
+            return []
+        unique = list(dict.fromkeys(queries))
+        candidates = 2 * k if vectorstore is not None and lexical is not None else k
+        found: dict[str, list[Any]] = {}
+        if vectorstore is not None:
+            try:
+                found = self._vector_results(vectorstore, unique, candidates)
+            except Exception as e:
+                if lexical is None:
+                    raise
+                logger.warning("Vector retrieval failed, using lexical index: %s", e)
+        if lexical is not None:
+            for query in unique:
+                matches = lexical.search(query, candidates)
+                found[query] = (
+                    reciprocal_rank_fusion([found[query], matches], k, key=_content_key)
+                    if query in found
+                    else matches[:k]
+                )
+        scores: dict[str, float] = {}
+        docs: dict[str, Any] = {}
+        for rank in range(k):
+            for query in unique:
+                if rank >= len(found[query]):
+                    continue
+                doc = found[query][rank]
+                key = _normalize(doc.page_content)
+                if key:
+                    docs.setdefault(key, doc)
+                    scores[key] = scores.get(key, 0.0) + 1 / (RRF_K + rank + 1)
+        ordered = sorted(docs, key=scores.__getitem__, reverse=True)
+        return [(docs[key], scores[key]) for key in ordered]
+
+    def _vector_results(
+        self, vectorstore: Any, queries: list[str], k: int
+    ) -> dict[str, list[Any]]:
+        """Top k do Chroma por query: cache, senão embeddings em lote e busca."""
+        found: dict[str, list[Any]] = {}
+        for query in queries:
+            cached = self._cached_results(query, k)
+            if cached is not None:
+                found[query] = cached
+        pending = [q for q in queries if q not in found]
+        if pending:
+            vectors = self._embed_queries(pending)
+            for query, vector in zip(pending, vectors, strict=True):
+                found[query] = vectorstore.similarity_search_by_vector(vector, k=k)
+                self._store_results(query, k, found[query])
+        return found
+
+    def _embed_queries(self, queries: list[str]) -> list[list[float]]:
+        """Vetores das queries: memória, depois backend compartilhado, depois o
+        provedor (ausentes em um único lote). Modelos locais não usam o backend
+        compartilhado: calcular o vetor custa menos que a ida ao Redis."""
+        model = self._settings.embedding_model
+        shared = not is_local(model)
+        # Vetores desta chamada: outra thread pode descartar a entrada do cache
+        vectors: dict[str, list[float]] = {}
+        missing: dict[str, str] = {}
+        for query in queries:
+            key = _normalize(query)
+            if key in vectors or key in missing:
+                continue
+            vector = self._query_vectors.get(key)
+            if vector is None and shared:
+                vector = self._cache.get("rag-embedding", model, key)
+                if vector is not None:
+                    self._query_vectors.put(key, vector)
+            if vector is not None:
+                vectors[key] = vector
+            else:
+                missing[key] = query
+        if missing:
+            embedded = self._embeddings.embed_documents(
+                list(missing.values()), task_type="retrieval_query"
+            )
+            for key, vector in zip(missing, embedded, strict=True):
+                vectors[key] = vector
+                self._query_vectors.put(key, vector)
+                if shared:
+                    self._cache.set("rag-embedding", vector, model, key)
+        return [vectors[_normalize(q)] for q in queries]
+
+    def _cached_results(self, query: str, k: int) -> list[Any] | None:
+        parts = (_normalize(query), k, self._index_version)
+        docs = self._results.get(parts)
+        if docs is not None:
+            return docs
+        data = self._cache.get("rag-results", *parts)
+        if data is None:
+            return None
+        docs = [Document(**d) for d in data]
+        self._results.put(parts, docs)
+        return docs
+
+    def _store_results(self, query: str, k: int, docs: list[Any]) -> None:
+        parts = (_normalize(query), k, self._index_version)
+        self._results.put(parts, docs)
+        self._cache.set(
+            "rag-results",
+            [{"page_content": d.page_content, "metadata": d.metadata} for d in docs],
+            *parts,
+        )
+
+    def get_vectorstore(self) -> Any | None:
+        """Vector store Chroma (carregado ou construído uma vez e cacheado)."""
+        if self._vectorstore is not None:
+            return self._vectorstore
+        with self._load_lock:  # buscas concorrentes no pool carregam uma vez só
+            if self._vectorstore is not None:
+                return self._vectorstore
+            return self._load_vectorstore()
+
+    def get_lexical_index(self) -> BM25Index | None:
+        """Índice BM25 (carregado do disco ou construído uma vez e cacheado)."""
+        if self._lexical_loaded:
+            return self._lexical
+        with self._lexical_lock:
+            if not self._lexical_loaded:
+                self._lexical = self._load_lexical_index()
+                self._lexical_loaded = True
+            return self._lexical
+
+    def _load_lexical_index(self) -> BM25Index | None:
+        kb_path = self._resolve_knowledge_base_path()
+        if not kb_path or not kb_path.exists():
+            return None
+        try:
+            return load_or_build_lexical_index(
+                kb_path, self._persist_dir(kb_path), self._settings
+            )
+        except Exception as e:
+            logger.error("RAG lexical index setup failed: %s", e)
+            return None
+
+    def _load_vectorstore(self) -> Any | None:
         kb_path = self._resolve_knowledge_base_path()
         if not kb_path or not kb_path.exists():
             logger.warning(
@@ -43,12 +400,17 @@ class RAGService:
                 kb_path,
             )
             return None
-        persist_dir = kb_path / _CHROMA_PERSIST_SUBDIR
-        try:
-            embeddings = GoogleGenerativeAIEmbeddings(
-                model=self._settings.embedding_model,
-                google_api_key=self._settings.google_api_key,
+        persist_dir = self._persist_dir(kb_path)
+        if not is_local(self._settings.embedding_model) and not (
+            self._settings.google_api_key
+        ):
+            logger.warning(
+                "No GOOGLE_API_KEY for embedding model %s; "
+                "use EMBEDDING_MODEL=local:hashed-ngram for offline RAG.",
+                self._settings.embedding_model,
             )
+        try:
+            embeddings = get_embeddings(self._settings)
             vectorstore = self._get_or_build_vectorstore(
                 kb_path=kb_path,
                 persist_dir=persist_dir,
@@ -56,12 +418,21 @@ class RAGService:
             )
             if vectorstore is None:
                 return None
-            self._retriever = vectorstore.as_retriever()
-            return self._retriever
+            self._embeddings = embeddings
+            self._vectorstore = vectorstore
+            return vectorstore
         except Exception as e:
             logger.error("RAG setup failed: %s", e)
             return None
 
+    def _persist_dir(self, kb_path: Path) -> Path:
+        """Pasta do índice; modelos locais têm pasta própria (dimensões diferentes)."""
+        model = self._settings.embedding_model
+        if not is_local(model):
+            return kb_path / INDEX_DIR_PREFIX
+        slug = re.sub(r"[^\w.-]+", "-", model)
+        return kb_path / f"{INDEX_DIR_PREFIX}-{slug}"
+
     def _resolve_knowledge_base_path(self) -> Path | None:
         if (
             self._settings.knowledge_base_path
@@ -76,42 +447,70 @@ class RAGService:
         self,
         kb_path: Path,
         persist_dir: Path,
-        embeddings: GoogleGenerativeAIEmbeddings,
+        embeddings: Embeddings,
     ) -> Any | None:
-        """Carrega Chroma do disco se existir; senão constrói a partir dos .md e persiste."""
+        """Abre o vector store persistido e o sincroniza com os .md (só o que mudou)."""
+        if not scan_sources(kb_path) and not (persist_dir / MANIFEST_NAME).exists():
+            return None
         persist_dir.mkdir(parents=True, exist_ok=True)
-        chroma_sqlite = persist_dir / "chroma.sqlite3"
-        if chroma_sqlite.exists():
+        if self._settings.rag_vector_store == "numpy":
+            vectorstore = NumpyVectorStore(persist_dir, embeddings)
+            index: VectorIndex = vectorstore
+        else:
             try:
-                return Chroma(
-                    persist_directory=str(persist_dir),
-                    embedding_function=embeddings,
+                vectorstore = Chroma(
+                    persist_directory=str(persist_dir), embedding_function=embeddings
                 )
             except Exception as e:
                 logger.warning("Chroma load from disk failed, rebuilding: %s", e)
-        # Construir a partir dos .md
-        md_files = list(kb_path.rglob("*.md"))
-        if not md_files:
-            return None
-        all_docs = []
-        for file_path in md_files:
-            if file_path == persist_dir or persist_dir in file_path.parents:
-                continue
-            try:
-                loader = TextLoader(str(file_path), encoding="utf-8")
-                all_docs.extend(loader.load())
-            except Exception as e:
-                logger.warning("Failed to load %s: %s", file_path.name, e)
-        if not all_docs:
+                shutil.rmtree(persist_dir)
+                persist_dir.mkdir(parents=True)
+                vectorstore = Chroma(
+                    persist_directory=str(persist_dir), embedding_function=embeddings
+                )
+            index = ChromaIndex(vectorstore)
+        manifest = sync_index(index, embeddings, kb_path, persist_dir, self._settings)
+        if not any(entry["chunks"] for entry in manifest["files"].values()):
             return None
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self._settings.rag_chunk_size,
-            chunk_overlap=self._settings.rag_chunk_overlap,
-        )
-        chunks = splitter.split_documents(all_docs)
-        vectorstore = Chroma.from_documents(
-            documents=chunks,
-            embedding=embeddings,
-            persist_directory=str(persist_dir),
-        )
+        self._index_version = index_version(manifest)
         return vectorstore
+
+
+def get_rag_service(settings: Settings | None = None) -> RAGService:
+    """RAGService compartilhado do processo para a configuração (padrão: a do app)."""
+    settings = settings or get_settings()
+    key = settings.model_dump_json()
+    with _services_lock:
+        if key not in _services:
+            _services[key] = RAGService(settings)
+        return _services[key]
+
+
+def shutdown_rag_services() -> None:
+    """Shutdown do app: descarta as instâncias e encerra o pool de threads do RAG."""
+    global _executor
+    with _services_lock:
+        _services.clear()
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _get_executor(max_workers: int) -> ThreadPoolExecutor:
+    """Pool de threads do RAG, criado no primeiro uso."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="rag"
+            )
+        return _executor
+
+
+def _content_key(doc: Any) -> str:
+    return _normalize(doc.page_content)
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
@@ -13,6 +13,7 @@ from app.threat_analysis.llm import (
     OpenAIConnection,
     run_vision_with_fallback,
 )
+from app.threat_analysis.llm.structured_output import DIAGRAM_OUTPUT
 
 logger = get_logger("agents.diagram")
 
@@ -21,20 +22,21 @@ Analyze this architecture diagram.
 
 1. Identify all components (Users, Servers, Databases, Gateways, Load Balancers, etc.).
 2. Identify the connections and data flows between them.
-3. Identify trust boundaries (e.g., VPCs, Public/Private subnets, DMZs).
+3. Identify trust boundaries (e.g., VPCs, Public/Private subnets, DMZs) and the components inside each one.
 
 Return ONLY a valid JSON object structured as:
 {
   "model": "model_name",
   "components": [{"id": "unique_id", "type": "ComponentType", "name": "Display Name"}],
   "connections": [{"from": "source_id", "to": "target_id", "protocol": "HTTPS/HTTP/TCP/etc"}],
-  "boundaries": ["boundary name 1", "boundary name 2"]
+  "boundaries": [{"name": "Boundary name", "components": ["unique_id"]}]
 }
 
 Important:
 - Each component must have a unique id
 - Use descriptive component types (User, Server, Database, Gateway, LoadBalancer, Cache, Queue, API, Service)
 - Include the communication protocol for each connection when visible
+- List in each boundary the ids of the components drawn inside it; components outside every boundary (e.g. Internet users) belong to none
 """
 
 CONNECTION_ORDER = [GeminiConnection, OpenAIConnection, OllamaConnection]
@@ -70,6 +72,8 @@ class DiagramAgent(BaseAgent):
             cache_set=self._cache.set,
             cache_key_prefix="diagram",
             validate=_validate_diagram_result,
+            structured_output=DIAGRAM_OUTPUT,
+            model_tier=self.settings.diagram_model_tier,
         )
 
         if "error" in result:
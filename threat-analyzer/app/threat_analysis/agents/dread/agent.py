@@ -12,8 +12,10 @@ from app.threat_analysis.llm import (
     LLMCacheService,
     OllamaConnection,
     OpenAIConnection,
+    is_partial_result,
     run_text_with_fallback,
 )
+from app.threat_analysis.llm.structured_output import DREAD_OUTPUT
 
 logger = get_logger("agents.dread")
 
@@ -27,19 +29,19 @@ DREAD is a risk assessment model that scores threats on 5 dimensions (each 1-10)
 - Affected Users (A): How many users would be affected?
 - Discoverability (D): How easy is it to discover the vulnerability?
 
-Be consistent and realistic in your scoring."""
-
-DREAD_USER_PROMPT = """Score the following threats using DREAD methodology.
-
-Threats to score:
-{threats}
+Be consistent and realistic in your scoring.
 
+Score the threats given by the user using DREAD methodology.
 For each threat, return the original threat object with added DREAD scoring:
 - dread_score: the average of all 5 DREAD scores (rounded to 2 decimal places)
 - dread_details: object with individual scores (damage, reproducibility, exploitability, affected_users, discoverability)
 
 Return ONLY a JSON list with the scored threats."""
 
+# Only the variable threats: the system prompt above is the static, provider-cacheable prefix
+DREAD_USER_PROMPT = """Threats to score:
+{threats}"""
+
 CONNECTION_ORDER = [GeminiConnection, OpenAIConnection, OllamaConnection]
 
 
@@ -74,11 +76,21 @@ class DreadAgent(BaseAgent):
             cache_set=self._cache.set,
             cache_key_prefix="dread",
             validate=_validate_dread_result,
+            max_continuations=self.settings.llm_max_continuations,
+            structured_output=DREAD_OUTPUT,
+            model_tier=self.settings.dread_model_tier,
         )
         if "error" in result:
             logger.error("DREAD scoring failed: %s", result.get("error"))
             return threats  # Return original without scores
         scored = result if isinstance(result, list) else threats
+        if is_partial_result(scored):
+            logger.warning(
+                "DREAD scoring truncated: %d of %d threats scored",
+                len(scored),
+                len(threats),
+            )
+            scored = [*scored, *threats[len(scored) :]]
         for t in scored:
             if "dread_score" in t:
                 t["dread_score"] = max(1, min(10, t["dread_score"]))
@@ -1,19 +1,25 @@
 """STRIDE threat analysis agent with RAG support and LLM fallback."""
 
+import asyncio
 from typing import Any
 
 from threat_modeling_shared.logging import get_logger
 
 from app.config import Settings
-from app.services.rag_service import RAGService
+from app.services.context_packing import pack_context
+from app.services.rag_service import get_rag_service
 from app.threat_analysis.agents.base import BaseAgent
+from app.threat_analysis.graph import DiagramGraph, Edge
 from app.threat_analysis.llm import (
     GeminiConnection,
     LLMCacheService,
     OllamaConnection,
     OpenAIConnection,
+    is_partial_result,
     run_text_with_fallback,
 )
+from app.threat_analysis.llm.structured_output import STRIDE_OUTPUT
+from app.threat_analysis.stride_rules import get_rule_engine
 
 logger = get_logger("agents.stride")
 
@@ -30,9 +36,21 @@ STRIDE Categories:
 
 For each component and connection in the architecture, identify potential threats and provide actionable mitigations.
 
-{context}"""
+Identify all STRIDE threats. Return a JSON list of threat objects:
+[
+  {
+    "component_id": "affected_component_id",
+    "threat_type": "Spoofing|Tampering|Repudiation|Information Disclosure|Denial of Service|Elevation of Privilege",
+    "description": "Clear description of the threat",
+    "mitigation": "Specific actionable mitigation"
+  }
+]
+
+Be thorough - analyze each component and connection for potential threats.
+Return ONLY the JSON list, no additional text."""
 
-STRIDE_USER_PROMPT = """Based on this architecture diagram analysis:
+# Only diagram data: the system prompt above is the static, provider-cacheable prefix
+STRIDE_USER_PROMPT = """Architecture diagram analysis:
 
 Components:
 {components}
@@ -41,20 +59,26 @@ Connections:
 {connections}
 
 Trust Boundaries:
-{boundaries}
+{boundaries}"""
 
-Identify all STRIDE threats. Return a JSON list of threat objects:
-[
-  {{
-    "component_id": "affected_component_id",
-    "threat_type": "Spoofing|Tampering|Repudiation|Information Disclosure|Denial of Service|Elevation of Privilege",
-    "description": "Clear description of the threat",
-    "mitigation": "Specific actionable mitigation"
-  }}
-]
+# Appended to the user prompt in stride_rule_mode="delta"
+STRIDE_BASELINE_PROMPT = """
 
-Be thorough - analyze each component and connection for potential threats.
-Return ONLY the JSON list, no additional text."""
+Baseline threats (already reported by deterministic rules). Do not repeat them;
+return only threats beyond this baseline:
+{baseline}"""
+
+# Appended to the user prompt: per-diagram RAG context stays out of the static
+# system prompt so the provider-cached prefix is identical across diagrams
+STRIDE_CONTEXT_PROMPT = """
+
+Relevant context:
+{context}"""
+
+# Retrieval query for diagrams without component types or protocols
+GENERIC_RAG_QUERY = (
+    "What are typical STRIDE threats for web applications and microservices?"
+)
 
 CONNECTION_ORDER = [GeminiConnection, OpenAIConnection, OllamaConnection]
 
@@ -70,37 +94,56 @@ class StrideAgent(BaseAgent):
     def __init__(self, settings: Settings) -> None:
         self.settings = settings
         self._cache = LLMCacheService(redis_url=settings.redis_url)
-        self._rag_service = RAGService(settings)
+        self._rag_service = get_rag_service(settings)
 
-    @property
-    def _retriever(self) -> Any | None:
-        """Retriever RAG com cache (construído uma vez por processo pelo RAGService)."""
-        return self._rag_service.get_retriever()
-
-    async def analyze(self, diagram_data: dict[str, Any]) -> list[dict[str, Any]]:
-        """Analyze diagram for STRIDE threats."""
+    async def analyze(
+        self, diagram_data: dict[str, Any], graph: DiagramGraph | None = None
+    ) -> list[dict[str, Any]]:
+        """Analyze diagram for STRIDE threats (graph: prebuilt graph of diagram_data)."""
         logger.info("Starting STRIDE analysis")
+        mode = self.settings.stride_rule_mode
+        focus = self.settings.stride_graph_focus
+        rules = get_rule_engine(self.settings.stride_rules_path)
+        graph = graph or rules.graph(diagram_data)
+        baseline = [] if mode == "off" else rules.baseline(diagram_data, graph)
         context = ""
-        retriever = self._retriever
-        if retriever:
-            try:
-                docs = retriever.get_relevant_documents(
-                    "What are typical STRIDE threats for web applications and microservices?"
-                )
-                context = "\n\nRelevant context:\n" + "\n".join(
-                    [d.page_content for d in docs[:3]]
-                )
-            except Exception as e:
-                logger.warning("RAG retrieval failed: %s", e)
-        system_content = STRIDE_SYSTEM_PROMPT.format(context=context)
+        try:
+            chunks = await self._rag_service.aretrieve(
+                self._rag_queries(graph), k=self.settings.rag_top_k, scored=True
+            )
+            packed = pack_context(
+                chunks,
+                self.settings.rag_context_max_tokens,
+                self.settings.rag_context_duplicate_threshold,
+            )
+            if packed:
+                context = STRIDE_CONTEXT_PROMPT.format(context=packed)
+        except asyncio.TimeoutError:
+            logger.warning("RAG retrieval timed out, continuing without context")
+        except Exception as e:
+            logger.warning("RAG retrieval failed: %s", e)
+        if focus != "off":
+            components, connections = self._format_graph(
+                graph,
+                diagram_data.get("connections", []),
+                restrict=focus == "restrict"
+                and len(graph.components) >= self.settings.stride_focus_min_components,
+            )
+        else:
+            components = self._format_components(diagram_data.get("components", []))
+            connections = self._format_connections(diagram_data.get("connections", []))
         user_content = STRIDE_USER_PROMPT.format(
-            components=self._format_components(diagram_data.get("components", [])),
-            connections=self._format_connections(diagram_data.get("connections", [])),
-            boundaries=", ".join(diagram_data.get("boundaries", []))
-            or "None identified",
+            components=components,
+            connections=connections,
+            boundaries=self._format_boundaries(diagram_data.get("boundaries", [])),
         )
+        if mode == "delta" and baseline:
+            user_content += STRIDE_BASELINE_PROMPT.format(
+                baseline=self._format_threats(baseline)
+            )
+        user_content += context
         messages = [
-            {"role": "system", "content": system_content},
+            {"role": "system", "content": STRIDE_SYSTEM_PROMPT},
             {"role": "user", "content": user_content},
         ]
         result = await run_text_with_fallback(
@@ -111,11 +154,36 @@ class StrideAgent(BaseAgent):
             cache_set=self._cache.set,
             cache_key_prefix="stride",
             validate=_validate_stride_result,
+            max_continuations=self.settings.llm_max_continuations,
+            structured_output=STRIDE_OUTPUT,
+            model_tier=self.settings.stride_model_tier,
         )
+        if baseline:
+            logger.info(
+                "STRIDE rule baseline: %d threats (%s mode)", len(baseline), mode
+            )
         if "error" in result:
             logger.error("STRIDE analysis failed: %s", result.get("error"))
-            return []
-        return result if isinstance(result, list) else []
+            return baseline
+        if is_partial_result(result):
+            logger.warning("STRIDE output truncated: kept %d threats", len(result))
+        return baseline + (list(result) if isinstance(result, list) else [])
+
+    def _rag_queries(self, graph: DiagramGraph) -> list[str]:
+        """One query per distinct component type, then per protocol, sorted."""
+        types = {
+            t or str(graph.components[cid].get("type") or "").strip()
+            for cid, t in graph.types.items()
+        }
+        queries = [
+            f"STRIDE threats and mitigations for {t} components"
+            for t in sorted(types - {""})
+        ]
+        queries += [
+            f"Security threats of {p} connections"
+            for p in sorted({e.protocol for e in graph.edges} - {""})
+        ]
+        return queries[: self.settings.rag_max_queries] or [GENERIC_RAG_QUERY]
 
     def _format_components(self, components: list[dict[str, Any]]) -> str:
         if not components:
@@ -124,6 +192,12 @@ class StrideAgent(BaseAgent):
             f"- [{c.get('id')}] {c.get('type')}: {c.get('name')}" for c in components
         )
 
+    def _format_threats(self, threats: list[dict[str, Any]]) -> str:
+        return "\n".join(
+            f"- [{t['component_id']}] {t['threat_type']}: {t['description']}"
+            for t in threats
+        )
+
     def _format_connections(self, connections: list[dict[str, Any]]) -> str:
         if not connections:
             return "None identified"
@@ -131,3 +205,78 @@ class StrideAgent(BaseAgent):
             f"- {c.get('from')} -> {c.get('to')} ({c.get('protocol', 'unknown')})"
             for c in connections
         )
+
+    def _format_boundaries(self, boundaries: list[Any]) -> str:
+        """Boundary names, with member ids when the diagram stage listed them."""
+        items = []
+        for b in boundaries or []:
+            if isinstance(b, dict):
+                members = ", ".join(str(m) for m in b.get("components") or [])
+                items.append(
+                    f"{b.get('name')}: {members}" if members else b.get("name")
+                )
+            elif b:
+                items.append(str(b))
+        return "; ".join(str(i) for i in items) or "None identified"
+
+    def _format_graph(
+        self,
+        graph: DiagramGraph,
+        connections: list[dict[str, Any]],
+        restrict: bool,
+    ) -> tuple[str, str]:
+        """Components with zone / entry point / fan-in/out and connections by risk.
+
+        With restrict, only high-risk edges (boundary crossing or plaintext) are
+        listed, with their components, entry points and external actors.
+        """
+        edges = graph.high_risk_edges if restrict else graph.edges
+        edges = sorted(edges, key=lambda e: -e.risk)
+        keep = set(graph.components)
+        if restrict:
+            keep = {e.source for e in edges} | {e.target for e in edges}
+            keep |= graph.entry_points | graph.external
+        component_lines = []
+        for cid, c in graph.components.items():
+            if cid not in keep:
+                continue
+            facts = [f"zone: {graph.zone_label(cid)}"]
+            if cid in graph.entry_points:
+                facts.append("entry point")
+            facts.append(f"fan-in {graph.fan_in(cid)}, fan-out {graph.fan_out(cid)}")
+            component_lines.append(
+                f"- [{cid}] {c.get('type')}: {c.get('name')} ({'; '.join(facts)})"
+            )
+        connection_lines = [self._format_edge(graph, e) for e in edges]
+        if restrict:
+            connection_lines.append(
+                f"(Omitted: {len(graph.components) - len(keep)} components, "
+                f"{len(graph.edges) - len(edges)} lower-risk connections)"
+            )
+        else:
+            # Connections to ids missing from the component list are kept as-is
+            connection_lines += [
+                self._format_connections([c])
+                for c in connections
+                if str(c.get("from")) not in graph.components
+                or str(c.get("to")) not in graph.components
+            ]
+        return (
+            "\n".join(component_lines) or "None identified",
+            "\n".join(connection_lines) or "None identified",
+        )
+
+    @staticmethod
+    def _format_edge(graph: DiagramGraph, edge: Edge) -> str:
+        tags = []
+        if edge.crosses_boundary:
+            tags.append(
+                f"crosses boundary: {graph.zone_label(edge.source)}"
+                f" -> {graph.zone_label(edge.target)}"
+            )
+        if edge.encrypted is False:
+            tags.append("unencrypted")
+        elif edge.encrypted is None:
+            tags.append("encryption unknown")
+        line = f"- {edge.source} -> {edge.target} ({edge.protocol or 'unknown'})"
+        return f"{line} [{', '.join(tags)}]" if tags else line
@@ -0,0 +1,148 @@
+"""Attack paths from entry points to sensitive assets over the diagram graph.
+
+Each component gets a compromise likelihood from its threats (highest DREAD
+score / 10, at least MIN_NODE_LIKELIHOOD) and each hop is weighted by the edge
+(boundary crossing, plaintext or unknown encryption: Edge.risk). The likelihood
+of a path is the product of its hops, so scores propagate along edges and
+longer paths are less likely; risk_score = 10 x likelihood.
+
+The k most likely simple paths from User/ExternalService components to
+Database/Storage components are found by best-first (A*) search on
+cost = -log(hop likelihood). The heuristic is the exact best cost from each node
+to any asset, memoized by one reverse Dijkstra; nodes that cannot reach an asset
+are never expanded, each node is expanded at most k times and paths are bounded
+by max_hops, so the search stays O(k·E·log) on diagrams of hundreds of nodes.
+"""
+
+import heapq
+import math
+from collections.abc import Iterable
+from typing import Any
+
+from .graph import DiagramGraph, Edge
+from .schemas.component import ComponentType
+
+ENTRY_TYPES = frozenset(
+    {ComponentType.USER.value, ComponentType.EXTERNAL_SERVICE.value}
+)
+ASSET_TYPES = frozenset({ComponentType.DATABASE.value, ComponentType.STORAGE.value})
+# Components without scored threats still relay an attacker, with low likelihood
+MIN_NODE_LIKELIHOOD = 0.1
+# Hop weight 0.6 (encrypted, inside one boundary) to 1.0 (Edge.risk 4)
+EDGE_BASE_FACTOR = 0.6
+EDGE_RISK_STEP = 0.1
+
+
+def node_likelihoods(
+    graph: DiagramGraph, threats: Iterable[dict[str, Any]]
+) -> dict[str, float]:
+    """Component id -> compromise likelihood (0-1) from its highest DREAD score."""
+    best: dict[str, float] = {}
+    for threat in threats:
+        score = threat.get("dread_score")
+        if isinstance(score, int | float):
+            cid = str(threat.get("component_id"))
+            best[cid] = max(best.get(cid, 0.0), float(score))
+    return {
+        cid: min(1.0, max(MIN_NODE_LIKELIHOOD, best.get(cid, 0.0) / 10))
+        for cid in graph.components
+    }
+
+
+def hop_likelihood(edge: Edge, likelihood: dict[str, float]) -> float:
+    return (EDGE_BASE_FACTOR + EDGE_RISK_STEP * edge.risk) * likelihood[edge.target]
+
+
+def find_attack_paths(
+    graph: DiagramGraph,
+    threats: Iterable[dict[str, Any]],
+    k: int = 5,
+    max_hops: int = 8,
+) -> list[dict[str, Any]]:
+    """Up to k attack paths, most likely first.
+
+    Each path: entry_point, target, component_ids, likelihood (0-1), risk_score
+    (0-10) and boundary_crossings.
+    """
+    likelihood = node_likelihoods(graph, threats)
+    assets = {cid for cid, t in graph.types.items() if t in ASSET_TYPES}
+    entries = [
+        cid for cid, t in graph.types.items() if t in ENTRY_TYPES and cid not in assets
+    ]
+    if k <= 0 or not assets or not entries:
+        return []
+    cost = {edge: -math.log(hop_likelihood(edge, likelihood)) for edge in graph.edges}
+    remaining = _cost_to_assets(graph, assets, cost)
+
+    heap: list[tuple[float, float, int, tuple[str, ...], int]] = []
+    counter = 0
+    for cid in entries:
+        if cid in remaining:
+            heap.append((remaining[cid], 0.0, counter, (cid,), 0))
+            counter += 1
+    heapq.heapify(heap)
+    expanded: dict[str, int] = {}
+    paths: list[dict[str, Any]] = []
+    while heap and len(paths) < k:
+        _, spent, _, path, crossings = heapq.heappop(heap)
+        node = path[-1]
+        if node in assets:
+            probability = math.exp(-spent)
+            paths.append(
+                {
+                    "entry_point": path[0],
+                    "target": node,
+                    "component_ids": list(path),
+                    "likelihood": round(probability, 4),
+                    "risk_score": round(10 * probability, 2),
+                    "boundary_crossings": crossings,
+                }
+            )
+            continue
+        expanded[node] = expanded.get(node, 0) + 1
+        if expanded[node] > k or len(path) > max_hops:
+            continue
+        for edge in graph.out_edges.get(node, ()):
+            target = edge.target
+            if target in path or target not in remaining:
+                continue
+            reached = spent + cost[edge]
+            heapq.heappush(
+                heap,
+                (
+                    reached + remaining[target],
+                    reached,
+                    counter,
+                    (*path, target),
+                    crossings + edge.crosses_boundary,
+                ),
+            )
+            counter += 1
+    return paths
+
+
+def path_risk_score(paths: list[dict[str, Any]]) -> float:
+    """Probability (x10) that at least one path succeeds, paths taken as independent."""
+    survival = 1.0
+    for path in paths:
+        survival *= 1 - path["likelihood"]
+    return round(10 * (1 - survival), 2)
+
+
+def _cost_to_assets(
+    graph: DiagramGraph, assets: set[str], cost: dict[Edge, float]
+) -> dict[str, float]:
+    """Best cost from each node to any asset (reverse Dijkstra); unreachable omitted."""
+    best = dict.fromkeys(assets, 0.0)
+    heap = [(0.0, cid) for cid in assets]
+    heapq.heapify(heap)
+    while heap:
+        distance, node = heapq.heappop(heap)
+        if distance > best[node]:
+            continue
+        for edge in graph.in_edges.get(node, ()):
+            candidate = distance + cost[edge]
+            if candidate < best.get(edge.source, math.inf):
+                best[edge.source] = candidate
+                heapq.heappush(heap, (candidate, edge.source))
+    return best
@@ -0,0 +1,170 @@
+"""Near-duplicate consolidation of STRIDE threats before DREAD scoring.
+
+LLMs often repeat a threat in other words ("SQL injection in API" / "API is
+vulnerable to SQL injection"), which the exact (threat_type, description) key of
+ThreatModelService._parse_threats does not catch. Threats of the same
+(component_id, threat_type) are compared by the Jaccard similarity of their word
+shingles: MinHash signatures split into LSH bands find candidate pairs in
+expected linear time, and candidates at or above the threshold (exact Jaccard of
+the shingle sets) are merged into the first threat seen: it is kept, and the
+distinct mitigations of its duplicates are appended to its own.
+"""
+
+import random
+import re
+import zlib
+from collections import defaultdict
+from typing import Any
+
+from threat_modeling_shared.logging import get_logger
+
+logger = get_logger("consolidation")
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Words that carry no threat meaning (English and Portuguese, as emitted by the LLM)
+_STOPWORDS = frozenset(
+    """a an and are as at be by can could for from has have in into is it its may
+    might of on or that the this through to via was were which while with without
+    o os as um uma de do da dos das em no na nos nas por pelo pela para com sem que
+    e ou ser pode podem se ao aos""".split()
+)
+
+
+def shingles(text: str, size: int = 1) -> set[str]:
+    """Word n-grams of the lowercased text without stopwords."""
+    tokens = [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+    if len(tokens) <= size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i : i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def _permutations(num_perm: int, seed: int = 1) -> list[tuple[int, int]]:
+    rng = random.Random(seed)
+    return [
+        (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(_MERSENNE_PRIME))
+        for _ in range(num_perm)
+    ]
+
+
+def minhash_signature(
+    items: set[str],
+    permutations: list[tuple[int, int]],
+    memo: dict[str, tuple[int, ...]] | None = None,
+) -> tuple[int, ...]:
+    """Minimum of each universal hash (a * crc32 + b) mod p over the shingles.
+
+    memo keeps the hashed shingles across calls (threats share most words).
+    """
+    if memo is None:
+        memo = {}
+    vectors = []
+    for item in items:
+        vector = memo.get(item)
+        if vector is None:
+            h = zlib.crc32(item.encode())
+            vector = memo[item] = tuple(
+                (a * h + b) % _MERSENNE_PRIME for a, b in permutations
+            )
+        vectors.append(vector)
+    return tuple(map(min, zip(*vectors, strict=True)))
+
+
+def jaccard(left: set[str], right: set[str]) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def consolidate_threats(
+    threats: list[dict[str, Any]],
+    threshold: float = 0.7,
+    num_perm: int = 32,
+    bands: int = 16,
+    shingle_size: int = 1,
+) -> list[dict[str, Any]]:
+    """Merge threats whose description is a near duplicate of an earlier one.
+
+    Only threats with the same component_id and threat_type are compared; order
+    is kept and the first threat of each near-duplicate group survives, with the
+    distinct mitigations of the others appended (one per line).
+
+    Args:
+        threats: Raw STRIDE threats.
+        threshold: Minimum Jaccard similarity of the description shingles.
+        num_perm: MinHash signature length.
+        bands: LSH bands (num_perm / bands rows each); more bands find more
+            candidates at lower similarity, each verified against threshold.
+        shingle_size: Words per shingle.
+
+    Returns:
+        The threats that were kept (copies where mitigations were merged).
+    """
+    rows = max(num_perm // max(bands, 1), 1)
+    permutations = _permutations(rows * max(bands, 1))
+
+    groups: dict[tuple[str, str], list[int]] = defaultdict(list)
+    for index, threat in enumerate(threats):
+        groups[_group_key(threat)].append(index)
+
+    memo: dict[str, tuple[int, ...]] = {}
+    dropped: set[int] = set()
+    # Surviving threat -> mitigations of its duplicates
+    absorbed: dict[int, list[str]] = defaultdict(list)
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        buckets: dict[tuple[int, tuple[int, ...]], list[int]] = defaultdict(list)
+        kept: dict[int, set[str]] = {}
+        for index in members:
+            items = shingles(str(threats[index].get("description") or ""), shingle_size)
+            if not items:
+                continue
+            signature = minhash_signature(items, permutations, memo)
+            band_keys = [
+                (band, signature[band * rows : (band + 1) * rows])
+                for band in range(len(permutations) // rows)
+            ]
+            candidates = {c for key in band_keys for c in buckets.get(key, ())}
+            survivor = next(
+                (c for c in sorted(candidates) if jaccard(items, kept[c]) >= threshold),
+                None,
+            )
+            if survivor is not None:
+                dropped.add(index)
+                absorbed[survivor].append(str(threats[index].get("mitigation") or ""))
+                continue
+            kept[index] = items
+            for key in band_keys:
+                buckets[key].append(index)
+
+    if dropped:
+        logger.info(
+            "Consolidated near-duplicate threats: %d -> %d",
+            len(threats),
+            len(threats) - len(dropped),
+        )
+    return [
+        _with_mitigations(t, absorbed[i]) if i in absorbed else t
+        for i, t in enumerate(threats)
+        if i not in dropped
+    ]
+
+
+def _with_mitigations(threat: dict[str, Any], others: list[str]) -> dict[str, Any]:
+    """Copy of threat with the distinct (case/space-insensitive) mitigations added."""
+    mitigations: dict[str, str] = {}
+    for text in [str(threat.get("mitigation") or ""), *others]:
+        text = text.strip()
+        key = " ".join(text.lower().split())
+        if key:
+            mitigations.setdefault(key, text)
+    if len(mitigations) < 2:
+        return threat
+    return {**threat, "mitigation": "\n".join(mitigations.values())}
+
+
+def _group_key(threat: dict[str, Any]) -> tuple[str, str]:
+    component = str(threat.get("component_id") or "").strip().lower()
+    threat_type = str(threat.get("threat_type") or "").strip().lower()
+    return component, threat_type
@@ -3,6 +3,7 @@
 from threat_modeling_shared.logging import get_logger
 
 from app.config import Settings
+from app.threat_analysis.deadline import Deadline
 from app.threat_analysis.exceptions import InvalidFileTypeError, ThreatModelingError
 from app.threat_analysis.schemas import AnalysisResponse
 from app.threat_analysis.service import ThreatModelService
@@ -21,12 +22,15 @@ class ThreatAnalysisController:
         self,
         image_bytes: bytes,
         content_type: str | None = None,
+        timeout_seconds: float | None = None,
     ) -> AnalysisResponse:
         """Execute full threat analysis on an architecture diagram.
 
         Args:
             image_bytes: Raw image content.
             content_type: MIME type of the upload (e.g. image/png). Validated against allowed_image_types.
+            timeout_seconds: Caller's remaining budget (X-Request-Timeout); defaults to
+                analysis_timeout_seconds.
 
         Returns:
             Complete analysis response with components, threats, and risk.
@@ -37,9 +41,17 @@ class ThreatAnalysisController:
         """
         self._validate_input(image_bytes, content_type)
 
-        logger.info("Running analysis: size=%d bytes", len(image_bytes))
+        if timeout_seconds is None or timeout_seconds <= 0:
+            timeout_seconds = self._settings.analysis_timeout_seconds
+        logger.info(
+            "Running analysis: size=%d bytes, deadline=%.0fs",
+            len(image_bytes),
+            timeout_seconds,
+        )
 
-        result = await self._service.run_full_analysis(image_bytes)
+        result = await self._service.run_full_analysis(
+            image_bytes, deadline=Deadline.after(timeout_seconds)
+        )
         return result
 
     def _validate_input(
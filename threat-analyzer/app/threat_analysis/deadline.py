@@ -0,0 +1,60 @@
+"""Request deadline shared by the pipeline stages and LLM provider attempts.
+
+The deadline comes from the X-Request-Timeout header sent by threat-service, or
+defaults to Settings.analysis_timeout_seconds. Each stage runs under a slice of
+the remaining budget (deadline_scope), and the fallback runner bounds every
+provider attempt by a share of the stage's remaining time, so a slow provider is
+cancelled early enough for the next one to answer.
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout"
+
+
+class Deadline:
+    """Absolute point in time (monotonic clock) by which work must finish."""
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, expires_at: float) -> None:
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + max(seconds, 0.0))
+
+    def remaining(self) -> float:
+        """Seconds left (never negative)."""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def slice(self, fraction: float) -> "Deadline":
+        """Deadline for fraction of the remaining time (never later than self)."""
+        return Deadline.after(self.remaining() * min(max(fraction, 0.0), 1.0))
+
+
+_current_deadline: ContextVar[Deadline | None] = ContextVar(
+    "request_deadline", default=None
+)
+
+
+def current_deadline() -> Deadline | None:
+    """Deadline of the stage being executed, or None when unbounded."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Deadline | None) -> Iterator[Deadline | None]:
+    """Run the block under deadline (None = unbounded)."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
@@ -0,0 +1,206 @@
+"""Local DREAD pre-scorer: only threats it is unsure about go to the DREAD LLM.
+
+Each threat becomes a feature row (bias, STRIDE category, component type, whether
+a connection of the component is unencrypted and whether it crosses a trust
+boundary, from the diagram graph) and the five DREAD dimensions are predicted for
+all threats at once as clip(round(X @ W), 1, 10). W is a lookup table written as a
+linear model (dread_prescorer.json); fit() re-estimates it by ridge regression
+from historical results (scripts/train_dread_prescorer.py).
+
+Confidence is the per-category value of the model times penalties for unknown
+component types or encryption. Threats at or above the configured minimum get
+local scores; the rest are scored by DreadAgent.
+"""
+
+import json
+from collections.abc import Iterable
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .graph import DiagramGraph
+from .schemas.component import ComponentType
+from .schemas.threat import StrideCategory
+from .stride_rules import StrideRuleEngine, get_rule_engine
+
+DEFAULT_MODEL_PATH = Path(__file__).resolve().parent / "dread_prescorer.json"
+DIMENSIONS = (
+    "damage",
+    "reproducibility",
+    "exploitability",
+    "affected_users",
+    "discoverability",
+)
+FEATURES = (
+    "bias",
+    *(f"threat_type={c.value}" for c in StrideCategory),
+    *(f"component={t.value}" for t in ComponentType),
+    "plaintext",
+    "crosses_boundary",
+)
+_CATEGORIES = {c.value.lower(): c.value for c in StrideCategory}
+
+
+class DreadPrescorer:
+    """Vectorized DREAD prediction and confidence for a list of threats."""
+
+    def __init__(
+        self, model: dict[str, Any], rules: StrideRuleEngine | None = None
+    ) -> None:
+        self._rules = rules or get_rule_engine()
+        weights = model.get("weights", {})
+        self.weights = np.array(
+            [weights.get(name, [0.0] * len(DIMENSIONS)) for name in FEATURES],
+            dtype=float,
+        )
+        self.confidence = dict(model.get("confidence", {}))
+        self._index = {name: i for i, name in enumerate(FEATURES)}
+
+    @classmethod
+    def from_file(cls, path: Path) -> "DreadPrescorer":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def features(
+        self,
+        threats: list[dict[str, Any]],
+        diagram_data: dict[str, Any],
+        graph: DiagramGraph | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Feature matrix (threats x FEATURES) and per-threat confidence."""
+        facts = self._component_facts(graph or self._rules.graph(diagram_data))
+        matrix = np.zeros((len(threats), len(FEATURES)))
+        matrix[:, 0] = 1.0
+        confidence = np.zeros(len(threats))
+        for row, threat in enumerate(threats):
+            category = _CATEGORIES.get(str(threat.get("threat_type", "")).lower())
+            if category is None:
+                continue
+            matrix[row, self._index[f"threat_type={category}"]] = 1.0
+            score = self.confidence.get(f"threat_type={category}", 0.0)
+            component = facts.get(str(threat.get("component_id")), {})
+            ctype = component.get("type")
+            if ctype:
+                matrix[row, self._index[f"component={ctype}"]] = 1.0
+            else:
+                score *= self.confidence.get("unknown_component", 1.0)
+            matrix[row, self._index["plaintext"]] = component.get("plaintext", False)
+            matrix[row, self._index["crosses_boundary"]] = component.get(
+                "crosses_boundary", False
+            )
+            if component.get("unknown_encryption"):
+                score *= self.confidence.get("unknown_encryption", 1.0)
+            confidence[row] = score
+        return matrix, confidence
+
+    def predict(
+        self,
+        threats: list[dict[str, Any]],
+        diagram_data: dict[str, Any],
+        graph: DiagramGraph | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Integer DREAD scores (threats x DIMENSIONS, 1-10) and confidence (0-1)."""
+        matrix, confidence = self.features(threats, diagram_data, graph)
+        scores = np.clip(np.rint(matrix @ self.weights), 1, 10).astype(int)
+        return scores, confidence
+
+    def split(
+        self,
+        threats: list[dict[str, Any]],
+        diagram_data: dict[str, Any],
+        min_confidence: float,
+        graph: DiagramGraph | None = None,
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """(threats scored locally, threats left for the LLM), each in input order."""
+        if not threats:
+            return [], []
+        scores, confidence = self.predict(threats, diagram_data, graph)
+        scored, uncertain = [], []
+        for threat, row, conf in zip(threats, scores, confidence, strict=True):
+            if conf < min_confidence:
+                uncertain.append(threat)
+                continue
+            details = dict(zip(DIMENSIONS, row.tolist(), strict=True))
+            scored.append(
+                {
+                    **threat,
+                    "dread_score": round(sum(details.values()) / len(DIMENSIONS), 2),
+                    "dread_details": details,
+                }
+            )
+        return scored, uncertain
+
+    @staticmethod
+    def _component_facts(graph: DiagramGraph) -> dict[str, dict]:
+        """Per component id: canonical type, plaintext / unknown encryption, crossing."""
+        facts = {}
+        for cid, ctype in graph.types.items():
+            edges = graph.incident(cid)
+            plaintext = any(e.encrypted is False for e in edges)
+            facts[cid] = {
+                "type": ctype,
+                "plaintext": plaintext,
+                "unknown_encryption": not plaintext
+                and any(e.encrypted is None for e in edges),
+                "crosses_boundary": any(e.crosses_boundary for e in edges),
+            }
+        return facts
+
+
+def fit(
+    samples: Iterable[tuple[dict[str, Any], list[dict[str, Any]]]],
+    base: dict[str, Any] | None = None,
+    ridge: float = 1.0,
+    min_samples: int = 10,
+) -> dict[str, Any]:
+    """Ridge-regression model from (diagram_data, scored threats) pairs.
+
+    Threats without dread_details are skipped. Category confidence becomes
+    1 - RMSE / 3 on the training data (0 below min_samples threats, so those
+    categories keep going to the LLM); penalties are kept from base.
+    """
+    base = base or json.loads(DEFAULT_MODEL_PATH.read_text(encoding="utf-8"))
+    scorer = DreadPrescorer(base)
+    rows, targets, categories = [], [], []
+    for diagram_data, threats in samples:
+        labelled = [t for t in threats if isinstance(t.get("dread_details"), dict)]
+        if not labelled:
+            continue
+        matrix, _ = scorer.features(labelled, diagram_data)
+        rows.append(matrix)
+        targets.extend([[t["dread_details"][d] for d in DIMENSIONS] for t in labelled])
+        categories.extend(
+            _CATEGORIES.get(str(t.get("threat_type", "")).lower()) for t in labelled
+        )
+    if not rows:
+        raise ValueError("No scored threats to train on")
+    x, y = np.vstack(rows), np.asarray(targets, dtype=float)
+    weights = np.linalg.solve(x.T @ x + ridge * np.eye(x.shape[1]), x.T @ y)
+    errors = np.sqrt(((x @ weights - y) ** 2).mean(axis=1))
+
+    confidence = {k: v for k, v in base.get("confidence", {}).items() if "=" not in k}
+    labels = np.asarray(categories, dtype=object)
+    for category in _CATEGORIES.values():
+        mask = labels == category
+        if mask.sum() >= min_samples:
+            rmse = float(np.sqrt((errors[mask] ** 2).mean()))
+            confidence[f"threat_type={category}"] = round(max(0.0, 1 - rmse / 3), 3)
+        else:
+            confidence[f"threat_type={category}"] = 0.0
+    return {
+        "version": 1,
+        "dimensions": list(DIMENSIONS),
+        "samples": len(y),
+        "weights": {
+            name: [round(float(w), 4) for w in row]
+            for name, row in zip(FEATURES, weights, strict=True)
+        },
+        "confidence": confidence,
+    }
+
+
+@lru_cache
+def get_prescorer(path: Path | None = None) -> DreadPrescorer:
+    """Pre-scorer for path (default: bundled dread_prescorer.json), loaded once."""
+    return DreadPrescorer.from_file(path or DEFAULT_MODEL_PATH)
@@ -63,3 +63,15 @@ class ArchitectureDiagramValidationError(ThreatModelingError):
         self.reason = reason
         self.details = details or {}
         super().__init__(message=reason, details=self.details)
+
+
+class CassetteMissError(ThreatModelingError):
+    """Raised in replay mode when no cassette was recorded for an LLM request."""
+
+    error_type = "cassette_miss"
+
+    def __init__(self, fingerprint: str, directory: str) -> None:
+        super().__init__(
+            message=f"No cassette for request {fingerprint[:12]} in {directory}",
+            details={"fingerprint": fingerprint, "directory": directory},
+        )
@@ -0,0 +1,169 @@
+"""Indexed graph of the extracted diagram: adjacency, trust boundaries and edge risk.
+
+DiagramGraph turns diagram_data (loose dicts from the diagram stage) into
+adjacency lists with protocol/encryption attributes per edge, component →
+trust-boundary membership, boundary-crossing edges, entry points and fan-in /
+fan-out, computed once so STRIDE prompts, the rule baseline and DREAD
+pre-scoring share them.
+
+A connection crosses a trust boundary when its ends belong to different sets of
+boundaries. Older diagram outputs list boundary names only (no membership); then
+the zone of a component is "external" for external types (users, clients, third
+parties) and "internal" otherwise.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Protocol
+
+
+class ComponentClassifier(Protocol):
+    """Type/encryption lookups of the STRIDE rule set (StrideRuleEngine)."""
+
+    def component_type(self, raw: Any) -> str | None: ...
+
+    def encrypted(self, connection: dict[str, Any]) -> bool | None: ...
+
+    def is_external(self, component_type: str | None) -> bool: ...
+
+
+@dataclass(frozen=True, slots=True)
+class Edge:
+    """Directed connection between two known components."""
+
+    source: str
+    target: str
+    protocol: str
+    encrypted: bool | None
+    crosses_boundary: bool
+
+    @property
+    def risk(self) -> int:
+        """Ordering weight: boundary crossing 2, plaintext 2, unknown encryption 1."""
+        return (
+            2 * self.crosses_boundary
+            + 2 * (self.encrypted is False)
+            + (self.encrypted is None)
+        )
+
+    @property
+    def high_risk(self) -> bool:
+        return self.crosses_boundary or self.encrypted is False
+
+
+@dataclass
+class DiagramGraph:
+    """Components, edges and derived boundary facts of one diagram."""
+
+    components: dict[str, dict[str, Any]]
+    types: dict[str, str | None]
+    edges: list[Edge]
+    boundaries: dict[str, list[str]]
+    zones: dict[str, frozenset[str]]
+    out_edges: dict[str, list[Edge]] = field(default_factory=dict)
+    in_edges: dict[str, list[Edge]] = field(default_factory=dict)
+    # External actors, and components they reach across a boundary (attack surface)
+    external: frozenset[str] = frozenset()
+    entry_points: frozenset[str] = frozenset()
+
+    @classmethod
+    def from_diagram(
+        cls, diagram_data: dict[str, Any], classifier: ComponentClassifier
+    ) -> "DiagramGraph":
+        components = {
+            str(c.get("id")): c
+            for c in diagram_data.get("components", [])
+            if c.get("id") is not None
+        }
+        types = {
+            cid: classifier.component_type(c.get("type"))
+            for cid, c in components.items()
+        }
+        boundaries = _boundary_members(diagram_data.get("boundaries", []), components)
+        if any(boundaries.values()):
+            membership: dict[str, set[str]] = defaultdict(set)
+            for name, members in boundaries.items():
+                for cid in members:
+                    membership[cid].add(name)
+            zones = {cid: frozenset(membership.get(cid, ())) for cid in components}
+        else:
+            zones = {
+                cid: frozenset(
+                    ["external" if classifier.is_external(types[cid]) else "internal"]
+                )
+                for cid in components
+            }
+
+        edges = []
+        out_edges: dict[str, list[Edge]] = defaultdict(list)
+        in_edges: dict[str, list[Edge]] = defaultdict(list)
+        for connection in diagram_data.get("connections", []):
+            source, target = str(connection.get("from")), str(connection.get("to"))
+            if source not in components or target not in components:
+                continue
+            edge = Edge(
+                source=source,
+                target=target,
+                protocol=str(connection.get("protocol") or "").strip().upper(),
+                encrypted=classifier.encrypted(connection),
+                crosses_boundary=zones[source] != zones[target],
+            )
+            edges.append(edge)
+            out_edges[source].append(edge)
+            in_edges[target].append(edge)
+        external = frozenset(
+            cid for cid in components if classifier.is_external(types[cid])
+        )
+        return cls(
+            components=components,
+            types=types,
+            edges=edges,
+            boundaries=boundaries,
+            zones=zones,
+            out_edges=dict(out_edges),
+            in_edges=dict(in_edges),
+            external=external,
+            entry_points=frozenset(
+                e.target
+                for e in edges
+                if e.crosses_boundary
+                and e.source in external
+                and e.target not in external
+            ),
+        )
+
+    def fan_in(self, cid: str) -> int:
+        return len(self.in_edges.get(cid, ()))
+
+    def fan_out(self, cid: str) -> int:
+        return len(self.out_edges.get(cid, ()))
+
+    def incident(self, cid: str) -> list[Edge]:
+        return [*self.in_edges.get(cid, ()), *self.out_edges.get(cid, ())]
+
+    @property
+    def crossing_edges(self) -> list[Edge]:
+        return [e for e in self.edges if e.crosses_boundary]
+
+    @property
+    def high_risk_edges(self) -> list[Edge]:
+        """Boundary-crossing or unencrypted edges, riskiest first."""
+        return sorted((e for e in self.edges if e.high_risk), key=lambda e: -e.risk)
+
+    def zone_label(self, cid: str) -> str:
+        return ", ".join(sorted(self.zones.get(cid, ()))) or "outside"
+
+
+def _boundary_members(
+    raw: list[Any], components: dict[str, dict[str, Any]]
+) -> dict[str, list[str]]:
+    """Boundary name -> known member ids; plain names (no membership) map to []."""
+    boundaries: dict[str, list[str]] = {}
+    for item in raw or []:
+        if isinstance(item, dict):
+            name = str(item.get("name") or f"boundary-{len(boundaries) + 1}")
+            members = [str(m) for m in item.get("components") or []]
+            boundaries[name] = [m for m in members if m in components]
+        elif item:
+            boundaries.setdefault(str(item), [])
+    return boundaries
@@ -18,6 +18,7 @@ from app.threat_analysis.llm import (
     OpenAIConnection,
     run_vision_with_fallback,
 )
+from app.threat_analysis.llm.structured_output import GUARDRAIL_OUTPUT
 
 logger = get_logger("guardrails.architecture")
 
@@ -82,6 +83,8 @@ async def validate_architecture_diagram(
         cache_set=None,
         cache_key_prefix="guardrail",
         validate=_validate_guardrail_result,
+        structured_output=GUARDRAIL_OUTPUT,
+        model_tier=settings.guardrail_model_tier,
     )
 
     if "error" in result:
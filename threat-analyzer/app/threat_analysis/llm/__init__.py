@@ -4,6 +4,8 @@ from .base import LLMConnection
 from .cache import LLMCacheService
 from .fallback import run_text_with_fallback, run_vision_with_fallback
 from .gemini_connection import GeminiConnection
+from .json_extraction import PartialJSONArray, is_partial_result
+from .metrics import collect_llm_metrics, llm_stage, record_llm_call
 from .ollama_connection import OllamaConnection
 from .openai_connection import OpenAIConnection
 
@@ -15,4 +17,9 @@ __all__ = [
     "GeminiConnection",
     "OpenAIConnection",
     "OllamaConnection",
+    "PartialJSONArray",
+    "is_partial_result",
+    "collect_llm_metrics",
+    "llm_stage",
+    "record_llm_call",
 ]
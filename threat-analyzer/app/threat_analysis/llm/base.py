@@ -1,23 +1,73 @@
 """Base LLM connection interface."""
 
+import asyncio
 import base64
 import time
+import weakref
 from abc import ABC, abstractmethod
-from typing import Any
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any, Literal
 
-from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+)
+from langchain_core.messages.ai import add_ai_message_chunks
 from threat_modeling_shared.logging import get_logger
 
+from app.threat_analysis.deadline import current_deadline
+from app.threat_analysis.exceptions import JSONParsingError
+from app.threat_analysis.llm.cassette import (
+    CassetteStore,
+    cassette_store,
+    request_fingerprint,
+)
+from app.threat_analysis.llm.json_extraction import extract_json, salvage_json_array
+from app.threat_analysis.llm.metrics import current_stage, record_llm_call
+from app.threat_analysis.llm.retry import RETRYABLE_ERRORS, backoff_delay, error_details
+from app.threat_analysis.llm.structured_output import StructuredOutput
+from app.threat_analysis.schemas.metrics import LLMCallMetrics
+
+ModelTier = Literal["primary", "fast"]
+
+# Structured-mode failures that warrant one more attempt in plain text mode
+_TEXT_MODE_RETRY_ERRORS = {"processing_error", "invalid_json", "empty"}
+
+# Per event loop and provider: bounds concurrent requests (queue wait is measured)
+_provider_slots: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]
+] = weakref.WeakKeyDictionary()
+
+
+def result_error_type(result: Any) -> str | None:
+    """error_type of an error dict returned by a connection, else None."""
+    if isinstance(result, dict) and "error" in result:
+        return result.get("error_type")
+    return None
+
 
 class LLMConnection(ABC):
     """Abstract base for LLM connection - proxy to a specific LLM service."""
 
+    def __init__(self, settings: Any, model_tier: ModelTier = "primary") -> None:
+        self._settings = settings
+        self._model_tier = model_tier
+        self._llm: Any = None
+
     @property
     @abstractmethod
     def name(self) -> str:
         """Display name for logging."""
         pass
 
+    @property
+    def model_name(self) -> str:
+        """Model used for the configured tier (overridden by each provider)."""
+        return "unknown"
+
     @abstractmethod
     def is_configured(self) -> bool:
         """Check if this connection is properly configured (API key, etc.)."""
@@ -28,42 +78,245 @@ class LLMConnection(ABC):
         """Return the LLM client instance, or None if not available/configured."""
         pass
 
-    @abstractmethod
-    def _parse_json(self, text: str) -> dict[str, Any]:
-        """Parse LLM text response into a result dict (JSON or error structure)."""
-        pass
+    # Provider-native JSON-schema mode; subclasses that support it override both.
+    supports_structured_output: bool = False
+
+    def _bind_structured(self, llm: Any, output: StructuredOutput) -> Any:
+        """Return llm bound to the provider's native structured-output mode.
+
+        Default: no-op (providers without a native mode get the JSON instructions
+        in the prompt and are parsed in text mode).
+        """
+        return llm
+
+    async def _apply_prefix_cache(
+        self, llm: Any, messages: list[BaseMessage]
+    ) -> tuple[Any, list[BaseMessage]]:
+        """Hook for explicit provider-side caching of the static system prompt.
+
+        Default: no-op (OpenAI and Ollama reuse identical prompt prefixes on their own).
+        """
+        return llm, messages
+
+    def _use_structured_output(self, output: StructuredOutput | None) -> bool:
+        return (
+            output is not None
+            and self.supports_structured_output
+            and getattr(self._settings, "llm_structured_output", True)
+        )
+
+    def _parse_json(
+        self, text: str, root_key: str | None = None, expect: type | None = None
+    ) -> dict[str, Any]:
+        """Parse LLM text response into a result dict (JSON or error structure).
+
+        expect is the root type (dict/list) preferred when the text holds several
+        JSON candidates.
+        """
+        if not text:
+            return {
+                "error": "Empty response",
+                "error_type": "empty",
+                "service": self.name,
+            }
+        try:
+            return extract_json(text, expect)
+        except JSONParsingError:
+            salvaged = salvage_json_array(text, root_key=root_key)
+            if salvaged is not None:
+                get_logger(f"llm.{self.name.lower()}").warning(
+                    "LLM %s: truncated JSON array, salvaged %d complete elements",
+                    self.name,
+                    len(salvaged),
+                )
+                return salvaged
+            return {
+                "error": "Invalid JSON response",
+                "error_type": "invalid_json",
+                "service": self.name,
+            }
 
-    async def _invoke(self, coro: Any) -> dict[str, Any]:
-        """Run the given coroutine (e.g. llm.ainvoke(messages)) and return parsed result dict."""
+    @asynccontextmanager
+    async def _concurrency_slot(self) -> AsyncIterator[None]:
+        """Hold one of the provider's llm_max_concurrency slots (0 = unbounded)."""
+        limit = getattr(self._settings, "llm_max_concurrency", 0)
+        if not limit:
+            yield
+            return
+        slots = _provider_slots.setdefault(asyncio.get_running_loop(), {})
+        semaphore = slots.setdefault(self.name, asyncio.Semaphore(limit))
+        async with semaphore:
+            yield
+
+    async def _call(
+        self, runnable: Any, messages: list[BaseMessage], sent: float
+    ) -> tuple[Any, float | None]:
+        """Return (response message, time to first token); streams when enabled."""
+        if not getattr(self._settings, "llm_stream", True) or not hasattr(
+            runnable, "astream"
+        ):
+            return await runnable.ainvoke(messages), None
+        chunks = []
+        ttft = None
+        async for chunk in runnable.astream(messages):
+            if ttft is None:
+                ttft = time.perf_counter() - sent
+            chunks.append(chunk)
+        if not chunks:
+            return None, ttft
+        # One merge at the end: adding chunk by chunk copies the text every time
+        return add_ai_message_chunks(chunks[0], *chunks[1:]), ttft
+
+    async def _invoke(
+        self,
+        runnable: Any,
+        messages: list[BaseMessage],
+        root_key: str | None = None,
+        mode: str = "text",
+        expect: type | None = None,
+    ) -> dict[str, Any]:
+        """Call runnable (LLM, possibly bound) with messages and return parsed result dict.
+
+        Transient and rate-limit errors are retried on this provider with jittered
+        exponential backoff (honoring Retry-After), as long as the wait fits in the
+        current deadline; otherwise the error is returned so the caller fails over.
+        """
+        logger = get_logger(f"llm.{self.name.lower()}")
+        retries = max(getattr(self._settings, "llm_max_retries", 2), 0)
+        for attempt in range(retries + 1):
+            result = await self._invoke_once(runnable, messages, root_key, mode, expect)
+            error_type = result_error_type(result)
+            if error_type not in RETRYABLE_ERRORS or attempt == retries:
+                return result
+            delay = backoff_delay(
+                attempt,
+                getattr(self._settings, "llm_retry_base_delay_seconds", 0.5),
+                getattr(self._settings, "llm_retry_max_delay_seconds", 8.0),
+                retry_after=result.get("retry_after"),
+            )
+            deadline = current_deadline()
+            if deadline is not None and delay >= deadline.remaining():
+                logger.warning(
+                    "LLM %s: %s error, no time left to retry (%.2fs needed)",
+                    self.name,
+                    error_type,
+                    delay,
+                )
+                return result
+            logger.warning(
+                "LLM %s: %s error, retry %d/%d in %.2fs: %s",
+                self.name,
+                error_type,
+                attempt + 1,
+                retries,
+                delay,
+                result.get("error"),
+            )
+            await asyncio.sleep(delay)
+        return result
+
+    def _record_cassette(
+        self, cassette: CassetteStore, fingerprint: str, **entry: Any
+    ) -> None:
+        """Record a successful response; a failed write never fails the call."""
+        try:
+            cassette.record(
+                fingerprint,
+                provider=self.name,
+                model=self.model_name,
+                stage=current_stage(),
+                **entry,
+            )
+        except Exception as e:
+            get_logger(f"llm.{self.name.lower()}").warning(
+                "LLM %s: cassette not recorded: %s", self.name, e
+            )
+
+    async def _invoke_once(
+        self,
+        runnable: Any,
+        messages: list[BaseMessage],
+        root_key: str | None,
+        mode: str,
+        expect: type | None = None,
+    ) -> dict[str, Any]:
+        """Single provider call; token usage, queue wait, TTFT and latency are recorded.
+
+        In cassette replay mode the response comes from the recorded cassette; in
+        record mode successful responses are written to it.
+        """
         logger = get_logger(f"llm.{self.name.lower()}")
+        cassette = cassette_store(self._settings)
+        fingerprint = (
+            request_fingerprint(self.name, self.model_name, mode, messages)
+            if cassette is not None
+            else None
+        )
+        start = time.perf_counter()
+        queue_wait = 0.0
+        ttft = None
+        usage: dict[str, Any] = {}
+        result: dict[str, Any] | None = None
         try:
-            logger.info("LLM %s: request sent, waiting for response...", self.name)
-            start = time.perf_counter()
-            response = await coro
-            elapsed = time.perf_counter() - start
+            async with self._concurrency_slot():
+                sent = time.perf_counter()
+                queue_wait = sent - start
+                logger.info("LLM %s: request sent, waiting for response...", self.name)
+                if cassette is not None and cassette.mode == "replay":
+                    response, ttft = await cassette.replay(fingerprint)
+                else:
+                    response, ttft = await self._call(runnable, messages, sent)
+            elapsed = time.perf_counter() - sent
+            if cassette is not None and cassette.mode == "record":
+                self._record_cassette(
+                    cassette,
+                    fingerprint,
+                    mode=mode,
+                    messages=messages,
+                    response=response,
+                    ttft=ttft,
+                    latency=round(elapsed, 4),
+                )
+            usage = getattr(response, "usage_metadata", None) or {}
             text = getattr(response, "content", str(response))
             length = len(text) if text else 0
             logger.info(
-                "LLM %s: response received in %.2fs, length=%d chars",
+                "LLM %s: response received in %.2fs, length=%d chars, tokens in=%s out=%s",
                 self.name,
                 elapsed,
                 length,
+                usage.get("input_tokens"),
+                usage.get("output_tokens"),
             )
-            return self._parse_json(text)
+            result = self._parse_json(text, root_key=root_key, expect=expect)
+            return result
         except Exception as e:
-            err = str(e)
-            if "API key" in err or "401" in err or "invalid" in err.lower():
-                return {
-                    "error": err,
-                    "error_type": "invalid_api_key",
-                    "service": self.name,
-                }
             logger.warning("LLM %s: invocation failed: %s", self.name, e)
-            return {
-                "error": err,
-                "error_type": "processing_error",
-                "service": self.name,
-            }
+            result = {"error": str(e), **error_details(e), "service": self.name}
+            return result
+        finally:
+            record_llm_call(
+                LLMCallMetrics(
+                    stage=current_stage(),
+                    provider=self.name,
+                    model=self.model_name,
+                    mode=mode,
+                    outcome=(
+                        result_error_type(result)
+                        or ("ok" if result is not None else "cancelled")
+                    ),
+                    input_tokens=usage.get("input_tokens"),
+                    output_tokens=usage.get("output_tokens"),
+                    cached_input_tokens=(usage.get("input_token_details") or {}).get(
+                        "cache_read"
+                    ),
+                    queue_wait_seconds=round(queue_wait, 4),
+                    time_to_first_token_seconds=(
+                        round(ttft, 4) if ttft is not None else None
+                    ),
+                    latency_seconds=round(time.perf_counter() - start, 4),
+                )
+            )
 
     def _not_configured_response(self) -> dict[str, Any]:
         """Return standard error dict when this connection is not configured."""
@@ -73,8 +326,43 @@ class LLMConnection(ABC):
             "service": self.name,
         }
 
+    async def _run(
+        self,
+        llm: Any,
+        messages: list[BaseMessage],
+        structured_output: StructuredOutput | None,
+    ) -> dict[str, Any]:
+        """Invoke in native structured-output mode when supported, else text mode.
+
+        If the provider rejects the schema request or returns unusable output, the
+        same call is retried once in text mode (prompt-driven JSON + extraction).
+        """
+        llm, messages = await self._apply_prefix_cache(llm, messages)
+        if self._use_structured_output(structured_output):
+            result = await self._invoke(
+                self._bind_structured(llm, structured_output),
+                messages,
+                root_key=structured_output.root_key,
+                mode="structured",
+            )
+            if result_error_type(result) not in _TEXT_MODE_RETRY_ERRORS:
+                return structured_output.unwrap(result)
+            get_logger(f"llm.{self.name.lower()}").warning(
+                "LLM %s: structured output failed (%s), retrying in text mode",
+                self.name,
+                result.get("error"),
+            )
+        if structured_output is None:
+            return await self._invoke(llm, messages)
+        result = await self._invoke(llm, messages, expect=structured_output.root_type)
+        return structured_output.unwrap(result)
+
     async def invoke_vision(
-        self, prompt: str, image_bytes: bytes, **kwargs: Any
+        self,
+        prompt: str,
+        image_bytes: bytes,
+        structured_output: StructuredOutput | None = None,
+        **kwargs: Any,
     ) -> dict[str, Any]:
         """Invoke LLM with image input (vision).
 
@@ -94,10 +382,13 @@ class LLMConnection(ABC):
                 },
             ]
         )
-        return await self._invoke(llm.ainvoke([message]))
+        return await self._run(llm, [message], structured_output)
 
     async def invoke_text(
-        self, messages: list[dict[str, str]], **kwargs: Any
+        self,
+        messages: list[dict[str, str]],
+        structured_output: StructuredOutput | None = None,
+        **kwargs: Any,
     ) -> dict[str, Any]:
         """Invoke LLM with text messages only.
 
@@ -113,6 +404,8 @@ class LLMConnection(ABC):
             content = m.get("content", "")
             if role == "system":
                 lc_messages.append(SystemMessage(content=content))
+            elif role == "assistant":
+                lc_messages.append(AIMessage(content=content))
             else:
                 lc_messages.append(HumanMessage(content=content))
-        return await self._invoke(llm.ainvoke(lc_messages))
+        return await self._run(llm, lc_messages, structured_output)
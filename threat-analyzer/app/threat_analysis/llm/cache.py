@@ -21,8 +21,9 @@ class LLMCacheService:
 
         Args:
             redis_url: Passed to shared get_cache_backend; change backend in shared to swap.
+                Empty disables the cache (e.g. benchmarks that must reach the LLM layer).
         """
-        self._backend = get_cache_backend(redis_url=redis_url)
+        self._backend = get_cache_backend(redis_url=redis_url) if redis_url else None
 
     def _key(self, prefix: str, *parts: Any) -> str:
         content = json.dumps(parts, default=str, sort_keys=True)
@@ -31,6 +32,8 @@ class LLMCacheService:
 
     def get(self, prefix: str, *parts: Any) -> Any | None:
         """Get cached value if exists."""
+        if self._backend is None:
+            return None
         key = self._key(prefix, *parts)
         try:
             data = self._backend.get(key)
@@ -43,6 +46,8 @@ class LLMCacheService:
 
     def set(self, prefix: str, value: Any, *parts: Any) -> None:
         """Store value in cache with 2-hour TTL."""
+        if self._backend is None:
+            return
         key = self._key(prefix, *parts)
         try:
             serialized = json.dumps(value, default=str)
@@ -0,0 +1,150 @@
+"""Record/replay of LLM provider responses (cassettes) for deterministic benchmarks.
+
+With llm_cassette_mode="record", every successful provider call writes its request
+fingerprint and raw response (text, token usage, time to first token, latency) to
+llm_cassette_dir/<fingerprint>.json. With "replay", calls are served from those
+files with the recorded latencies scaled by llm_cassette_latency_scale (0 = no
+wait) and never reach the network; a request without a cassette fails with
+error_type "cassette_miss", like any other provider error.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Literal
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from app.threat_analysis.exceptions import CassetteMissError
+
+CassetteMode = Literal["off", "record", "replay"]
+
+CASSETTE_VERSION = 1
+
+
+def request_fingerprint(
+    provider: str, model: str, mode: str, messages: list[BaseMessage]
+) -> str:
+    """Stable hash of a provider request (provider, model, output mode and messages)."""
+    payload = [
+        CASSETTE_VERSION,
+        provider,
+        model,
+        mode,
+        [[message.type, message.content] for message in messages],
+    ]
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class CassetteStore:
+    """Directory of recorded provider responses, one JSON file per request fingerprint."""
+
+    def __init__(
+        self, directory: Path, mode: CassetteMode, latency_scale: float = 1.0
+    ) -> None:
+        self.directory = Path(directory)
+        self.mode = mode
+        self.latency_scale = latency_scale
+
+    def path(self, fingerprint: str) -> Path:
+        return self.directory / f"{fingerprint}.json"
+
+    def load(self, fingerprint: str) -> dict[str, Any] | None:
+        path = self.path(fingerprint)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def record(
+        self,
+        fingerprint: str,
+        *,
+        provider: str,
+        model: str,
+        mode: str,
+        stage: str,
+        messages: list[BaseMessage],
+        response: Any,
+        ttft: float | None,
+        latency: float,
+    ) -> None:
+        """Write the raw response of a successful call (overwrites older recordings)."""
+        entry = {
+            "version": CASSETTE_VERSION,
+            "provider": provider,
+            "model": model,
+            "mode": mode,
+            "stage": stage,
+            "request": [
+                {"type": m.type, "chars": len(str(m.content))} for m in messages
+            ],
+            "response": {
+                "content": getattr(response, "content", str(response)),
+                "usage_metadata": getattr(response, "usage_metadata", None),
+            },
+            "time_to_first_token_seconds": ttft,
+            "latency_seconds": latency,
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Unique temporary: concurrent identical requests record the same cassette
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=self.directory,
+            prefix=f".{fingerprint}.",
+            suffix=".tmp",
+            delete=False,
+        ) as f:
+            f.write(json.dumps(entry, indent=2, ensure_ascii=False, default=str) + "\n")
+        tmp = Path(f.name)
+        os.chmod(tmp, 0o644)
+        tmp.replace(self.path(fingerprint))
+
+    async def replay(self, fingerprint: str) -> tuple[AIMessage, float | None]:
+        """Recorded (response message, time to first token), after the scaled latency."""
+        entry = self.load(fingerprint)
+        if entry is None:
+            raise CassetteMissError(fingerprint, str(self.directory))
+        scale = self.latency_scale
+        start = time.perf_counter()
+        ttft = entry.get("time_to_first_token_seconds")
+        latency = entry.get("latency_seconds") or 0.0
+        if ttft is not None and scale:
+            await asyncio.sleep(ttft * scale)
+            ttft = time.perf_counter() - start
+        remaining = latency * scale - (time.perf_counter() - start)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        response = entry["response"]
+        return (
+            AIMessage(
+                content=response["content"],
+                usage_metadata=response.get("usage_metadata"),
+            ),
+            ttft,
+        )
+
+
+_stores: dict[tuple[str, str, float], CassetteStore] = {}
+_stores_lock = threading.Lock()
+
+
+def cassette_store(settings: Any) -> CassetteStore | None:
+    """Store configured by llm_cassette_mode / llm_cassette_dir, or None when off."""
+    mode = getattr(settings, "llm_cassette_mode", "off")
+    directory = getattr(settings, "llm_cassette_dir", None)
+    if mode == "off" or directory is None:
+        return None
+    scale = getattr(settings, "llm_cassette_latency_scale", 1.0)
+    key = (str(directory), mode, scale)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = CassetteStore(Path(directory), mode, scale)
+    return store
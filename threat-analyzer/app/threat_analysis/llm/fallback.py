@@ -1,16 +1,26 @@
 """Fallback runner - try LLMs in order, validate, return first success."""
 
+import asyncio
 import json
 import time
-from collections.abc import Callable
+from collections.abc import Awaitable, Callable
 from typing import Any
 
 from threat_modeling_shared.logging import get_logger
 
-from app.threat_analysis.llm.base import LLMConnection
+from app.threat_analysis.deadline import Deadline, current_deadline, deadline_scope
+from app.threat_analysis.llm.base import LLMConnection, ModelTier, result_error_type
+from app.threat_analysis.llm.json_extraction import PartialJSONArray, is_partial_result
+from app.threat_analysis.llm.metrics import llm_stage
+from app.threat_analysis.llm.retry import INVALID_OUTPUT_ERRORS
+from app.threat_analysis.llm.structured_output import StructuredOutput
 
 logger = get_logger("llm.fallback")
 
+CONTINUATION_PROMPT = """Your previous answer was cut off. Continue the JSON list right after \
+the last complete element above. Return ONLY a JSON list with the remaining elements; \
+do not repeat elements already returned."""
+
 
 def is_error_result(result: dict[str, Any]) -> bool:
     """Check if result indicates an error."""
@@ -33,10 +43,127 @@ def _validation_check(
             result if isinstance(result.get("error"), str) else {"error": str(result)}
         )
     else:
-        err_info = {"error": f"Validation failed for result type {type(result).__name__}"}
+        err_info = {
+            "error": f"Validation failed for result type {type(result).__name__}"
+        }
     return False, {"engine": conn_name, **err_info}
 
 
+def _attempt_budget(settings: Any, index: int, total: int) -> float | None:
+    """Seconds for provider attempt index of total within the current stage deadline.
+
+    Every provider but the last gets llm_attempt_budget_fraction of what is left,
+    so a hanging provider is cancelled while there is still time for the next one.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return None
+    remaining = deadline.remaining()
+    if index >= total - 1:
+        return remaining
+    return remaining * getattr(settings, "llm_attempt_budget_fraction", 0.6)
+
+
+async def _bounded(coro: Awaitable[Any], deadline: Deadline | None) -> Any:
+    """Await coro under deadline, cancelling it on expiry (raises asyncio.TimeoutError).
+
+    The deadline is also made current so connections only retry if the wait fits.
+    """
+    if deadline is None:
+        return await coro
+    with deadline_scope(deadline):
+        return await asyncio.wait_for(coro, timeout=deadline.remaining())
+
+
+def _should_escalate(settings: Any, model_tier: ModelTier, result: Any) -> bool:
+    """True when a fast-tier result failed validation for reasons a stronger model may fix."""
+    if model_tier != "fast" or not getattr(settings, "llm_escalate_on_invalid", True):
+        return False
+    if isinstance(result, dict) and "error" in result:
+        return result_error_type(result) in INVALID_OUTPUT_ERRORS
+    return True
+
+
+async def _attempt(
+    conn_class: type[LLMConnection],
+    settings: Any,
+    model_tier: ModelTier,
+    invoke: Callable[[LLMConnection], Awaitable[Any]],
+    validator: Callable[[Any], bool],
+    mode: str,
+    budget: float | None = None,
+) -> tuple[bool, Any, LLMConnection]:
+    """Run one provider on model_tier, escalating to its primary model on invalid output.
+
+    No escalation when the primary model is the fast one (e.g. Ollama without
+    ollama_fast_model): the same call would only be repeated.
+
+    The attempt (escalation included) is cancelled after budget seconds.
+    Returns (ok, value, connection) where value is the validated result or error info.
+    """
+    conn = conn_class(settings, model_tier=model_tier)
+    if budget is not None and budget <= 0:
+        logger.warning("LLM %s: skipped, request deadline exceeded", conn.name)
+        return (
+            False,
+            {
+                "engine": conn.name,
+                "error": "Request deadline exceeded",
+                "error_type": "deadline_exceeded",
+            },
+            conn,
+        )
+    deadline = Deadline.after(budget) if budget is not None else None
+    logger.info("Trying LLM: %s (%s, waiting...)", conn.name, mode)
+    try:
+        start = time.perf_counter()
+        result = await _bounded(invoke(conn), deadline)
+        ok, value = _validation_check(validator, result, conn.name)
+        if not ok and _should_escalate(settings, model_tier, result):
+            primary = conn_class(settings, model_tier="primary")
+            if primary.model_name == conn.model_name:
+                logger.warning(
+                    "LLM %s: fast model output invalid, primary model is the same",
+                    conn.name,
+                )
+            else:
+                logger.warning(
+                    "LLM %s: fast model output invalid, escalating to primary model",
+                    conn.name,
+                )
+                conn = primary
+                result = await _bounded(invoke(conn), deadline)
+                ok, value = _validation_check(validator, result, conn.name)
+        elapsed = time.perf_counter() - start
+    except asyncio.TimeoutError:
+        logger.warning(
+            "LLM %s: cancelled after %.2fs (attempt budget exhausted)",
+            conn.name,
+            time.perf_counter() - start,
+        )
+        return (
+            False,
+            {
+                "engine": conn.name,
+                "error": f"Timed out after {budget:.1f}s",
+                "error_type": "timeout",
+            },
+            conn,
+        )
+    except Exception as e:
+        logger.warning("LLM %s failed with exception: %s", conn.name, e)
+        return (
+            False,
+            {"engine": conn.name, "error": str(e), "error_type": "exception"},
+            conn,
+        )
+    if ok:
+        logger.info("Success with %s in %.2fs", conn.name, elapsed)
+    else:
+        logger.warning("LLM %s: validation failed after %.2fs", conn.name, elapsed)
+    return ok, value, conn
+
+
 async def run_vision_with_fallback(
     connections: list[type[LLMConnection]],
     settings: Any,
@@ -46,6 +173,8 @@ async def run_vision_with_fallback(
     cache_set: Callable[[str, Any, ...], None] | None = None,
     cache_key_prefix: str = "diagram",
     validate: Callable[[dict[str, Any]], bool] | None = None,
+    structured_output: StructuredOutput | None = None,
+    model_tier: ModelTier = "primary",
 ) -> dict[str, Any]:
     """Try each connection in order; return first valid result or aggregated errors.
 
@@ -58,6 +187,9 @@ async def run_vision_with_fallback(
         cache_set: Optional cache setter (prefix, value, *args).
         cache_key_prefix: Prefix for cache key.
         validate: Optional validator(result) -> bool. Default: not is_error_result.
+        structured_output: Optional JSON schema for providers' native structured mode.
+        model_tier: "fast" or "primary" model of each provider; invalid fast-tier
+            output is retried once on the same provider's primary model.
 
     Returns:
         Valid result dict or {"error": str, "engine_errors": list}.
@@ -71,27 +203,28 @@ async def run_vision_with_fallback(
             logger.info("Returning cached LLM result")
             return cached
 
+    def invoke(conn: LLMConnection) -> Awaitable[Any]:
+        return conn.invoke_vision(
+            prompt, image_bytes, structured_output=structured_output
+        )
+
     errors: list[dict[str, Any]] = []
-    for conn_class in connections:
-        conn = conn_class(settings)
-        logger.info("Trying LLM: %s (vision, waiting...)", conn.name)
-        try:
-            start = time.perf_counter()
-            result = await conn.invoke_vision(prompt, image_bytes)
-            elapsed = time.perf_counter() - start
-            ok, value = _validation_check(validator, result, conn.name)
-            if ok:
-                logger.info("Success with %s in %.2fs", conn.name, elapsed)
-                if cache_set:
-                    cache_set(cache_key_prefix, value, prompt, image_bytes)
-                return value
-            logger.warning("LLM %s: validation failed after %.2fs", conn.name, elapsed)
-            errors.append(value)
-        except Exception as e:
-            errors.append(
-                {"engine": conn.name, "error": str(e), "error_type": "exception"}
+    for index, conn_class in enumerate(connections):
+        with llm_stage(cache_key_prefix):
+            ok, value, _ = await _attempt(
+                conn_class,
+                settings,
+                model_tier,
+                invoke,
+                validator,
+                "vision",
+                budget=_attempt_budget(settings, index, len(connections)),
             )
-            logger.warning("%s failed: %s", conn.name, e)
+        if ok:
+            if cache_set:
+                cache_set(cache_key_prefix, value, prompt, image_bytes)
+            return value
+        errors.append(value)
 
     return {
         "error": "All LLM providers failed",
@@ -99,6 +232,48 @@ async def run_vision_with_fallback(
     }
 
 
+async def _continue_partial(
+    conn: LLMConnection,
+    messages: list[dict[str, str]],
+    partial: PartialJSONArray,
+    max_continuations: int,
+) -> list[Any]:
+    """Ask the same provider for the missing remainder of a truncated JSON array.
+
+    Returns a plain list when the array was completed, otherwise the (possibly
+    extended) PartialJSONArray so callers can still tell the result is partial.
+    """
+    result = partial
+    for attempt in range(1, max_continuations + 1):
+        follow_up = [
+            *messages,
+            {"role": "assistant", "content": result.raw_prefix},
+            {"role": "user", "content": CONTINUATION_PROMPT},
+        ]
+        remainder = await conn.invoke_text(follow_up)
+        if not isinstance(remainder, list):
+            logger.warning(
+                "LLM %s: continuation %d failed: %s",
+                conn.name,
+                attempt,
+                remainder.get("error") if isinstance(remainder, dict) else remainder,
+            )
+            return result
+        logger.info(
+            "LLM %s: continuation %d returned %d more elements",
+            conn.name,
+            attempt,
+            len(remainder),
+        )
+        if not is_partial_result(remainder):
+            return [*result, *remainder]
+        result = PartialJSONArray(
+            [*result, *remainder],
+            raw_prefix=f"{result.raw_prefix}, {remainder.raw_prefix.lstrip()[1:]}",
+        )
+    return result
+
+
 async def run_text_with_fallback(
     connections: list[type[LLMConnection]],
     settings: Any,
@@ -107,8 +282,16 @@ async def run_text_with_fallback(
     cache_set: Callable[[str, Any, ...], None] | None = None,
     cache_key_prefix: str = "text",
     validate: Callable[[dict[str, Any]], bool] | None = None,
+    max_continuations: int = 0,
+    structured_output: StructuredOutput | None = None,
+    model_tier: ModelTier = "primary",
 ) -> dict[str, Any]:
-    """Try each connection for text-only invocation."""
+    """Try each connection for text-only invocation.
+
+    A truncated top-level JSON array is salvaged by the connection (PartialJSONArray)
+    instead of failing over; with max_continuations > 0 the same provider is asked
+    for the missing remainder. Partial results are returned but never cached.
+    """
     validator = validate or (lambda r: not is_error_result(r))
 
     if cache_get:
@@ -118,28 +301,43 @@ async def run_text_with_fallback(
             logger.info("Returning cached LLM result")
             return cached
 
+    def invoke(conn: LLMConnection) -> Awaitable[Any]:
+        return conn.invoke_text(messages, structured_output=structured_output)
+
     errors: list[dict[str, Any]] = []
-    for conn_class in connections:
-        conn = conn_class(settings)
-        logger.info("Trying LLM: %s (text, waiting...)", conn.name)
-        try:
-            start = time.perf_counter()
-            result = await conn.invoke_text(messages)
-            elapsed = time.perf_counter() - start
-            ok, value = _validation_check(validator, result, conn.name)
-            if ok:
-                logger.info("Success with %s in %.2fs", conn.name, elapsed)
-                if cache_set:
-                    cache_set(
-                        cache_key_prefix, value, json.dumps(messages, sort_keys=True)
+    for index, conn_class in enumerate(connections):
+        with llm_stage(cache_key_prefix):
+            ok, value, conn = await _attempt(
+                conn_class,
+                settings,
+                model_tier,
+                invoke,
+                validator,
+                "text",
+                budget=_attempt_budget(settings, index, len(connections)),
+            )
+            if ok and is_partial_result(value) and max_continuations > 0:
+                try:
+                    value = await _bounded(
+                        _continue_partial(conn, messages, value, max_continuations),
+                        current_deadline(),
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        "LLM %s: continuation cancelled by request deadline",
+                        conn.name,
                     )
-                return value
-            logger.warning("LLM %s: validation failed after %.2fs", conn.name, elapsed)
+        if not ok:
             errors.append(value)
-        except Exception as e:
-            errors.append(
-                {"engine": conn.name, "error": str(e), "error_type": "exception"}
+            continue
+        if is_partial_result(value):
+            logger.warning(
+                "LLM %s: returning partial result (%d elements)",
+                conn.name,
+                len(value),
             )
-            logger.warning("LLM %s failed with exception: %s", conn.name, e)
+        elif cache_set:
+            cache_set(cache_key_prefix, value, json.dumps(messages, sort_keys=True))
+        return value
 
     return {"error": "All LLM providers failed", "engine_errors": errors}
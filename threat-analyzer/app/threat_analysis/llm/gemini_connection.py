@@ -1,29 +1,46 @@
 """Gemini LLM connection - lazy proxy to ChatGoogleGenerativeAI."""
 
-import json
-import re
+import hashlib
+import time
 from typing import Any
 
+from google import genai
+from google.genai import types
+from langchain_core.messages import BaseMessage, SystemMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 from threat_modeling_shared.logging import get_logger
 
 from app.config import Settings
-from app.threat_analysis.llm.base import LLMConnection
+from app.threat_analysis.llm.base import LLMConnection, ModelTier
+from app.threat_analysis.llm.structured_output import StructuredOutput
 
 logger = get_logger("llm.gemini")
 
+# sha256(model, system prompt) -> (cached content name or None if creation failed, refresh at)
+_context_caches: dict[str, tuple[str | None, float]] = {}
+# Static prompts are few (STRIDE, DREAD per model); the oldest entry is dropped past this
+_MAX_CONTEXT_CACHES = 32
+
 
 class GeminiConnection(LLMConnection):
     """Gemini connection - instantiated only when used."""
 
-    def __init__(self, settings: Settings) -> None:
-        self._settings = settings
+    def __init__(self, settings: Settings, model_tier: ModelTier = "primary") -> None:
+        super().__init__(settings, model_tier)
         self._llm: ChatGoogleGenerativeAI | None = None
 
+    supports_structured_output = True
+
     @property
     def name(self) -> str:
         return "Gemini"
 
+    @property
+    def model_name(self) -> str:
+        if self._model_tier == "fast":
+            return self._settings.fast_model
+        return self._settings.primary_model
+
     def _ensure_llm(self) -> ChatGoogleGenerativeAI | None:
         """Lazy init - only create client when first used."""
         if self._llm is not None:
@@ -32,13 +49,13 @@ class GeminiConnection(LLMConnection):
             return None
         try:
             self._llm = ChatGoogleGenerativeAI(
-                model=self._settings.primary_model,
+                model=self.model_name,
                 temperature=self._settings.llm_temperature,
                 google_api_key=self._settings.google_api_key,
+                base_url=self._settings.gemini_base_url,
+                max_retries=0,  # Retries are handled (deadline-aware) in LLMConnection
             )
-            logger.info(
-                "Gemini connection initialized: %s", self._settings.primary_model
-            )
+            logger.info("Gemini connection initialized: %s", self.model_name)
             return self._llm
         except Exception as e:
             logger.error("Gemini init failed: %s", e)
@@ -47,38 +64,64 @@ class GeminiConnection(LLMConnection):
     def is_configured(self) -> bool:
         return bool(self._settings.google_api_key)
 
-    def _parse_json(self, text: str) -> dict[str, Any]:
-        if not text:
-            return {
-                "error": "Empty response",
-                "error_type": "empty",
-                "service": self.name,
-            }
-        text = text.strip()
-        pairs = [("{", "}"), ("[", "]")]
-        pairs.sort(key=lambda p: (text.find(p[0]) if text.find(p[0]) != -1 else float("inf")))
-        for start, end in pairs:
-            idx = text.find(start)
-            if idx != -1:
-                depth = 0
-                for i, c in enumerate(text[idx:], idx):
-                    if c == start:
-                        depth += 1
-                    elif c == end:
-                        depth -= 1
-                        if depth == 0:
-                            try:
-                                return json.loads(text[idx : i + 1])
-                            except json.JSONDecodeError:
-                                pass
-        match = re.search(r"```(?:json)?\s*([\s\S]*?)```", text)
-        if match:
-            try:
-                return json.loads(match.group(1).strip())
-            except json.JSONDecodeError:
-                pass
-        return {
-            "error": "Invalid JSON response",
-            "error_type": "invalid_json",
-            "service": self.name,
-        }
+    def _bind_structured(
+        self, llm: ChatGoogleGenerativeAI, output: StructuredOutput
+    ) -> Any:
+        return llm.bind(
+            response_mime_type="application/json",
+            response_json_schema=output.schema,
+        )
+
+    async def _apply_prefix_cache(
+        self, llm: ChatGoogleGenerativeAI, messages: list[BaseMessage]
+    ) -> tuple[Any, list[BaseMessage]]:
+        """Serve a long static system prompt from Gemini cached content."""
+        if not self._settings.gemini_context_cache or not messages:
+            return llm, messages
+        system = messages[0]
+        if (
+            not isinstance(system, SystemMessage)
+            or not isinstance(system.content, str)
+            or len(system.content) < self._settings.gemini_context_cache_min_chars
+        ):
+            return llm, messages
+        name = await self._context_cache_name(system.content)
+        if name is None:
+            return llm, messages
+        return llm.bind(cached_content=name), messages[1:]
+
+    async def _context_cache_name(self, system_prompt: str) -> str | None:
+        key = hashlib.sha256(f"{self.model_name}\0{system_prompt}".encode()).hexdigest()
+        now = time.monotonic()
+        entry = _context_caches.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        ttl = self._settings.gemini_context_cache_ttl_seconds
+        try:
+            name = await self._create_context_cache(system_prompt, ttl)
+            logger.info("Gemini context cache created: %s (ttl %ds)", name, ttl)
+        except Exception as e:
+            name = None
+            logger.warning(
+                "Gemini context cache unavailable, sending full prompt: %s", e
+            )
+        _context_caches.pop(key, None)
+        if len(_context_caches) >= _MAX_CONTEXT_CACHES:
+            _context_caches.pop(next(iter(_context_caches)))
+        _context_caches[key] = (name, now + ttl * 0.9)  # Refresh before expiry
+        return name
+
+    async def _create_context_cache(self, system_prompt: str, ttl: int) -> str:
+        client = genai.Client(
+            api_key=self._settings.google_api_key,
+            http_options=types.HttpOptions(base_url=self._settings.gemini_base_url),
+        )
+        cache = await client.aio.caches.create(
+            model=self.model_name,
+            config=types.CreateCachedContentConfig(
+                display_name="threat-analyzer-system-prompt",
+                system_instruction=system_prompt,
+                ttl=f"{ttl}s",
+            ),
+        )
+        return cache.name
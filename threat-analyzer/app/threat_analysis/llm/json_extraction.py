@@ -0,0 +1,266 @@
+"""JSON extraction from LLM text — one string-aware, single-pass scanner for all providers.
+
+LLM responses wrap JSON in prose, ```json fences or trailing commentary. The scanner
+walks the text once, jumping between structural characters with a compiled regex,
+and only hands balanced top-level candidates to orjson. Candidates are disjoint, so
+the total parsing work stays linear in the response length.
+"""
+
+import re
+from typing import Any
+
+import orjson
+
+from app.threat_analysis.exceptions import JSONParsingError
+
+_CLOSERS = {"{": "}", "[": "]"}
+_OPENER_RE = re.compile(r"[\[{]")
+_STRUCTURAL_RE = re.compile(r'[\[\]{}"]')
+_STRING_END_RE = re.compile(r'["\\]')
+_JSON_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*")
+_JSON_START_RE = re.compile(r'\[\s*(?:[\[{"\]\d-]|true|false|null)|\{\s*["}]')
+_ELEMENT_RE = re.compile(r'[\[\]{}",]')
+
+
+class PartialJSONArray(list):
+    """Elements salvaged from a top-level JSON array that was cut off mid-element.
+
+    Behaves as a plain list; ``raw_prefix`` holds the array text up to the last
+    complete element so a continuation request can resume right after it.
+    """
+
+    partial = True
+
+    def __init__(self, items: list[Any], raw_prefix: str) -> None:
+        super().__init__(items)
+        self.raw_prefix = raw_prefix
+
+
+def is_partial_result(result: Any) -> bool:
+    """True when result is a salvaged (truncated) array."""
+    return isinstance(result, PartialJSONArray)
+
+
+def loads(data: str | bytes) -> Any:
+    """Parse a JSON document with orjson (raises ValueError on invalid input)."""
+    return orjson.loads(data)
+
+
+def _scan(
+    text: str, pos: int, end: int, *, rescan_unclosed: bool = True
+) -> tuple[int, int, Any] | None:
+    """Return (start, stop, value) of the first parseable top-level candidate in text[pos:end].
+
+    A candidate still open at the end of the text is either truncated JSON (no
+    result) or a stray bracket in prose such as "[see below {...}"; the latter is
+    rescanned once from the next character, so the work stays bounded.
+    """
+    while True:
+        opener = _OPENER_RE.search(text, pos, end)
+        if opener is None:
+            return None
+        start = opener.start()
+        stack = [_CLOSERS[opener.group()]]
+        i = start + 1
+        while stack:
+            match = _STRUCTURAL_RE.search(text, i, end)
+            if match is None:
+                i = end
+                break
+            char = match.group()
+            i = match.end()
+            if char == '"':
+                while True:
+                    quote = _STRING_END_RE.search(text, i, end)
+                    if quote is None:
+                        i = end
+                        break
+                    i = quote.end()
+                    if quote.group() == '"':
+                        break
+                    i += 1  # Skip the escaped character
+            elif char in _CLOSERS:
+                stack.append(_CLOSERS[char])
+            elif char == stack[-1]:
+                stack.pop()
+            else:
+                break  # Mismatched closer: not JSON, resume scanning from here
+        if stack:
+            if i < end:
+                pos = i
+                continue
+            if rescan_unclosed and not _JSON_START_RE.match(text, start):
+                return _scan(text, start + 1, end, rescan_unclosed=False)
+            return None
+        try:
+            return start, i, orjson.loads(text[start:i])
+        except orjson.JSONDecodeError:
+            pos = i
+
+
+def _try_whole(text: str, start: int, end: int) -> tuple[int, int, Any] | None:
+    """Fast path: parse text[start:end] (whitespace-trimmed) in one orjson call."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if start == end or text[start] not in _CLOSERS:
+        return None
+    try:
+        return start, end, orjson.loads(text[start:end])
+    except orjson.JSONDecodeError:
+        return None
+
+
+def _find_json(text: str, expect: type | None = None) -> tuple[int, int, Any] | None:
+    """Locate JSON in text, preferring the body of the first ``` fence when present.
+
+    Candidates of the expected root type (dict or list) win over earlier ones of
+    another shape, so a citation like "see [1]: {...}" yields the object; without
+    expect, objects and arrays of objects/arrays win. Falls back to the first
+    parseable candidate.
+    """
+    first = None
+    fence = _JSON_FENCE_RE.search(text)
+    if fence is not None:
+        closing = text.find("```", fence.end())
+        end = closing if closing != -1 else len(text)
+        found = _try_whole(text, fence.end(), end)
+        if found is not None and _is_expected(found[2], expect):
+            return found
+        found, first = _first_expected(text, fence.end(), end, expect, found)
+        if found is not None:
+            return found
+    found = _try_whole(text, 0, len(text))
+    if found is not None and _is_expected(found[2], expect):
+        return found
+    found, first = _first_expected(text, 0, len(text), expect, first or found)
+    return found or first
+
+
+def _first_expected(
+    text: str,
+    pos: int,
+    end: int,
+    expect: type | None,
+    first: tuple[int, int, Any] | None,
+) -> tuple[tuple[int, int, Any] | None, tuple[int, int, Any] | None]:
+    """(first candidate of the expected shape, first candidate seen) in text[pos:end]."""
+    while True:
+        found = _scan(text, pos, end)
+        if found is None:
+            return None, first
+        if _is_expected(found[2], expect):
+            return found, first
+        first = first or found
+        pos = found[1]
+
+
+def _is_expected(value: Any, expect: type | None) -> bool:
+    if expect is not None:
+        return isinstance(value, expect)
+    if isinstance(value, dict):
+        return True
+    return isinstance(value, list) and all(isinstance(v, dict | list) for v in value)
+
+
+def _element_boundaries(text: str, start: int) -> list[int] | None:
+    """End offsets of complete elements of the array opened at start; None if it closes."""
+    boundaries: list[int] = []
+    depth = 1
+    i = start + 1
+    while True:
+        match = _ELEMENT_RE.search(text, i)
+        if match is None:
+            return boundaries
+        char = match.group()
+        i = match.end()
+        if char == '"':
+            while True:
+                quote = _STRING_END_RE.search(text, i)
+                if quote is None:
+                    return boundaries
+                i = quote.end()
+                if quote.group() == '"':
+                    break
+                i += 1
+        elif char in _CLOSERS:
+            depth += 1
+        elif char == ",":
+            if depth == 1:
+                boundaries.append(match.start())
+        else:
+            depth -= 1
+            if depth == 0:
+                return None
+            if depth == 1:
+                boundaries.append(i)
+
+
+def salvage_json_array(
+    text: str, root_key: str | None = None
+) -> PartialJSONArray | None:
+    """Recover every complete element of a truncated top-level JSON array.
+
+    Only applies when the first JSON-looking value in the text is an array that is
+    never closed (output-token limit hit mid-element), or — with root_key — the
+    array under that key of a wrapping object such as {"threats": [...}. Returns
+    None when there is nothing to salvage or the response is not a truncated array.
+    """
+    if not text:
+        return None
+    fence = _JSON_FENCE_RE.search(text)
+    pos = fence.end() if fence is not None else 0
+    while True:
+        start_match = _JSON_START_RE.search(text, pos)
+        if start_match is None:
+            return None
+        start = start_match.start()
+        if text[start] == "{" and root_key is not None:
+            wrapped = re.compile(rf'"{re.escape(root_key)}"\s*:\s*\[').search(
+                text, start
+            )
+            if wrapped is None:
+                return None
+            start = wrapped.end() - 1
+        elif text[start] != "[":
+            return None
+        boundaries = _element_boundaries(text, start)
+        if boundaries is not None:
+            break
+        pos = start + 1  # A closed array (e.g. "[1-10]" in prose): look further
+    for stop in reversed(boundaries[-3:]):
+        try:
+            items = orjson.loads(text[start:stop] + "]")
+        except orjson.JSONDecodeError:
+            continue
+        if items:
+            return PartialJSONArray(items, raw_prefix=text[start:stop])
+    return None
+
+
+def extract_json_text(text: str, expect: type | None = None) -> str | None:
+    """Return the substring holding the JSON object/array (see extract_json), or None."""
+    found = _find_json(text, expect)
+    if found is None:
+        return None
+    start, stop, _ = found
+    return text[start:stop]
+
+
+def extract_json(text: str, expect: type | None = None) -> Any:
+    """Parse the JSON object/array embedded in an LLM response.
+
+    Handles raw JSON, ```json / ``` fenced blocks and JSON surrounded by prose.
+    expect (dict or list) is the root type of the stage's output; the first
+    candidate of that type is preferred over earlier ones of another shape.
+
+    Raises:
+        JSONParsingError: If the text is empty or contains no parseable JSON.
+    """
+    if not text:
+        raise JSONParsingError("", "Content is empty or None")
+    found = _find_json(text, expect)
+    if found is None:
+        raise JSONParsingError(text, "No parseable JSON object or array found")
+    return found[2]
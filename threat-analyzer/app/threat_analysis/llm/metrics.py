@@ -0,0 +1,244 @@
+"""LLM call accounting: per-analysis collection and process-wide labeled metrics.
+
+Connections report every call through record_llm_call(). The call is appended to
+the collector of the current analysis (a contextvar set by collect_llm_metrics())
+and added to the process-wide registry, which /metrics renders in the Prometheus
+text exposition format. The pipeline stage label comes from llm_stage().
+RAG retrievals are reported the same way through record_retrieval().
+"""
+
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.threat_analysis.schemas.metrics import (
+    AnalysisMetrics,
+    LLMCallMetrics,
+    RetrievalMetrics,
+    StageMetrics,
+)
+
+_current_stage: ContextVar[str] = ContextVar("llm_stage", default="unknown")
+_current_collector: ContextVar["LLMMetricsCollector | None"] = ContextVar(
+    "llm_metrics_collector", default=None
+)
+
+_LABELS = ("stage", "provider", "model", "mode", "outcome")
+
+# (metric name, type, help, series field, count field for summaries)
+_EXPOSED = (
+    ("llm_calls_total", "counter", "LLM provider calls.", "calls", None),
+    ("llm_input_tokens_total", "counter", "Prompt tokens.", "input_tokens", None),
+    ("llm_output_tokens_total", "counter", "Completion tokens.", "output_tokens", None),
+    (
+        "llm_cached_input_tokens_total",
+        "counter",
+        "Prompt tokens served from provider caches.",
+        "cached_input_tokens",
+        None,
+    ),
+    (
+        "llm_queue_wait_seconds",
+        "summary",
+        "Wait for a provider slot.",
+        "queue_wait_seconds",
+        "calls",
+    ),
+    (
+        "llm_time_to_first_token_seconds",
+        "summary",
+        "Time to first chunk.",
+        "ttft_seconds",
+        "ttft_count",
+    ),
+    (
+        "llm_latency_seconds",
+        "summary",
+        "Total call latency.",
+        "latency_seconds",
+        "calls",
+    ),
+)
+
+
+def _ratio(part: int, total: int) -> float:
+    return round(part / total, 4) if total else 0.0
+
+
+class LLMMetricsCollector:
+    """Calls made during one analysis; build() aggregates them per stage."""
+
+    def __init__(self) -> None:
+        self.calls: list[LLMCallMetrics] = []
+        self.retrieval = RetrievalMetrics()
+
+    def build(self) -> AnalysisMetrics:
+        stages: dict[str, StageMetrics] = {}
+        for call in self.calls:
+            stage = stages.setdefault(call.stage, StageMetrics())
+            stage.calls += 1
+            stage.input_tokens += call.input_tokens or 0
+            stage.output_tokens += call.output_tokens or 0
+            stage.cached_input_tokens += call.cached_input_tokens or 0
+            stage.queue_wait_seconds = round(
+                stage.queue_wait_seconds + call.queue_wait_seconds, 3
+            )
+            stage.latency_seconds = round(
+                stage.latency_seconds + call.latency_seconds, 3
+            )
+        for stage in stages.values():
+            stage.cached_token_ratio = _ratio(
+                stage.cached_input_tokens, stage.input_tokens
+            )
+        input_tokens = sum(s.input_tokens for s in stages.values())
+        cached_input_tokens = sum(s.cached_input_tokens for s in stages.values())
+        return AnalysisMetrics(
+            llm_calls=len(self.calls),
+            input_tokens=input_tokens,
+            output_tokens=sum(s.output_tokens for s in stages.values()),
+            cached_input_tokens=cached_input_tokens,
+            cached_token_ratio=_ratio(cached_input_tokens, input_tokens),
+            latency_seconds=round(sum(s.latency_seconds for s in stages.values()), 3),
+            stages=stages,
+            calls=list(self.calls),
+            retrieval=self.retrieval.model_copy() if self.retrieval.calls else None,
+        )
+
+
+class LLMMetricsRegistry:
+    """Process-wide counters per (stage, provider, model, mode, outcome)."""
+
+    _FIELDS = (
+        "calls",
+        "input_tokens",
+        "output_tokens",
+        "cached_input_tokens",
+        "queue_wait_seconds",
+        "ttft_seconds",
+        "ttft_count",
+        "latency_seconds",
+    )
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, ...], dict[str, float]] = {}
+        # RAG retrievals per outcome: [count, queue wait sum, latency sum]
+        self._retrievals: dict[str, list[float]] = {}
+
+    def observe(self, call: LLMCallMetrics) -> None:
+        labels = tuple(str(getattr(call, name)) for name in _LABELS)
+        with self._lock:
+            series = self._series.setdefault(labels, dict.fromkeys(self._FIELDS, 0))
+            series["calls"] += 1
+            series["input_tokens"] += call.input_tokens or 0
+            series["output_tokens"] += call.output_tokens or 0
+            series["cached_input_tokens"] += call.cached_input_tokens or 0
+            series["queue_wait_seconds"] += call.queue_wait_seconds
+            series["latency_seconds"] += call.latency_seconds
+            if call.time_to_first_token_seconds is not None:
+                series["ttft_seconds"] += call.time_to_first_token_seconds
+                series["ttft_count"] += 1
+
+    def observe_retrieval(
+        self, queue_wait_seconds: float, latency_seconds: float, outcome: str
+    ) -> None:
+        with self._lock:
+            values = self._retrievals.setdefault(outcome, [0, 0.0, 0.0])
+            values[0] += 1
+            values[1] += queue_wait_seconds
+            values[2] += latency_seconds
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._retrievals.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition (counters and sum/count summaries)."""
+        with self._lock:
+            series = [(labels, dict(values)) for labels, values in self._series.items()]
+            retrievals = {k: list(v) for k, v in self._retrievals.items()}
+        lines: list[str] = []
+        for name, kind, help_text, field, count_field in _EXPOSED:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, values in series:
+                label_str = ",".join(
+                    f'{key}="{_escape(value)}"' for key, value in zip(_LABELS, labels)
+                )
+                if count_field is None:
+                    lines.append(f"{name}{{{label_str}}} {values[field]:g}")
+                else:
+                    lines.append(f"{name}_sum{{{label_str}}} {values[field]:.6f}")
+                    lines.append(f"{name}_count{{{label_str}}} {values[count_field]:g}")
+        for name, help_text, index in (
+            ("rag_retrieval_queue_wait_seconds", "Wait for a retrieval slot.", 1),
+            ("rag_retrieval_latency_seconds", "Total retrieval time.", 2),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} summary")
+            for outcome, values in retrievals.items():
+                label_str = f'outcome="{_escape(outcome)}"'
+                lines.append(f"{name}_sum{{{label_str}}} {values[index]:.6f}")
+                lines.append(f"{name}_count{{{label_str}}} {values[0]:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = LLMMetricsRegistry()
+
+
+def current_stage() -> str:
+    """Stage label for calls made in the current context."""
+    return _current_stage.get()
+
+
+@contextmanager
+def llm_stage(stage: str) -> Iterator[None]:
+    """Label LLM calls made inside the block with the given pipeline stage."""
+    token = _current_stage.set(stage)
+    try:
+        yield
+    finally:
+        _current_stage.reset(token)
+
+
+@contextmanager
+def collect_llm_metrics() -> Iterator[LLMMetricsCollector]:
+    """Collect every LLM call made inside the block (one analysis)."""
+    collector = LLMMetricsCollector()
+    token = _current_collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _current_collector.reset(token)
+
+
+def record_llm_call(call: LLMCallMetrics) -> None:
+    """Add a call to the current analysis (if any) and the process-wide registry."""
+    collector = _current_collector.get()
+    if collector is not None:
+        collector.calls.append(call)
+    registry.observe(call)
+
+
+def record_retrieval(
+    queue_wait_seconds: float, latency_seconds: float, outcome: str = "ok"
+) -> None:
+    """Add a RAG retrieval to the current analysis (if any) and the registry."""
+    collector = _current_collector.get()
+    if collector is not None:
+        retrieval = collector.retrieval
+        retrieval.calls += 1
+        retrieval.timeouts += outcome == "timeout"
+        retrieval.queue_wait_seconds = round(
+            retrieval.queue_wait_seconds + queue_wait_seconds, 3
+        )
+        retrieval.latency_seconds = round(
+            retrieval.latency_seconds + latency_seconds, 3
+        )
+    registry.observe_retrieval(queue_wait_seconds, latency_seconds, outcome)
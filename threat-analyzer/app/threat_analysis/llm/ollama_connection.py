@@ -1,13 +1,13 @@
 """Ollama LLM connection - lazy proxy to ChatOllama."""
 
-import json
 from typing import Any
 
 from langchain_ollama import ChatOllama
 from threat_modeling_shared.logging import get_logger
 
 from app.config import Settings
-from app.threat_analysis.llm.base import LLMConnection
+from app.threat_analysis.llm.base import LLMConnection, ModelTier
+from app.threat_analysis.llm.structured_output import StructuredOutput
 
 logger = get_logger("llm.ollama")
 
@@ -15,25 +15,31 @@ logger = get_logger("llm.ollama")
 class OllamaConnection(LLMConnection):
     """Ollama connection - instantiated only when used."""
 
-    def __init__(self, settings: Settings) -> None:
-        self._settings = settings
+    def __init__(self, settings: Settings, model_tier: ModelTier = "primary") -> None:
+        super().__init__(settings, model_tier)
         self._llm: ChatOllama | None = None
 
+    supports_structured_output = True
+
     @property
     def name(self) -> str:
         return "Ollama"
 
+    @property
+    def model_name(self) -> str:
+        if self._model_tier == "fast" and self._settings.ollama_fast_model:
+            return self._settings.ollama_fast_model
+        return self._settings.ollama_model
+
     def _ensure_llm(self) -> ChatOllama | None:
         if self._llm is not None:
             return self._llm
         try:
             self._llm = ChatOllama(
-                model=self._settings.ollama_model,
+                model=self.model_name,
                 base_url=self._settings.ollama_base_url,
             )
-            logger.info(
-                "Ollama connection initialized: %s", self._settings.ollama_model
-            )
+            logger.info("Ollama connection initialized: %s", self.model_name)
             return self._llm
         except Exception as e:
             logger.error("Ollama init failed: %s", e)
@@ -42,30 +48,5 @@ class OllamaConnection(LLMConnection):
     def is_configured(self) -> bool:
         return True  # Ollama has no API key, assume configured
 
-    def _parse_json(self, text: str) -> dict[str, Any]:
-        if not text:
-            return {
-                "error": "Empty response",
-                "error_type": "empty",
-                "service": self.name,
-            }
-        text = text.strip().replace("```json", "").replace("```", "").strip()
-        for start, end in [("{", "}"), ("[", "]")]:
-            idx = text.find(start)
-            if idx != -1:
-                depth = 0
-                for i, c in enumerate(text[idx:], idx):
-                    if c == start:
-                        depth += 1
-                    elif c == end:
-                        depth -= 1
-                        if depth == 0:
-                            try:
-                                return json.loads(text[idx : i + 1])
-                            except json.JSONDecodeError:
-                                pass
-        return {
-            "error": "Invalid JSON response",
-            "error_type": "invalid_json",
-            "service": self.name,
-        }
+    def _bind_structured(self, llm: ChatOllama, output: StructuredOutput) -> Any:
+        return llm.bind(format=output.schema)
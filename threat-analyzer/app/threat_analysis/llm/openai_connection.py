@@ -1,13 +1,13 @@
 """OpenAI LLM connection - lazy proxy to ChatOpenAI."""
 
-import json
 from typing import Any
 
 from langchain_openai import ChatOpenAI
 from threat_modeling_shared.logging import get_logger
 
 from app.config import Settings
-from app.threat_analysis.llm.base import LLMConnection
+from app.threat_analysis.llm.base import LLMConnection, ModelTier
+from app.threat_analysis.llm.structured_output import StructuredOutput
 
 logger = get_logger("llm.openai")
 
@@ -15,14 +15,22 @@ logger = get_logger("llm.openai")
 class OpenAIConnection(LLMConnection):
     """OpenAI connection - instantiated only when used."""
 
-    def __init__(self, settings: Settings) -> None:
-        self._settings = settings
+    def __init__(self, settings: Settings, model_tier: ModelTier = "primary") -> None:
+        super().__init__(settings, model_tier)
         self._llm: ChatOpenAI | None = None
 
+    supports_structured_output = True
+
     @property
     def name(self) -> str:
         return "OpenAI"
 
+    @property
+    def model_name(self) -> str:
+        if self._model_tier == "fast":
+            return self._settings.openai_fast_model
+        return self._settings.fallback_model
+
     def _ensure_llm(self) -> ChatOpenAI | None:
         if self._llm is not None:
             return self._llm
@@ -30,13 +38,14 @@ class OpenAIConnection(LLMConnection):
             return None
         try:
             self._llm = ChatOpenAI(
-                model=self._settings.fallback_model,
+                model=self.model_name,
                 temperature=self._settings.llm_temperature,
                 api_key=self._settings.openai_api_key,
+                base_url=self._settings.openai_base_url,
+                stream_usage=True,
+                max_retries=0,  # Retries are handled (deadline-aware) in LLMConnection
             )
-            logger.info(
-                "OpenAI connection initialized: %s", self._settings.fallback_model
-            )
+            logger.info("OpenAI connection initialized: %s", self.model_name)
             return self._llm
         except Exception as e:
             logger.error("OpenAI init failed: %s", e)
@@ -45,32 +54,10 @@ class OpenAIConnection(LLMConnection):
     def is_configured(self) -> bool:
         return bool(self._settings.openai_api_key)
 
-    def _parse_json(self, text: str) -> dict[str, Any]:
-        if not text:
-            return {
-                "error": "Empty response",
-                "error_type": "empty",
-                "service": self.name,
+    def _bind_structured(self, llm: ChatOpenAI, output: StructuredOutput) -> Any:
+        return llm.bind(
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": output.name, "schema": output.schema},
             }
-        text = text.strip().replace("```json", "").replace("```", "").strip()
-        pairs = [("{", "}"), ("[", "]")]
-        pairs.sort(key=lambda p: (text.find(p[0]) if text.find(p[0]) != -1 else float("inf")))
-        for start, end in pairs:
-            idx = text.find(start)
-            if idx != -1:
-                depth = 0
-                for i, c in enumerate(text[idx:], idx):
-                    if c == start:
-                        depth += 1
-                    elif c == end:
-                        depth -= 1
-                        if depth == 0:
-                            try:
-                                return json.loads(text[idx : i + 1])
-                            except json.JSONDecodeError:
-                                pass
-        return {
-            "error": "Invalid JSON response",
-            "error_type": "invalid_json",
-            "service": self.name,
-        }
+        )
@@ -0,0 +1,132 @@
+"""Provider error classification and jittered exponential backoff.
+
+Exceptions raised by LLM clients are mapped to an error_type:
+
+- transient: 5xx, overload, connection reset/timeout — retried on the same provider.
+- rate_limit: 429 / quota exhausted — retried after Retry-After when it fits the deadline.
+- auth: 401/403 or invalid API key — never retried, fail over immediately.
+- processing_error: anything else (e.g. a rejected request) — not retried.
+
+Invalid output (invalid_json, empty) is detected after parsing, not here.
+"""
+
+import email.utils
+import random
+import re
+import time
+from collections.abc import Iterator
+from typing import Any
+
+RETRYABLE_ERRORS = {"transient", "rate_limit"}
+INVALID_OUTPUT_ERRORS = {"invalid_json", "empty"}
+
+_TRANSIENT_STATUS = {408, 500, 502, 503, 504, 529}
+_AUTH_STATUS = {401, 403}
+_TRANSIENT_NAMES = ("Connect", "Timeout", "ServerError", "Unavailable", "Overloaded")
+# A status code in the message only counts with HTTP context ("Error code: 503",
+# "status code 429", "HTTP 502", or leading "503 UNAVAILABLE" as google-api-core
+# formats it); bare numbers such as "max_tokens ... got 500" are not statuses
+_STATUS_CODES = r"(401|403|408|429|500|502|503|504|529)"
+_STATUS_IN_TEXT_RE = re.compile(
+    rf"(?:status[_ ]?code|error[_ ]?code|\bstatus|\bhttp(?:/\d(?:\.\d)?)?)\W{{0,3}}"
+    rf"{_STATUS_CODES}\b|^\s*{_STATUS_CODES}\s+[A-Za-z]",
+    re.IGNORECASE,
+)
+_RETRY_DELAY_RE = re.compile(r"retry[_ ]?delay\W+(\d+(?:\.\d+)?)s", re.IGNORECASE)
+
+
+def _chain(exc: BaseException) -> Iterator[BaseException]:
+    """exc and its causes/contexts (client wrappers often re-raise SDK errors)."""
+    seen: set[int] = set()
+    current: BaseException | None = exc
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        yield current
+        current = current.__cause__ or current.__context__
+
+
+def _status_code(exc: BaseException) -> int | None:
+    for err in _chain(exc):
+        for candidate in (
+            getattr(err, "status_code", None),
+            getattr(err, "code", None),
+            getattr(getattr(err, "response", None), "status_code", None),
+        ):
+            if isinstance(candidate, int) and 100 <= candidate < 600:
+                return candidate
+    match = _STATUS_IN_TEXT_RE.search(str(exc))
+    return int(match.group(1) or match.group(2)) if match else None
+
+
+def classify_exception(exc: BaseException) -> str:
+    """Map a provider/client exception to transient, rate_limit, auth or processing_error.
+
+    Exceptions raised by the connection layer itself may carry their own error_type.
+    """
+    explicit = getattr(exc, "error_type", None)
+    if isinstance(explicit, str):
+        return explicit
+    status = _status_code(exc)
+    text = str(exc)
+    lowered = text.lower()
+    if status == 429 or "resource_exhausted" in lowered or "rate limit" in lowered:
+        return "rate_limit"
+    if status in _AUTH_STATUS or "api key" in lowered or "permission_denied" in lowered:
+        return "auth"
+    if (
+        status in _TRANSIENT_STATUS
+        or "unavailable" in lowered
+        or "overloaded" in lowered
+    ):
+        return "transient"
+    if any(
+        isinstance(err, ConnectionError | TimeoutError)
+        or any(name in type(err).__name__ for name in _TRANSIENT_NAMES)
+        for err in _chain(exc)
+    ):
+        return "transient"
+    return "processing_error"
+
+
+def retry_after_seconds(exc: BaseException) -> float | None:
+    """Delay requested by the provider (Retry-After header or Gemini retryDelay)."""
+    for err in _chain(exc):
+        headers = getattr(getattr(err, "response", None), "headers", None)
+        value = headers.get("retry-after") if headers is not None else None
+        if value:
+            try:
+                return max(float(value), 0.0)
+            except ValueError:
+                pass
+            try:
+                parsed = email.utils.parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                continue
+            return max(parsed.timestamp() - time.time(), 0.0)
+    match = _RETRY_DELAY_RE.search(str(exc))
+    return float(match.group(1)) if match else None
+
+
+def backoff_delay(
+    attempt: int,
+    base: float,
+    cap: float,
+    retry_after: float | None = None,
+) -> float:
+    """Full-jitter exponential backoff for retry number attempt (0-based).
+
+    A provider-requested retry_after is honored as a lower bound.
+    """
+    delay = random.uniform(0, min(cap, base * 2**attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def error_details(exc: BaseException) -> dict[str, Any]:
+    """error_type (and retry_after when present) for an exception's error dict."""
+    details: dict[str, Any] = {"error_type": classify_exception(exc)}
+    retry_after = retry_after_seconds(exc)
+    if retry_after is not None:
+        details["retry_after"] = retry_after
+    return details
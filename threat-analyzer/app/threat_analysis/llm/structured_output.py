@@ -0,0 +1,129 @@
+"""Provider-native structured output: JSON schemas for each pipeline stage.
+
+Schemas are generated from the Pydantic models (DiagramData, Threat, DreadScore),
+with $refs inlined so every provider receives a self-contained JSON Schema.
+Array outputs are wrapped in an object under ``root_key`` because OpenAI's
+json_schema mode only accepts a top-level object; connections unwrap it.
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic import BaseModel
+
+from app.threat_analysis.schemas import DiagramData, StrideCategory, Threat
+
+_DROPPED_KEYS = {"title", "default"}
+
+
+@dataclass(frozen=True)
+class StructuredOutput:
+    """JSON schema requested from a provider for one stage."""
+
+    name: str
+    schema: dict[str, Any]
+    root_key: str | None = None
+
+    @property
+    def root_type(self) -> type:
+        """Root of the stage's JSON in text mode: a list for wrapped arrays."""
+        return list if self.root_key else dict
+
+    def unwrap(self, result: Any) -> Any:
+        """Return result[root_key] for wrapped array outputs, else result unchanged."""
+        if self.root_key and isinstance(result, dict) and self.root_key in result:
+            return result[self.root_key]
+        return result
+
+
+def _inline(node: Any, defs: dict[str, Any]) -> Any:
+    """Resolve $ref against $defs, drop titles/defaults and collapse Optional[X] to X."""
+    if isinstance(node, list):
+        return [_inline(item, defs) for item in node]
+    if not isinstance(node, dict):
+        return node
+    if "$ref" in node:
+        return _inline(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+    any_of = node.get("anyOf")
+    if any_of and len(any_of) == 2 and {"type": "null"} in any_of:
+        inner = next(option for option in any_of if option != {"type": "null"})
+        merged = {k: v for k, v in node.items() if k != "anyOf"}
+        return _inline({**inner, **merged}, defs)
+    dropped = _DROPPED_KEYS | {"$defs"}
+    if "properties" in node:
+        dropped = dropped | {"description"}  # Model docstrings only add prompt tokens
+    inlined = {
+        key: _inline(value, defs)
+        for key, value in node.items()
+        if key not in dropped and key != "properties"
+    }
+    if "properties" in node:
+        inlined["properties"] = {
+            name: _inline(prop, defs) for name, prop in node["properties"].items()
+        }
+    return inlined
+
+
+def model_schema(
+    model: type[BaseModel],
+    *,
+    fields: tuple[str, ...] | None = None,
+    required: tuple[str, ...] | None = None,
+) -> dict[str, Any]:
+    """Self-contained JSON schema for model (by alias), optionally restricted to fields."""
+    raw = model.model_json_schema(by_alias=True)
+    schema = _inline(raw, raw.get("$defs", {}))
+    if fields is not None:
+        schema["properties"] = {name: schema["properties"][name] for name in fields}
+    if required is not None:
+        schema["required"] = list(required)
+    elif fields is not None:
+        schema["required"] = [f for f in schema.get("required", []) if f in fields]
+    return schema
+
+
+def _threat_list(item_schema: dict[str, Any]) -> dict[str, Any]:
+    item_schema["properties"]["threat_type"]["enum"] = [c.value for c in StrideCategory]
+    return {
+        "type": "object",
+        "properties": {"threats": {"type": "array", "items": item_schema}},
+        "required": ["threats"],
+    }
+
+
+_STRIDE_FIELDS = ("component_id", "threat_type", "description", "mitigation")
+
+GUARDRAIL_OUTPUT = StructuredOutput(
+    name="architecture_diagram_check",
+    schema={
+        "type": "object",
+        "properties": {
+            "is_architecture_diagram": {"type": "boolean"},
+            "reason": {"type": "string"},
+        },
+        "required": ["is_architecture_diagram", "reason"],
+    },
+)
+
+DIAGRAM_OUTPUT = StructuredOutput(
+    name="diagram_data",
+    schema=model_schema(DiagramData),
+)
+
+STRIDE_OUTPUT = StructuredOutput(
+    name="stride_threats",
+    schema=_threat_list(model_schema(Threat, fields=_STRIDE_FIELDS)),
+    root_key="threats",
+)
+
+DREAD_OUTPUT = StructuredOutput(
+    name="dread_scored_threats",
+    schema=_threat_list(
+        model_schema(
+            Threat,
+            fields=(*_STRIDE_FIELDS, "dread_score", "dread_details"),
+            required=(*_STRIDE_FIELDS, "dread_score", "dread_details"),
+        )
+    ),
+    root_key="threats",
+)
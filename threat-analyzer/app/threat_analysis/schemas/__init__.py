@@ -1,15 +1,25 @@
 """Threat Analysis schemas.
 
 This package defines:
+- attack_path: AttackPath, a route from an entry point to a sensitive asset.
 - base: BaseSchema and Pydantic config shared by all schemas.
 - component: Diagram structure (Component, Connection, TrustBoundary, DiagramData).
+- metrics: LLM token usage and latency (LLMCallMetrics, StageMetrics, AnalysisMetrics)
+  and RAG retrieval timing (RetrievalMetrics).
 - request: AnalysisRequest and get_analysis_request for the /analyze endpoint.
 - response: AnalysisResponse and RiskLevel for the API response.
 - threat: STRIDE categories, DreadScore, and Threat for threat modelling output.
 """
 
+from .attack_path import AttackPath
 from .base import BaseSchema
 from .component import Component, Connection, DiagramData, TrustBoundary
+from .metrics import (
+    AnalysisMetrics,
+    LLMCallMetrics,
+    RetrievalMetrics,
+    StageMetrics,
+)
 from .request import AnalysisRequest, get_analysis_request
 from .response import AnalysisResponse, RiskLevel
 from .threat import (
@@ -19,14 +29,19 @@ from .threat import (
 )
 
 __all__ = [
+    "AnalysisMetrics",
     "AnalysisRequest",
     "AnalysisResponse",
+    "AttackPath",
     "BaseSchema",
     "Component",
     "Connection",
     "DiagramData",
     "DreadScore",
+    "LLMCallMetrics",
+    "RetrievalMetrics",
     "RiskLevel",
+    "StageMetrics",
     "StrideCategory",
     "Threat",
     "TrustBoundary",
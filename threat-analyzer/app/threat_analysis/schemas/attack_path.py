@@ -0,0 +1,40 @@
+"""Attack path schema: a route from an entry point to a sensitive asset.
+
+Paths are enumerated over the diagram's connections after DREAD scoring; the
+likelihood of each hop comes from the threats of the component it reaches and
+from the connection (boundary crossing, encryption).
+"""
+
+from pydantic import Field
+
+from .base import BaseSchema
+
+
+class AttackPath(BaseSchema):
+    """A chain of components an attacker can traverse to reach an asset.
+
+    Starts at an entry point (User or ExternalService) and ends at a Database or
+    Storage component. risk_score is 10 x likelihood, the product of the hop
+    likelihoods along the path.
+    """
+
+    entry_point: str = Field(..., description="Id of the component the path starts at.")
+    target: str = Field(..., description="Id of the sensitive asset reached.")
+    component_ids: list[str] = Field(
+        ...,
+        description="Component ids along the path, entry point first, target last.",
+    )
+    likelihood: float = Field(
+        ...,
+        ge=0,
+        le=1,
+        description="Estimated probability (0–1) that the whole path is exploited.",
+    )
+    risk_score: float = Field(
+        ..., ge=0, le=10, description="Path risk from 0 to 10 (10 x likelihood)."
+    )
+    boundary_crossings: int = Field(
+        default=0,
+        ge=0,
+        description="Connections along the path that cross a trust boundary.",
+    )
@@ -111,8 +111,8 @@ class DiagramData(BaseSchema):
     """Structured representation of the architecture diagram after extraction.
 
     Contains the model that performed the extraction, the list of detected components
-    and connections, and the list of trust boundary names. Used internally in the
-    pipeline before STRIDE/DREAD analysis.
+    and connections, and the trust boundaries with their member components. Used
+    internally in the pipeline before STRIDE/DREAD analysis.
     """
 
     model: str = Field(
@@ -127,7 +127,7 @@ class DiagramData(BaseSchema):
         default_factory=list,
         description="All connections (data flows / dependencies) between components.",
     )
-    boundaries: list[str] = Field(
+    boundaries: list[TrustBoundary] = Field(
         default_factory=list,
-        description="Names of trust boundaries detected in the diagram.",
+        description="Trust boundaries detected in the diagram, with their component ids.",
     )
@@ -0,0 +1,90 @@
+"""LLM usage metrics attached to an analysis response.
+
+Every provider call records token usage (as reported by the provider), time spent
+waiting for a concurrency slot, time to first token and total latency. Calls are
+aggregated per pipeline stage (guardrail, diagram, stride, dread) and per analysis.
+RAG retrievals report their slot wait and latency alongside.
+"""
+
+from typing import Literal
+
+from pydantic import Field
+
+from .base import BaseSchema
+
+
+class LLMCallMetrics(BaseSchema):
+    """Usage and timing of a single LLM provider call."""
+
+    stage: str = Field(
+        ..., description="Pipeline stage (guardrail, diagram, stride, dread)."
+    )
+    provider: str = Field(..., description="Provider name (Gemini, OpenAI, Ollama).")
+    model: str = Field(..., description="Model used for the call.")
+    mode: Literal["structured", "text"] = Field(
+        ..., description="Native structured output or prompt-driven JSON."
+    )
+    outcome: str = Field(..., description='"ok" or the error_type of the failed call.')
+    input_tokens: int | None = Field(
+        default=None, description="Prompt tokens reported by the provider."
+    )
+    output_tokens: int | None = Field(
+        default=None, description="Completion tokens reported by the provider."
+    )
+    cached_input_tokens: int | None = Field(
+        default=None,
+        description="Prompt tokens served from the provider's prefix/context cache.",
+    )
+    queue_wait_seconds: float = Field(
+        default=0.0, description="Time waiting for a provider concurrency slot."
+    )
+    time_to_first_token_seconds: float | None = Field(
+        default=None,
+        description="Time from request to first streamed chunk (None when not streaming).",
+    )
+    latency_seconds: float = Field(
+        ..., description="Total call time including queue wait."
+    )
+
+
+class StageMetrics(BaseSchema):
+    """LLM usage aggregated over all calls of one pipeline stage."""
+
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_input_tokens: int = 0
+    cached_token_ratio: float = 0.0
+    queue_wait_seconds: float = 0.0
+    latency_seconds: float = 0.0
+
+
+class RetrievalMetrics(BaseSchema):
+    """RAG retrievals of one analysis, run in the retrieval thread pool."""
+
+    calls: int = 0
+    timeouts: int = 0
+    queue_wait_seconds: float = Field(
+        default=0.0, description="Time waiting for a retrieval slot."
+    )
+    latency_seconds: float = Field(
+        default=0.0, description="Total retrieval time including queue wait."
+    )
+
+
+class AnalysisMetrics(BaseSchema):
+    """LLM usage for a whole analysis: totals, per-stage breakdown and individual calls."""
+
+    llm_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_input_tokens: int = 0
+    cached_token_ratio: float = Field(
+        default=0.0, description="Share of input tokens served from provider caches."
+    )
+    latency_seconds: float = 0.0
+    stages: dict[str, StageMetrics] = Field(default_factory=dict)
+    calls: list[LLMCallMetrics] = Field(default_factory=list)
+    retrieval: RetrievalMetrics | None = Field(
+        default=None, description="RAG retrievals (None when none was made)."
+    )
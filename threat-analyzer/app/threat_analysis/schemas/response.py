@@ -1,15 +1,18 @@
 """API response schemas for the threat analysis endpoint.
 
 The main response (AnalysisResponse) returns the extracted diagram structure,
-the list of threats with STRIDE/DREAD, and an aggregate risk score and level.
+the list of threats with STRIDE/DREAD, an aggregate risk score and level, and
+the top attack paths with a path-aware risk score.
 """
 
 from enum import Enum
 
 from pydantic import Field, computed_field
 
+from .attack_path import AttackPath
 from .base import BaseSchema
 from .component import Component, Connection
+from .metrics import AnalysisMetrics
 from .threat import Threat
 
 
@@ -46,6 +49,7 @@ class AnalysisResponse(BaseSchema):
     Contains the components and connections extracted from the diagram, the
     list of threats (each with STRIDE category and DREAD scoring), and an
     overall risk_score (0–10) plus risk_level (LOW/MEDIUM/HIGH/CRITICAL).
+    attack_paths and path_risk_score rank routes from entry points to data stores.
     threat_count and component_count are computed for convenience.
     """
 
@@ -75,10 +79,24 @@ class AnalysisResponse(BaseSchema):
         ...,
         description="Aggregate risk level (LOW/MEDIUM/HIGH/CRITICAL) from risk_score.",
     )
+    attack_paths: list[AttackPath] = Field(
+        default_factory=list,
+        description="Most likely attack paths from entry points to data stores, riskiest first.",
+    )
+    path_risk_score: float | None = Field(
+        default=None,
+        ge=0,
+        le=10,
+        description="Path-aware risk (0–10): chance that at least one attack path succeeds.",
+    )
     processing_time: float | None = Field(
         default=None,
         description="Total analysis processing time in seconds, if measured.",
     )
+    metrics: AnalysisMetrics | None = Field(
+        default=None,
+        description="LLM token usage and latency per call, per stage and in total.",
+    )
 
     @computed_field
     @property
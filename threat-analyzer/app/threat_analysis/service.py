@@ -10,11 +10,28 @@ from threat_modeling_shared.logging import get_logger
 from app.config import Settings, get_settings
 
 from .agents import DiagramAgent, DreadAgent, StrideAgent
+from .attack_paths import find_attack_paths, path_risk_score
+from .consolidation import consolidate_threats
+from .deadline import Deadline, deadline_scope
+from .dread_prescorer import get_prescorer
+from .graph import DiagramGraph
 from .guardrails import validate_architecture_diagram
-from .schemas import AnalysisResponse, Component, Connection, RiskLevel, Threat
+from .llm.metrics import collect_llm_metrics
+from .schemas import (
+    AnalysisResponse,
+    AttackPath,
+    Component,
+    Connection,
+    RiskLevel,
+    Threat,
+)
+from .stride_rules import get_rule_engine
 
 logger = get_logger("service")
 
+# Relative share of the remaining request budget given to each stage, in order
+STAGE_BUDGET_WEIGHTS = {"guardrail": 1, "diagram": 3, "stride": 4, "dread": 2}
+
 
 class ThreatModelService:
     """Service for orchestrating threat model analysis (Diagram → STRIDE → DREAD)."""
@@ -51,16 +68,51 @@ class ThreatModelService:
             self._dread_agent = DreadAgent(self._settings)
         return self._dread_agent
 
-    async def run_full_analysis(self, image_bytes: bytes) -> AnalysisResponse:
-        """Run the complete threat analysis pipeline: guardrail, then Diagram → STRIDE → DREAD."""
-        await validate_architecture_diagram(image_bytes, self._settings)
+    async def run_full_analysis(
+        self, image_bytes: bytes, deadline: Deadline | None = None
+    ) -> AnalysisResponse:
+        """Run the complete threat analysis pipeline: guardrail, then Diagram → STRIDE → DREAD.
+
+        Each stage runs under a slice of the remaining time until deadline (default:
+        analysis_timeout_seconds from now). Token usage and latency of every LLM call
+        are attached as response.metrics.
+        """
+        if deadline is None:
+            deadline = Deadline.after(self._settings.analysis_timeout_seconds)
+        with collect_llm_metrics() as llm_metrics:
+            response = await self._run_pipeline(image_bytes, deadline)
+        response.metrics = llm_metrics.build()
+        logger.info(
+            "LLM usage: %d calls, %d input tokens, %d output tokens",
+            response.metrics.llm_calls,
+            response.metrics.input_tokens,
+            response.metrics.output_tokens,
+        )
+        return response
+
+    @staticmethod
+    def _stage_deadline(deadline: Deadline, stage: str) -> Deadline:
+        """Slice of the remaining budget for stage, weighted against the stages left."""
+        stages = list(STAGE_BUDGET_WEIGHTS)
+        pending = stages[stages.index(stage) :]
+        share = STAGE_BUDGET_WEIGHTS[stage] / sum(
+            STAGE_BUDGET_WEIGHTS[s] for s in pending
+        )
+        return deadline.slice(share)
+
+    async def _run_pipeline(
+        self, image_bytes: bytes, deadline: Deadline
+    ) -> AnalysisResponse:
+        with deadline_scope(self._stage_deadline(deadline, "guardrail")):
+            await validate_architecture_diagram(image_bytes, self._settings)
 
         start_time = time.time()
 
         # Stage 1: Diagram Analysis
         stage1_start = time.time()
         logger.info("Stage 1: Diagram Analysis started")
-        diagram_data = await self.diagram_agent.analyze(image_bytes)
+        with deadline_scope(self._stage_deadline(deadline, "diagram")):
+            diagram_data = await self.diagram_agent.analyze(image_bytes)
         stage1_elapsed = round(time.time() - stage1_start, 2)
         logger.info(
             "Stage 1: Diagram Analysis complete in %.2fs (%d components, %d connections)",
@@ -68,28 +120,47 @@ class ThreatModelService:
             len(diagram_data.get("components", [])),
             len(diagram_data.get("connections", [])),
         )
+        # One graph for the STRIDE rules, the DREAD pre-scorer and attack paths
+        graph = get_rule_engine(self._settings.stride_rules_path).graph(diagram_data)
 
         # Stage 2: STRIDE Analysis
         stage2_start = time.time()
         logger.info("Stage 2: STRIDE Analysis started")
-        threats = await self.stride_agent.analyze(diagram_data)
+        with deadline_scope(self._stage_deadline(deadline, "stride")):
+            threats = await self.stride_agent.analyze(diagram_data, graph)
         stage2_elapsed = round(time.time() - stage2_start, 2)
         logger.info(
             "Stage 2: STRIDE Analysis complete in %.2fs (%d threats)",
             stage2_elapsed,
             len(threats),
         )
+        if self._settings.threat_consolidation:
+            threats = consolidate_threats(
+                threats,
+                threshold=self._settings.threat_similarity_threshold,
+                num_perm=self._settings.threat_minhash_permutations,
+                bands=self._settings.threat_lsh_bands,
+                shingle_size=self._settings.threat_shingle_size,
+            )
 
         # Stage 3: DREAD Scoring
         stage3_start = time.time()
         logger.info("Stage 3: DREAD Scoring started")
-        scored_threats = await self.dread_agent.analyze(threats)
+        prescored, threats = self._prescore_threats(threats, diagram_data, graph)
+        with deadline_scope(self._stage_deadline(deadline, "dread")):
+            scored_threats = prescored + await self.dread_agent.analyze(threats)
         stage3_elapsed = round(time.time() - stage3_start, 2)
-        logger.info("Stage 3: DREAD Scoring complete in %.2fs", stage3_elapsed)
+        logger.info(
+            "Stage 3: DREAD Scoring complete in %.2fs (%d local, %d by LLM)",
+            stage3_elapsed,
+            len(prescored),
+            len(threats),
+        )
 
         # Calculate overall risk
         risk_score = self._calculate_risk_score(scored_threats)
         risk_level = RiskLevel.from_score(risk_score)
+        attack_paths = self._find_attack_paths(graph, scored_threats)
 
         processing_time = round(time.time() - start_time, 2)
         logger.info(
@@ -103,7 +174,7 @@ class ThreatModelService:
 
         parsed = self._parse_threats(scored_threats)
         parsed.sort(
-            key=lambda t: (t.dread_score if t.dread_score is not None else 0.0),
+            key=lambda t: t.dread_score if t.dread_score is not None else 0.0,
             reverse=True,
         )
         return AnalysisResponse(
@@ -113,9 +184,46 @@ class ThreatModelService:
             threats=parsed,
             risk_score=round(risk_score, 2),
             risk_level=risk_level,
+            attack_paths=[AttackPath(**p) for p in attack_paths],
+            path_risk_score=(
+                path_risk_score(attack_paths) if self._settings.attack_paths else None
+            ),
             processing_time=processing_time,
         )
 
+    def _prescore_threats(
+        self,
+        threats: list[dict[str, Any]],
+        diagram_data: dict[str, Any],
+        graph: DiagramGraph,
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """Split threats into (scored by the local pre-scorer, left for DreadAgent)."""
+        if not self._settings.dread_prescore:
+            return [], threats
+        return get_prescorer(self._settings.dread_prescorer_path).split(
+            threats, diagram_data, self._settings.dread_prescore_min_confidence, graph
+        )
+
+    def _find_attack_paths(
+        self, graph: DiagramGraph, threats: list[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """Top attack paths over the diagram graph, weighted by the scored threats."""
+        if not self._settings.attack_paths:
+            return []
+        paths = find_attack_paths(
+            graph,
+            threats,
+            k=self._settings.attack_path_count,
+            max_hops=self._settings.attack_path_max_hops,
+        )
+        if paths:
+            logger.info(
+                "Attack paths: %d found, top risk %.2f",
+                len(paths),
+                paths[0]["risk_score"],
+            )
+        return paths
+
     def _calculate_risk_score(self, threats: list[dict[str, Any]]) -> float:
         """Calculate the overall risk score from scored threats.
 
@@ -208,7 +316,9 @@ class ThreatModelService:
             try:
                 key = self._threat_dedup_key(threat)
                 if key in seen:
-                    logger.debug("Dropping duplicate threat: %s - %s", key[0], key[1][:80])
+                    logger.debug(
+                        "Dropping duplicate threat: %s - %s", key[0], key[1][:80]
+                    )
                     continue
                 seen.add(key)
                 result.append(
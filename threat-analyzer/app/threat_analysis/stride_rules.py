@@ -0,0 +1,184 @@
+"""Rule-based STRIDE baseline: threats predictable from component types and connections.
+
+Rules live in stride_rules.json (or Settings.stride_rules_path) and are indexed
+by component type and connection protocol, so the baseline of a diagram is built
+locally in microseconds:
+
+- component_rules: threats every component of a type has (e.g. Database →
+  Information Disclosure of data at rest);
+- connection_rules: threats of a connection, by protocol ("*" = any) and
+  conditions on encryption and trust-boundary crossing;
+- reachability_rules: threats of a component reachable from another type within
+  max_hops connections (e.g. Database reachable from User → Elevation of Privilege).
+
+Boundary crossings come from the diagram graph (trust-boundary membership, or
+external_types when the diagram only names its boundaries). Encryption comes from
+Connection.encrypted or, when unknown, from the protocol (encrypted_protocols /
+plaintext_protocols).
+"""
+
+import json
+import re
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from .graph import DiagramGraph
+from .schemas.component import ComponentType
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent / "stride_rules.json"
+
+_TYPE_KEY_RE = re.compile(r"[^a-z0-9]")
+
+
+def _type_key(value: str) -> str:
+    return _TYPE_KEY_RE.sub("", value.lower())
+
+
+class StrideRuleEngine:
+    """Compiled STRIDE rule set; baseline() applies it to diagram data."""
+
+    def __init__(self, rules: dict[str, Any]) -> None:
+        self._types = {_type_key(t.value): t.value for t in ComponentType}
+        for alias, canonical in rules.get("type_aliases", {}).items():
+            self._types[_type_key(alias)] = canonical
+        self._external = frozenset(rules.get("external_types", []))
+        self._encrypted = frozenset(
+            p.upper() for p in rules.get("encrypted_protocols", [])
+        )
+        self._plaintext = frozenset(
+            p.upper() for p in rules.get("plaintext_protocols", [])
+        )
+        self._by_type: dict[str, list[dict[str, Any]]] = dict(
+            rules.get("component_rules", {})
+        )
+        self._by_protocol: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        for rule in rules.get("connection_rules", []):
+            for protocol in rule.get("protocols", ["*"]):
+                self._by_protocol[protocol.upper()].append(rule)
+        self._reachability = list(rules.get("reachability_rules", []))
+
+    @classmethod
+    def from_file(cls, path: Path) -> "StrideRuleEngine":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def component_type(self, raw: Any) -> str | None:
+        """ComponentType value for a diagram type (aliases such as "RDS" included)."""
+        if not raw:
+            return None
+        return self._types.get(_type_key(str(raw)))
+
+    def is_external(self, component_type: str | None) -> bool:
+        """Whether a component type sits outside the trust boundary (users, clients, ...)."""
+        return component_type in self._external
+
+    def encrypted(self, connection: dict[str, Any]) -> bool | None:
+        """Connection.encrypted, else inferred from the protocol (None = unknown)."""
+        if isinstance(connection.get("encrypted"), bool):
+            return connection["encrypted"]
+        protocol = str(connection.get("protocol") or "").strip().upper()
+        if protocol in self._encrypted:
+            return True
+        if protocol in self._plaintext:
+            return False
+        return None
+
+    def graph(self, diagram_data: dict[str, Any]) -> DiagramGraph:
+        """Indexed graph of diagram_data with this rule set's types and encryption."""
+        return DiagramGraph.from_diagram(diagram_data, self)
+
+    def baseline(
+        self, diagram_data: dict[str, Any], graph: DiagramGraph | None = None
+    ) -> list[dict[str, Any]]:
+        """Baseline threats (component_id, threat_type, description, mitigation)."""
+        graph = graph or self.graph(diagram_data)
+        components, types = graph.components, graph.types
+        threats: list[dict[str, Any]] = []
+        seen: set[tuple[str, str, str]] = set()
+
+        def add(rule: dict[str, Any], component_id: str, **values: Any) -> None:
+            key = (rule["id"], component_id, str(values.get("source", "")))
+            if key in seen:
+                return
+            seen.add(key)
+            threats.append(
+                {
+                    "component_id": component_id,
+                    "threat_type": rule["threat_type"],
+                    "description": rule["description"].format_map(values),
+                    "mitigation": rule["mitigation"],
+                }
+            )
+
+        for cid, component in components.items():
+            for rule in self._by_type.get(types[cid] or "", ()):
+                add(rule, cid, **self._values(component, cid))
+
+        for edge in graph.edges:
+            facts = {
+                "encrypted": edge.encrypted,
+                "crosses_boundary": edge.crosses_boundary,
+            }
+            values = {
+                "source": self._name(components[edge.source], edge.source),
+                "target": self._name(components[edge.target], edge.target),
+                "protocol": edge.protocol or "an unknown protocol",
+            }
+            rules = [*self._by_protocol.get(edge.protocol, ()), *self._by_protocol["*"]]
+            for rule in rules:
+                if all(facts.get(k) == v for k, v in rule.get("when", {}).items()):
+                    affected = (
+                        edge.target if rule.get("target", "to") == "to" else edge.source
+                    )
+                    add(rule, affected, **values)
+
+        for rule in self._reachability:
+            for cid, origin in self._reachable(graph, rule).items():
+                add(
+                    rule,
+                    cid,
+                    **self._values(components[cid], cid),
+                    source=self._name(components[origin], origin),
+                )
+        return threats
+
+    @staticmethod
+    def _reachable(graph: DiagramGraph, rule: dict[str, Any]) -> dict[str, str]:
+        """Components of to_types reachable from from_types (id -> origin id), BFS."""
+        types = graph.types
+        from_types, to_types = set(rule["from_types"]), set(rule["to_types"])
+        max_hops = rule.get("max_hops")
+        origin = {cid: cid for cid, t in types.items() if t in from_types}
+        frontier, hops, found = list(origin), 0, {}
+        while frontier and (max_hops is None or hops < max_hops):
+            hops += 1
+            following = []
+            for node in frontier:
+                for edge in graph.out_edges.get(node, ()):
+                    neighbour = edge.target
+                    if neighbour in origin:
+                        continue
+                    origin[neighbour] = origin[node]
+                    following.append(neighbour)
+                    if types[neighbour] in to_types:
+                        found[neighbour] = origin[node]
+            frontier = following
+        return found
+
+    @staticmethod
+    def _name(component: dict[str, Any], cid: str) -> str:
+        return str(component.get("name") or cid)
+
+    def _values(self, component: dict[str, Any], cid: str) -> dict[str, Any]:
+        return {
+            "id": cid,
+            "name": self._name(component, cid),
+            "type": component.get("type"),
+        }
+
+
+@lru_cache
+def get_rule_engine(path: Path | None = None) -> StrideRuleEngine:
+    """Rule engine for path (default: bundled stride_rules.json), compiled once."""
+    return StrideRuleEngine.from_file(path or DEFAULT_RULES_PATH)
@@ -0,0 +1 @@
+"""Benchmarks for CPU-bound hot paths of the analyzer pipeline."""
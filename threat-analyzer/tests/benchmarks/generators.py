@@ -0,0 +1,144 @@
+"""Synthetic, seeded inputs for the benchmarks: diagrams, threats and LLM outputs."""
+
+import json
+import random
+from typing import Any
+
+STRIDE_CATEGORIES = (
+    "Spoofing",
+    "Tampering",
+    "Repudiation",
+    "Information Disclosure",
+    "Denial of Service",
+    "Elevation of Privilege",
+)
+COMPONENT_TYPES = (
+    "User",
+    "Gateway",
+    "LoadBalancer",
+    "API",
+    "Service",
+    "Database",
+    "Cache",
+    "Queue",
+    "Storage",
+    "ExternalService",
+)
+PROTOCOLS = ("HTTPS", "HTTP", "gRPC", "AMQP", "TCP", "SQL")
+DREAD_DIMENSIONS = (
+    "damage",
+    "reproducibility",
+    "exploitability",
+    "affected_users",
+    "discoverability",
+)
+
+
+def synthetic_diagram(components: int, seed: int = 0) -> dict[str, Any]:
+    """Diagram with the given number of components and ~1.5 connections per component."""
+    rng = random.Random(seed)
+    nodes = [
+        {
+            "id": f"c{i}",
+            "type": COMPONENT_TYPES[i % len(COMPONENT_TYPES)],
+            "name": f"{COMPONENT_TYPES[i % len(COMPONENT_TYPES)]} {i}",
+            "description": f"Synthetic component {i} in zone {i % 5}",
+        }
+        for i in range(components)
+    ]
+    connections = []
+    for i in range(1, components):
+        connections.append(_connection(rng, rng.randrange(i), i))
+        if rng.random() < 0.5:
+            connections.append(_connection(rng, i, rng.randrange(components)))
+    return {
+        "model": "synthetic",
+        "components": nodes,
+        "connections": connections,
+        "boundaries": [
+            {"name": f"zone-{z}", "components": [n["id"] for n in nodes[z::5]]}
+            for z in range(min(5, components))
+        ],
+    }
+
+
+def _connection(rng: random.Random, source: int, target: int) -> dict[str, Any]:
+    protocol = rng.choice(PROTOCOLS)
+    return {
+        "from": f"c{source}",
+        "to": f"c{target}",
+        "protocol": protocol,
+        "encrypted": protocol in ("HTTPS", "gRPC"),
+    }
+
+
+def synthetic_threats(
+    count: int,
+    components: int = 50,
+    duplicate_ratio: float = 0.2,
+    scored: bool = True,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    """STRIDE threats (with DREAD scores when scored); duplicate_ratio of them repeat
+    an earlier threat with different casing/whitespace, as LLMs tend to do."""
+    rng = random.Random(seed)
+    threats: list[dict[str, Any]] = []
+    for i in range(count):
+        if threats and rng.random() < duplicate_ratio:
+            original = rng.choice(threats)
+            threat = {
+                **original,
+                "description": "  " + original["description"].upper() + "\n",
+            }
+        else:
+            category = STRIDE_CATEGORIES[i % len(STRIDE_CATEGORIES)]
+            component = f"c{rng.randrange(max(components, 1))}"
+            threat = {
+                "component_id": component,
+                "threat_type": category,
+                "description": (
+                    f"{category} of {component} via unauthenticated request path "
+                    f"#{i} exposing internal data {{tenant}} [scope]"
+                ),
+                "mitigation": f"Enforce authentication and input validation ({i}).",
+            }
+            if scored:
+                details = {d: rng.randint(1, 10) for d in DREAD_DIMENSIONS}
+                threat["dread_details"] = details
+                threat["dread_score"] = round(sum(details.values()) / 5, 2)
+        threats.append(threat)
+    return threats
+
+
+def synthetic_chunks(count: int, seed: int = 0) -> list[dict[str, Any]]:
+    """Knowledge-base chunks (~800 chars) mixing STRIDE vocabulary, CWE ids and protocols."""
+    rng = random.Random(seed)
+    vocabulary = [
+        *(c.lower() for c in STRIDE_CATEGORIES),
+        *(t.lower() for t in COMPONENT_TYPES),
+        *(p.lower() for p in PROTOCOLS),
+        *(f"word{i}" for i in range(2000)),
+    ]
+    chunks = []
+    for i in range(count):
+        words = rng.choices(vocabulary, k=110)
+        words.insert(rng.randrange(len(words)), f"CWE-{rng.randrange(1, 1000)}")
+        chunks.append({"page_content": " ".join(words), "metadata": {"chunk": i}})
+    return chunks
+
+
+def llm_output(value: Any, style: str = "fenced") -> str:
+    """Provider-like text around a JSON value: fenced, prefixed prose or truncated."""
+    body = json.dumps(value, indent=2)
+    if style == "fenced":
+        return f"Here is the analysis:\n```json\n{body}\n```\nLet me know if needed."
+    if style == "prefixed":
+        return f"Notes [draft] {{see below}}: {body} Done."
+    if style == "truncated":
+        return body[: int(len(body) * 0.9)]
+    return body
+
+
+def synthetic_image(size: int, seed: int = 0) -> bytes:
+    """Random bytes standing in for an uploaded diagram image."""
+    return random.Random(seed).randbytes(size)
@@ -0,0 +1,332 @@
+"""Benchmark: CPU-bound hot paths of the pipeline on synthetic inputs.
+
+Covers agent JSON extraction, the connections' _parse_json (including truncated
+array salvage), the STRIDE rule baseline, the diagram graph and its STRIDE
+prompt, near-duplicate consolidation, DREAD pre-scoring, attack-path search,
+threat dedup keys and parsing, LLM cache keys, Pydantic construction of
+AnalysisResponse, RAG BM25 / NumPy vector search and RAG context packing, for
+diagrams of 10-500 components, 100-5000 threats, 500-5000 knowledge-base chunks
+and 24-96 retrieved chunks. Each case reports time per call and peak traced memory.
+
+Run as a test (every case runs once and is in the baseline) or as a CLI that
+measures and compares against baseline.json:
+
+    cd threat-analyzer && python -m tests.benchmarks.test_hot_paths
+    cd threat-analyzer && python -m tests.benchmarks.test_hot_paths -k parse_threats
+    cd threat-analyzer && python -m tests.benchmarks.test_hot_paths --write-baseline
+
+Timings are machine dependent: regenerate the baseline on the machine that
+compares against it (e.g. the CI runner).
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from app.config import get_settings
+from app.services.context_packing import pack_context
+from app.services.embeddings import HashedNgramEmbeddings
+from app.services.lexical_index import BM25Index
+from app.services.numpy_store import NumpyVectorStore
+from app.threat_analysis.agents.stride.agent import StrideAgent
+from app.threat_analysis.attack_paths import find_attack_paths
+from app.threat_analysis.consolidation import consolidate_threats
+from app.threat_analysis.dread_prescorer import get_prescorer
+from app.threat_analysis.llm.cache import LLMCacheService
+from app.threat_analysis.llm.ollama_connection import OllamaConnection
+from app.threat_analysis.schemas import AnalysisResponse, RiskLevel
+from app.threat_analysis.service import ThreatModelService
+from app.threat_analysis.stride_rules import get_rule_engine
+from tests.benchmarks.generators import (
+    llm_output,
+    synthetic_chunks,
+    synthetic_diagram,
+    synthetic_image,
+    synthetic_threats,
+)
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+COMPONENT_SIZES = (10, 100, 500)
+THREAT_SIZES = (100, 1000, 5000)
+IMAGE_SIZES = (100_000, 1_000_000)
+CHUNK_SIZES = (500, 5000)
+# Retrieved chunks packed into the STRIDE context (rag_max_queries x rag_top_k)
+PACKED_CHUNK_SIZES = (24, 96)
+
+
+def _cases() -> dict[str, Callable[[], Callable[[], Any]]]:
+    """Case name -> setup returning the zero-argument callable to measure."""
+    settings = get_settings()
+    service = ThreatModelService(settings)
+    agent = StrideAgent.__new__(StrideAgent)  # Only the parsing helpers are used
+    connection = OllamaConnection(settings)
+    cache = LLMCacheService(redis_url="")
+    rules = get_rule_engine()
+    prescorer = get_prescorer()
+    prescore_diagram = synthetic_diagram(50)
+    cases: dict[str, Callable[[], Callable[[], Any]]] = {}
+
+    for n in THREAT_SIZES:
+        threats = synthetic_threats(n)
+        fenced = llm_output(threats, "fenced")
+        prefixed = llm_output(threats, "prefixed")
+        truncated = llm_output(threats, "truncated")
+        cases[f"extract_json_content[threats={n}]"] = lambda text=fenced: (
+            lambda: agent._extract_json_content(text)
+        )
+        cases[f"parse_json_prefixed[threats={n}]"] = lambda text=prefixed: (
+            lambda: connection._parse_json(text)
+        )
+        cases[f"parse_json_truncated[threats={n}]"] = lambda text=truncated: (
+            lambda: connection._parse_json(text)
+        )
+        cases[f"threat_dedup_key[threats={n}]"] = lambda threats=threats: (
+            lambda: [service._threat_dedup_key(t) for t in threats]
+        )
+        cases[f"consolidate_threats[threats={n}]"] = lambda threats=threats: (
+            lambda: consolidate_threats(threats)
+        )
+        cases[f"dread_prescore[threats={n}]"] = lambda threats=threats: (
+            lambda: prescorer.split(threats, prescore_diagram, 0.7)
+        )
+        cases[f"parse_threats[threats={n}]"] = lambda threats=threats: (
+            lambda: service._parse_threats(threats)
+        )
+
+    for n in COMPONENT_SIZES:
+        diagram = synthetic_diagram(n)
+        messages = [
+            {"role": "system", "content": "STRIDE instructions"},
+            {
+                "role": "user",
+                "content": agent._format_components(diagram["components"])
+                + agent._format_connections(diagram["connections"]),
+            },
+        ]
+        text_key = json.dumps(messages, sort_keys=True)
+        cases[f"stride_rule_baseline[components={n}]"] = lambda diagram=diagram: (
+            lambda: rules.baseline(diagram)
+        )
+        cases[f"stride_graph_prompt[components={n}]"] = lambda diagram=diagram: (
+            lambda: agent._format_graph(
+                rules.graph(diagram), diagram["connections"], restrict=False
+            )
+        )
+        cases[f"cache_key_text[components={n}]"] = lambda key=text_key: (
+            lambda: cache._key("stride", key)
+        )
+        threats = synthetic_threats(n * 10, components=n, duplicate_ratio=0.0)
+        cases[f"attack_paths[components={n}]"] = (
+            lambda diagram=diagram, threats=threats: (
+                lambda: find_attack_paths(rules.graph(diagram), threats)
+            )
+        )
+        cases[f"analysis_response[components={n},threats={n * 10}]"] = (
+            lambda diagram=diagram, threats=threats: (
+                lambda: _analysis_response(service, diagram, threats)
+            )
+        )
+
+    for n in CHUNK_SIZES:
+        index = BM25Index.build(synthetic_chunks(n))
+        cases[f"bm25_search[chunks={n}]"] = lambda index=index: (
+            lambda: index.search("Database SQL injection CWE-89 tampering", 6)
+        )
+        store, query = _vector_store(n, dimensions=768)
+        cases[f"numpy_vector_search[chunks={n},dim=768]"] = (
+            lambda store=store, query=query: (
+                lambda: store.similarity_search_by_vector(query, k=6)
+            )
+        )
+
+    for n in PACKED_CHUNK_SIZES:
+        retrieved = _retrieved_chunks(n)
+        cases[f"rag_pack_context[chunks={n}]"] = lambda retrieved=retrieved: (
+            lambda: pack_context(retrieved, max_tokens=1200)
+        )
+
+    for size in IMAGE_SIZES:
+        image = synthetic_image(size)
+        cases[f"cache_key_vision[image_bytes={size}]"] = lambda image=image: (
+            lambda: cache._key("diagram", "prompt", image)
+        )
+    return cases
+
+
+def _vector_store(chunks: int, dimensions: int) -> tuple[NumpyVectorStore, list[float]]:
+    """In-memory NumpyVectorStore with seeded random vectors, and a query vector."""
+    rng = np.random.default_rng(0)
+    store = NumpyVectorStore(Path("/nonexistent"), HashedNgramEmbeddings())
+    store.upsert_vectors(
+        [str(i) for i in range(chunks)],
+        rng.standard_normal((chunks, dimensions)).tolist(),
+        [Document(page_content=f"chunk {i}") for i in range(chunks)],
+    )
+    return store, rng.standard_normal(dimensions).tolist()
+
+
+def _retrieved_chunks(count: int) -> list[tuple[Document, float]]:
+    """Scored chunks as from retrieve_scored: three consecutive chunks per source."""
+    chunks = []
+    for rank, chunk in enumerate(synthetic_chunks(count)):
+        metadata = {"source": f"kb/{rank // 3}.md", "start_index": rank % 3 * 800}
+        chunks.append(
+            (
+                Document(page_content=chunk["page_content"], metadata=metadata),
+                1 / (61 + rank),
+            )
+        )
+    return chunks
+
+
+def _analysis_response(
+    service: ThreatModelService,
+    diagram: dict[str, Any],
+    threats: list[dict[str, Any]],
+) -> AnalysisResponse:
+    """Response assembly as at the end of the pipeline, including JSON serialization."""
+    response = AnalysisResponse(
+        model_used=diagram["model"],
+        components=service._parse_components(diagram["components"]),
+        connections=service._parse_connections(diagram["connections"]),
+        threats=service._parse_threats(threats),
+        risk_score=5.0,
+        risk_level=RiskLevel.MEDIUM,
+        processing_time=1.0,
+    )
+    response.model_dump_json()
+    return response
+
+
+def measure(
+    func: Callable[[], Any], min_time: float = 0.2, max_runs: int = 50
+) -> dict[str, float]:
+    """Median seconds per call (at least 3 runs, about min_time in total) and peak KiB."""
+    func()  # Warm-up
+    times: list[float] = []
+    total_start = time.perf_counter()
+    while len(times) < 3 or (
+        time.perf_counter() - total_start < min_time and len(times) < max_runs
+    ):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds": round(statistics.median(times), 7),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+) -> list[str]:
+    """Cases slower (or using more memory) than baseline * tolerance."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for metric in ("seconds", "peak_kib"):
+            if reference[metric] and result[metric] > reference[metric] * tolerance:
+                regressions.append(
+                    f"{name}: {metric} {result[metric]:g} > "
+                    f"{reference[metric]:g} x {tolerance:g}"
+                )
+    return regressions
+
+
+def _load_baseline(path: Path) -> dict[str, dict[str, float]]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))["cases"]
+
+
+CASES = _cases()
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_case_runs(name):
+    assert CASES[name]()() is not None
+
+
+def test_baseline_covers_every_case():
+    assert set(_load_baseline(BASELINE_PATH)) == set(CASES)
+
+
+def test_parse_threats_drops_generated_duplicates():
+    threats = synthetic_threats(1000, duplicate_ratio=0.2)
+    parsed = ThreatModelService(get_settings())._parse_threats(threats)
+    assert 700 < len(parsed) < 900
+
+
+def test_compare_flags_regressions():
+    baseline = {"a": {"seconds": 1.0, "peak_kib": 10.0}}
+    assert compare({"a": {"seconds": 1.2, "peak_kib": 10.0}}, baseline, 1.5) == []
+    (regression,) = compare({"a": {"seconds": 2.0, "peak_kib": 10.0}}, baseline, 1.5)
+    assert regression.startswith("a: seconds")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-k", dest="filter", help="Only cases containing this text")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument(
+        "--write-baseline", action="store_true", help="Save results as the baseline"
+    )
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)  # e.g. salvage warnings on every truncated case
+
+    baseline = _load_baseline(args.baseline)
+    results: dict[str, dict[str, float]] = {}
+    print(f"{'case':50s} {'time':>12s} {'peak':>12s} {'vs base':>8s}")
+    for name, setup in CASES.items():
+        if args.filter and args.filter not in name:
+            continue
+        result = results[name] = measure(setup())
+        reference = baseline.get(name, {}).get("seconds")
+        ratio = f"{result['seconds'] / reference:7.2f}x" if reference else "       -"
+        print(
+            f"{name:50s} {result['seconds'] * 1e3:10.3f}ms "
+            f"{result['peak_kib']:9.1f}KiB {ratio}"
+        )
+
+    if args.write_baseline:
+        if args.filter:
+            results = {**baseline, **results}
+        payload = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cases": dict(sorted(results.items())),
+        }
+        args.baseline.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
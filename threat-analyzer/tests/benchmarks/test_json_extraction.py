@@ -0,0 +1,94 @@
+"""Benchmark: JSON extraction over a corpus of provider outputs (fenced, prefixed, truncated).
+
+Run as a test (correctness + time budget) or print timings:
+
+    cd threat-analyzer && python -m tests.benchmarks.test_json_extraction
+"""
+
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from app.threat_analysis.exceptions import JSONParsingError
+from app.threat_analysis.llm.json_extraction import extract_json, salvage_json_array
+
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+
+# Expected top-level shape per corpus file: (type, length) or None when unparseable.
+EXPECTED = {
+    "gemini_fenced_diagram.txt": (dict, 4),
+    "gemini_guardrail_prose.txt": (dict, 2),
+    "ollama_generic_fence_diagram.txt": (dict, 4),
+    "ollama_prefixed_dread.txt": (list, 2),
+    "openai_raw_stride.txt": (list, 3),
+    "openai_truncated_stride.txt": None,
+}
+
+
+def _synthetic_outputs() -> dict[str, str]:
+    """Large generated outputs: a big fenced STRIDE list and bracket-heavy strings."""
+    threats = [
+        {
+            "component_id": f"c{i}",
+            "threat_type": "Tampering",
+            "description": f"Payload with braces {{x}} and ranges 0] and [1 ({i})",
+            "mitigation": "Validate input.",
+        }
+        for i in range(2000)
+    ]
+    body = json.dumps(threats, indent=2)
+    return {
+        "synthetic_fenced_2000_threats": f"Here you go:\n```json\n{body}\n```",
+        "synthetic_prefixed_2000_threats": f"Notes [draft] {{see}}: {body} Bye.",
+    }
+
+
+def _corpus() -> dict[str, str]:
+    return {
+        p.name: p.read_text(encoding="utf-8") for p in sorted(CORPUS_DIR.glob("*.txt"))
+    }
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+def test_corpus_extraction(name):
+    text = (CORPUS_DIR / name).read_text(encoding="utf-8")
+    expected = EXPECTED[name]
+    if expected is None:
+        with pytest.raises(JSONParsingError):
+            extract_json(text)
+        assert salvage_json_array(text)
+        return
+    result = extract_json(text)
+    assert isinstance(result, expected[0])
+    assert len(result) == expected[1]
+
+
+@pytest.mark.parametrize("name", sorted(_synthetic_outputs()))
+def test_synthetic_extraction_within_budget(name):
+    text = _synthetic_outputs()[name]
+    start = time.perf_counter()
+    result = extract_json(text)
+    assert time.perf_counter() - start < 0.5
+    assert len(result) == 2000
+
+
+def main(iterations: int = 200) -> None:
+    """Print mean extraction time per corpus entry."""
+    entries = {**_corpus(), **_synthetic_outputs()}
+    print(f"{'output':40s} {'bytes':>8s} {'mean':>12s}")
+    for name, text in entries.items():
+        runs = iterations if len(text) < 10_000 else max(1, iterations // 20)
+        start = time.perf_counter()
+        for _ in range(runs):
+            try:
+                extract_json(text)
+            except JSONParsingError:
+                pass
+        mean_us = (time.perf_counter() - start) / runs * 1e6
+        print(f"{name:40s} {len(text):8d} {mean_us:10.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Benchmark: replay recorded LLM cassettes through ThreatModelService, offline.
+
+The diagrams in test-assets/ are analysed end to end (guardrail → diagram → STRIDE →
+DREAD) with every provider call served from cassettes/ (llm_cassette_mode="replay"),
+so pipeline regressions show up without network access or provider cost.
+
+Run as a test (all calls replayed, no latency) or as a CLI that reports per-stage
+p50/p95 LLM latency, analysis p50/p95, throughput and (--allocations) memory:
+
+    cd threat-analyzer && python -m tests.benchmarks.test_replay_pipeline
+    cd threat-analyzer && python -m tests.benchmarks.test_replay_pipeline \\
+        --latency-scale 0.5 --repeat 5 --concurrency 4 --allocations --json out.json
+
+Re-record the cassettes after changing prompts, schemas or models (uses the
+configured providers, e.g. scripts/llm_stub_server.py via OPENAI_BASE_URL/...):
+
+    cd threat-analyzer && python -m tests.benchmarks.test_replay_pipeline --record
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from app.config import Settings
+from app.threat_analysis.service import ThreatModelService
+
+CASSETTE_DIR = Path(__file__).resolve().parent / "cassettes"
+STAGES = ("guardrail", "diagram", "stride", "dread")
+
+
+def _assets_dir() -> Path | None:
+    """test-assets/ at the repository root (or next to tests/ in the test image)."""
+    for parent in Path(__file__).resolve().parents:
+        candidate = parent / "test-assets"
+        if candidate.is_dir():
+            return candidate
+    return None
+
+
+def _corpus(assets: Path | None) -> dict[str, bytes]:
+    if assets is None:
+        return {}
+    return {
+        p.name: p.read_bytes()
+        for p in sorted(assets.iterdir())
+        if p.suffix.lower() in (".png", ".jpg", ".jpeg", ".webp")
+    }
+
+
+def _settings(
+    mode: str, cassettes: Path, latency_scale: float, **overrides: Any
+) -> Settings:
+    """Fixed models and no response cache, so fingerprints match the recordings."""
+    values: dict[str, Any] = {
+        "llm_cassette_mode": mode,
+        "llm_cassette_dir": cassettes,
+        "llm_cassette_latency_scale": latency_scale,
+        "redis_url": "",
+        "knowledge_base_path": "/nonexistent",
+        "gemini_context_cache": False,
+        "primary_model": "gemini-1.5-pro",
+        "fast_model": "gemini-1.5-flash",
+        "fallback_model": "gpt-4o",
+        "openai_fast_model": "gpt-4o-mini",
+    }
+    if mode == "replay":
+        # Connections must look configured; no request leaves the process.
+        values.update(google_api_key="replay", openai_api_key="replay")
+    return Settings(**{**values, **overrides})
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(-(-q * len(ordered) // 100)), 1)
+    return ordered[rank - 1]
+
+
+async def run_corpus(
+    settings: Settings,
+    corpus: dict[str, bytes],
+    repeat: int = 1,
+    concurrency: int = 1,
+    trace_allocations: bool = False,
+) -> dict[str, Any]:
+    """Analyse every corpus image repeat times and aggregate timings (and allocations).
+
+    tracemalloc slows CPU-bound code, so allocation tracing is opt-in.
+    """
+    service = ThreatModelService(settings)
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    runs: list[dict[str, Any]] = []
+
+    async def analyse(name: str, image: bytes) -> None:
+        async with semaphore:
+            if trace_allocations and concurrency == 1:
+                tracemalloc.reset_peak()
+            start = time.perf_counter()
+            response = await service.run_full_analysis(image)
+            elapsed = time.perf_counter() - start
+            metrics = response.metrics
+            runs.append(
+                {
+                    "image": name,
+                    "seconds": elapsed,
+                    "threats": len(response.threats),
+                    "stages": {
+                        stage: values.latency_seconds
+                        for stage, values in metrics.stages.items()
+                    },
+                    "misses": sum(
+                        1 for c in metrics.calls if c.outcome == "cassette_miss"
+                    ),
+                    "peak_bytes": tracemalloc.get_traced_memory()[1]
+                    if trace_allocations
+                    else 0,
+                }
+            )
+
+    started_tracing = trace_allocations and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        wall_start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                analyse(name, image)
+                for _ in range(repeat)
+                for name, image in corpus.items()
+            )
+        )
+        wall = time.perf_counter() - wall_start
+        peak = max(
+            [tracemalloc.get_traced_memory()[1], *(r["peak_bytes"] for r in runs)]
+        )
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+    return _report(runs, wall, peak)
+
+
+def _report(runs: list[dict[str, Any]], wall: float, peak: int) -> dict[str, Any]:
+    seconds = [r["seconds"] for r in runs]
+    stages = {}
+    for stage in STAGES:
+        values = [r["stages"][stage] for r in runs if stage in r["stages"]]
+        if not values:
+            continue
+        stages[stage] = {
+            "p50_seconds": round(_percentile(values, 50), 4),
+            "p95_seconds": round(_percentile(values, 95), 4),
+        }
+    peaks = [r["peak_bytes"] for r in runs]
+    return {
+        "analyses": len(runs),
+        "cassette_misses": sum(r["misses"] for r in runs),
+        "threats": {r["image"]: r["threats"] for r in runs},
+        "analysis_p50_seconds": round(_percentile(seconds, 50), 4),
+        "analysis_p95_seconds": round(_percentile(seconds, 95), 4),
+        "throughput_per_second": round(len(runs) / wall, 3) if wall else 0.0,
+        "stages": stages,
+        "peak_mib": round(peak / 2**20, 2),
+        "analysis_peak_mib_p50": round(statistics.median(peaks) / 2**20, 2)
+        if peaks
+        else 0.0,
+    }
+
+
+CORPUS = _corpus(_assets_dir())
+
+
+@pytest.mark.skipif(not CORPUS, reason="test-assets/ not available")
+def test_replay_corpus_offline():
+    settings = _settings("replay", CASSETTE_DIR, latency_scale=0.0)
+    report = asyncio.run(run_corpus(settings, CORPUS))
+    assert report["cassette_misses"] == 0, "re-record cassettes (--record)"
+    assert report["analyses"] == len(CORPUS)
+    assert all(count > 0 for count in report["threats"].values())
+    assert set(report["stages"]) == set(STAGES)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--record", action="store_true", help="Call providers, save")
+    parser.add_argument("--assets", type=Path, default=_assets_dir())
+    parser.add_argument("--cassettes", type=Path, default=CASSETTE_DIR)
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument(
+        "--allocations", action="store_true", help="Trace allocations (tracemalloc)"
+    )
+    parser.add_argument("--json", type=Path, help="Write the report to this file")
+    args = parser.parse_args(argv)
+
+    corpus = _corpus(args.assets)
+    if not corpus:
+        print(f"No diagrams found in {args.assets}", file=sys.stderr)
+        return 2
+    mode = "record" if args.record else "replay"
+    settings = _settings(mode, args.cassettes, args.latency_scale)
+    report = asyncio.run(
+        run_corpus(
+            settings,
+            corpus,
+            repeat=args.repeat,
+            concurrency=args.concurrency,
+            trace_allocations=args.allocations,
+        )
+    )
+
+    print(f"{mode}: {report['analyses']} analyses, {len(corpus)} diagrams")
+    print(f"{'stage':12s} {'p50':>10s} {'p95':>10s}")
+    for stage, values in report["stages"].items():
+        print(
+            f"{stage:12s} {values['p50_seconds']:9.3f}s {values['p95_seconds']:9.3f}s"
+        )
+    print(
+        f"{'analysis':12s} {report['analysis_p50_seconds']:9.3f}s "
+        f"{report['analysis_p95_seconds']:9.3f}s"
+    )
+    print(f"throughput   {report['throughput_per_second']:.3f} analyses/s")
+    if args.allocations:
+        print(
+            f"allocations  peak {report['peak_mib']:.2f} MiB, "
+            f"per-analysis peak p50 {report['analysis_peak_mib_p50']:.2f} MiB"
+        )
+    if report["cassette_misses"]:
+        print(f"cassette misses: {report['cassette_misses']}", file=sys.stderr)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    return 1 if report["cassette_misses"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -39,3 +39,16 @@ class TestHealthRouter:
         r = client.get("/health/live")
         assert r.status_code == 200
         assert r.json()["status"] == "alive"
+
+    def test_health_ready_includes_readiness_details(self):
+        from fastapi import FastAPI
+
+        router = create_health_router(
+            "Test", readiness_details=lambda: {"rag": {"state": "warming"}}
+        )
+        app = FastAPI()
+        app.include_router(router)
+        r = TestClient(app).get("/health/ready")
+        assert r.status_code == 200
+        assert r.json()["status"] == "ready"
+        assert r.json()["rag"] == {"state": "warming"}
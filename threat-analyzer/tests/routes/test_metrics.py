@@ -0,0 +1,32 @@
+"""Unit tests for app.routers.metrics."""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers.metrics import router
+from app.threat_analysis.llm.metrics import registry
+from app.threat_analysis.schemas.metrics import LLMCallMetrics
+
+
+class TestMetricsRouter:
+    def test_metrics_exposes_llm_series(self):
+        app = FastAPI()
+        app.include_router(router)
+        registry.reset()
+        registry.observe(
+            LLMCallMetrics(
+                stage="dread",
+                provider="OpenAI",
+                model="gpt-4o-mini",
+                mode="text",
+                outcome="ok",
+                input_tokens=10,
+                output_tokens=3,
+                latency_seconds=1.0,
+            )
+        )
+        r = TestClient(app).get("/metrics")
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/plain")
+        assert 'llm_output_tokens_total{stage="dread",provider="OpenAI"' in r.text
+        registry.reset()
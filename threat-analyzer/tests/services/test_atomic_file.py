@@ -0,0 +1,49 @@
+"""Unit tests for app.services.atomic_file."""
+
+import threading
+
+import pytest
+
+from app.services.atomic_file import atomic_open, atomic_write_text
+
+
+def test_replaces_file_and_leaves_no_temporaries(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text("old", encoding="utf-8")
+    atomic_write_text(path, "novo conteúdo")
+    assert path.read_text(encoding="utf-8") == "novo conteúdo"
+    assert [p.name for p in tmp_path.iterdir()] == ["manifest.json"]
+
+
+def test_failed_write_keeps_previous_file(tmp_path):
+    path = tmp_path / "vectors.npy"
+    path.write_bytes(b"old")
+    with pytest.raises(RuntimeError), atomic_open(path) as f:
+        f.write(b"partial")
+        raise RuntimeError("disk full")
+    assert path.read_bytes() == b"old"
+    assert [p.name for p in tmp_path.iterdir()] == ["vectors.npy"]
+
+
+def test_concurrent_writers_use_their_own_temporary(tmp_path):
+    path = tmp_path / "bm25.json"
+    barrier = threading.Barrier(8)
+    errors = []
+
+    def write(i):
+        try:
+            with atomic_open(path) as f:
+                barrier.wait(timeout=5)
+                f.write(str(i).encode() * 1000)
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    content = path.read_text()
+    assert len(content) == 1000 and len(set(content)) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["bm25.json"]
@@ -0,0 +1,98 @@
+"""Unit tests for app.services.context_packing."""
+
+from langchain_core.documents import Document
+
+from app.config import get_settings
+from app.services.context_packing import pack_context
+from app.services.rag_index import splitter
+
+SOURCE = (
+    "Spoofing lets an attacker impersonate a user or service. "
+    "Require mutual TLS between services and short-lived signed tokens for users. "
+    "Rotate credentials and alert on logins from unknown devices."
+)
+
+
+def _chunk(text, start=None, source="stride/spoofing.md"):
+    metadata = {"source": source}
+    if start is not None:
+        metadata["start_index"] = start
+    return Document(page_content=text, metadata=metadata)
+
+
+def test_respects_token_budget():
+    chunks = [
+        (_chunk("a" * 20, source="a.md"), 0.4),
+        (_chunk("b" * 40, source="b.md"), 0.3),
+        (_chunk("c" * 10, source="c.md"), 0.2),
+        (_chunk("  ", source="d.md"), 0.1),
+    ]
+    assert pack_context(chunks, max_tokens=10) == "a" * 20 + "\n" + "c" * 10
+    assert pack_context(chunks, max_tokens=0) == ""
+
+
+def test_drops_near_duplicate_chunks_from_other_sources():
+    copy = SOURCE.replace("Rotate credentials", "Also rotate credentials")
+    chunks = [
+        (_chunk(SOURCE), 0.5),
+        (_chunk(copy, source="owasp/auth.md"), 0.4),
+        (_chunk("Tampering: sign messages with HMAC.", source="t.md"), 0.1),
+    ]
+    assert pack_context(chunks, max_tokens=1000) == (
+        SOURCE + "\nTampering: sign messages with HMAC."
+    )
+    assert (
+        pack_context(chunks, max_tokens=1000, duplicate_threshold=1.0).count(
+            "impersonate"
+        )
+        == 2
+    )
+
+
+def test_merges_overlapping_and_adjacent_chunks_of_a_source():
+    first, second, third = SOURCE[:56], SOURCE[57:133], SOURCE[134:]
+    overlapping = [(_chunk(second, 57), 0.5), (_chunk(SOURCE[:80], 0), 0.4)]
+    assert pack_context(overlapping, max_tokens=1000) == SOURCE[:133]
+    # the budget counts the merged passage (133 chars), not the repeated overlap
+    assert pack_context(overlapping, max_tokens=35) == SOURCE[:133]
+
+    adjacent = [(_chunk(third, 134), 0.5), (_chunk(first, 0), 0.4)]
+    adjacent.append((_chunk(second, 57), 0.3))
+    assert pack_context(adjacent, max_tokens=1000) == "\n".join([first, second, third])
+
+
+def test_same_text_from_other_source_is_not_merged():
+    chunks = [
+        (_chunk(SOURCE[:60], 0), 0.5),
+        (_chunk(SOURCE[50:120], 50, source="other.md"), 0.4),
+    ]
+    assert pack_context(chunks, max_tokens=1000) == (
+        SOURCE[:60] + "\n" + SOURCE[50:120]
+    )
+
+
+def test_fills_budget_by_marginal_relevance():
+    top = "Injection: use parameterized queries for every database call."
+    mostly_same = top + " Log rejected queries."
+    novel = "Repudiation: keep tamper-evident audit logs of admin actions."
+    chunks = [
+        (_chunk(top, source="a.md"), 1.0),
+        (_chunk(mostly_same, source="b.md"), 0.9),
+        (_chunk(novel, source="c.md"), 0.5),
+    ]
+    assert pack_context(chunks, max_tokens=35, duplicate_threshold=1.0) == (
+        top + "\n" + novel
+    )
+
+
+def test_split_knowledge_base_chunks_pack_back_to_the_source():
+    settings = get_settings().model_copy(
+        update={"rag_chunk_size": 60, "rag_chunk_overlap": 25}
+    )
+    docs = splitter(settings).create_documents(
+        [SOURCE], metadatas=[{"source": "stride/spoofing.md"}]
+    )
+    assert len(docs) > 2
+    chunks = [(doc, 1 / (60 + rank)) for rank, doc in enumerate(docs, start=1)]
+    assert pack_context(chunks, max_tokens=1000) == SOURCE
+    assert len(pack_context(chunks, max_tokens=20)) <= 80
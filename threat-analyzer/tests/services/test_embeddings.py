@@ -0,0 +1,61 @@
+"""Unit tests for app.services.embeddings."""
+
+import numpy as np
+import pytest
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+from app.config import get_settings
+from app.services.embeddings import HashedNgramEmbeddings, get_embeddings
+
+
+class TestHashedNgramEmbeddings:
+    def test_vectors_are_unit_length_and_deterministic(self):
+        embeddings = HashedNgramEmbeddings(dimensions=128)
+        first, empty = embeddings.embed_documents(["SQL injection", ""])
+        assert len(first) == 128
+        assert np.linalg.norm(first) == pytest.approx(1.0)
+        assert embeddings.embed_query("SQL injection") == first
+        assert HashedNgramEmbeddings(dimensions=128).embed_query("sql  INJECTION") == (
+            first
+        )
+        assert not any(empty)
+
+    def test_related_texts_are_closer(self):
+        embeddings = HashedNgramEmbeddings()
+        query, near, far = (
+            np.array(v)
+            for v in embeddings.embed_documents(
+                [
+                    "database injection threats",
+                    "SQL injection against the database",
+                    "cross-site scripting in the browser",
+                ],
+                task_type="retrieval_query",
+            )
+        )
+        assert query @ near > query @ far
+
+    def test_rejects_non_positive_dimensions(self):
+        with pytest.raises(ValueError):
+            HashedNgramEmbeddings(dimensions=0)
+
+
+class TestGetEmbeddings:
+    def _settings(self, model):
+        return get_settings().model_copy(
+            update={"embedding_model": model, "google_api_key": "key"}
+        )
+
+    def test_local_model_and_dimensions(self):
+        embeddings = get_embeddings(self._settings("local:hashed-ngram:512"))
+        assert isinstance(embeddings, HashedNgramEmbeddings)
+        assert embeddings.dimensions == 512
+        assert get_embeddings(self._settings("local:hashed-ngram")).dimensions == 1024
+
+    def test_unknown_local_model(self):
+        with pytest.raises(ValueError, match="Unknown local embedding model"):
+            get_embeddings(self._settings("local:onnx"))
+
+    def test_remote_model(self):
+        embeddings = get_embeddings(self._settings("models/embedding-001"))
+        assert isinstance(embeddings, GoogleGenerativeAIEmbeddings)
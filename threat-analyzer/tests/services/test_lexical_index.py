@@ -0,0 +1,61 @@
+"""Unit tests for app.services.lexical_index."""
+
+from langchain_core.documents import Document
+
+from app.services.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+CHUNKS = [
+    "SQL injection (CWE-89) against the database: use parameterized queries.",
+    "Cross-site scripting (CWE-79) in the browser: encode output.",
+    "Redis without TLS exposes cached sessions; enable TLS and AUTH.",
+    "Generic advice: apply least privilege to the database user.",
+]
+
+
+def _index():
+    return BM25Index.build(
+        [{"page_content": text, "metadata": {"n": i}} for i, text in enumerate(CHUNKS)]
+    )
+
+
+def test_tokenize_keeps_compound_terms_and_parts():
+    assert tokenize("CWE-89 via TLS1.2, OAuth2/OIDC") == [
+        "cwe-89",
+        "cwe",
+        "89",
+        "via",
+        "tls1.2",
+        "tls1",
+        "2",
+        "oauth2/oidc",
+        "oauth2",
+        "oidc",
+    ]
+
+
+class TestBM25Index:
+    def test_exact_identifiers_rank_first(self):
+        index = _index()
+        assert index.search("CWE-79", 1)[0].page_content == CHUNKS[1]
+        assert index.search("redis", 2)[0].metadata == {"n": 2}
+        # Rare terms (sql, injection) outweigh the common one (database)
+        assert index.search("database sql injection", 2)[0].page_content == CHUNKS[0]
+
+    def test_no_shared_term_no_result(self):
+        assert _index().search("kerberos", 3) == []
+        assert BM25Index.build([]).search("anything", 3) == []
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        index = _index()
+        index.key = {"files": {"a.md": "hash"}}
+        index.save(tmp_path / "bm25.json")
+        loaded = BM25Index.load(tmp_path / "bm25.json")
+        assert loaded.key == index.key
+        assert loaded.search("tls", 1) == index.search("tls", 1)
+        assert BM25Index.load(tmp_path / "missing.json") is None
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a, b, c = (Document(page_content=t) for t in "abc")
+    fused = reciprocal_rank_fusion([[a, b, c], [b, c]], k=2)
+    assert [d.page_content for d in fused] == ["b", "c"]
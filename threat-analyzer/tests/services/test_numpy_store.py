@@ -0,0 +1,67 @@
+"""Unit tests for app.services.numpy_store."""
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from app.services.embeddings import HashedNgramEmbeddings
+from app.services.numpy_store import SIDECAR_NAME, VECTORS_NAME, NumpyVectorStore
+
+TEXTS = [
+    "SQL injection against the database",
+    "Cross-site scripting in the browser",
+    "Unencrypted HTTP between gateway and API",
+]
+
+
+def _store(tmp_path):
+    store = NumpyVectorStore(tmp_path, HashedNgramEmbeddings(dimensions=128))
+    store.add_texts(TEXTS, [{"n": i} for i in range(len(TEXTS))], ids=["a", "b", "c"])
+    return store
+
+
+class TestNumpyVectorStore:
+    def test_search_ranks_by_cosine(self, tmp_path):
+        store = _store(tmp_path)
+        docs = store.similarity_search("database SQL injection", k=2)
+        assert docs[0] == Document(page_content=TEXTS[0], metadata={"n": 0})
+        assert len(docs) == 2
+        assert len(store.similarity_search("anything", k=10)) == 3
+
+    def test_reopens_memory_mapped(self, tmp_path):
+        _store(tmp_path)
+        reopened = NumpyVectorStore(tmp_path, HashedNgramEmbeddings(dimensions=128))
+        assert isinstance(reopened._matrix, np.memmap)
+        assert reopened._matrix.dtype == np.float32
+        assert np.linalg.norm(reopened._matrix, axis=1) == pytest.approx(1.0)
+        assert reopened.indexed_ids() == ["a", "b", "c"]
+        assert reopened.similarity_search("browser scripting", k=1)[0].metadata == {
+            "n": 1
+        }
+
+    def test_upsert_and_delete(self, tmp_path):
+        store = _store(tmp_path)
+        embeddings = HashedNgramEmbeddings(dimensions=128)
+        store.delete_ids(["a"])
+        store.upsert_vectors(
+            ["b", "d"],
+            embeddings.embed_documents(["XSS in templates", "Redis without AUTH"]),
+            [Document(page_content="XSS in templates"), Document(page_content="Redis")],
+        )
+        store.persist()
+        reopened = NumpyVectorStore(tmp_path, embeddings)
+        assert reopened.indexed_ids() == ["b", "c", "d"]
+        assert reopened.similarity_search("XSS templates", k=1)[0].page_content == (
+            "XSS in templates"
+        )
+
+    def test_inconsistent_files_load_as_empty(self, tmp_path):
+        _store(tmp_path)
+        np.save(tmp_path / VECTORS_NAME, np.zeros((2, 128), dtype=np.float32))
+        assert len(NumpyVectorStore(tmp_path, HashedNgramEmbeddings(128))) == 0
+        (tmp_path / SIDECAR_NAME).unlink()
+        assert len(NumpyVectorStore(tmp_path, HashedNgramEmbeddings(128))) == 0
+
+    def test_dimension_mismatch(self, tmp_path):
+        with pytest.raises(ValueError, match="dimensions"):
+            _store(tmp_path).similarity_search_by_vector([1.0, 0.0], k=1)
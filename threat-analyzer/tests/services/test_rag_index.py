@@ -0,0 +1,231 @@
+"""Unit tests for app.services.rag_index."""
+
+import threading
+
+import pytest
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+
+from app.config import get_settings
+from app.services.context_packing import pack_context
+from app.services.embeddings import HashedNgramEmbeddings
+from app.services.numpy_store import VECTORS_NAME, NumpyVectorStore
+from app.services.rag_index import (
+    LEXICAL_INDEX_NAME,
+    MANIFEST_NAME,
+    ChromaIndex,
+    embed_batches,
+    index_version,
+    load_manifest,
+    load_or_build_lexical_index,
+    scan_sources,
+    sync_index,
+)
+
+
+class CountingEmbeddings(HashedNgramEmbeddings):
+    """Local embeddings that record every embedded text and worker thread."""
+
+    def __init__(self):
+        super().__init__(dimensions=64)
+        self.embedded = []
+        self.threads = set()
+
+    def embed_documents(self, texts, task_type=None):
+        self.embedded.extend(texts)
+        self.threads.add(threading.current_thread().name)
+        return super().embed_documents(texts)
+
+
+def _settings(**update):
+    return get_settings().model_copy(
+        update={
+            "embedding_model": "local:hashed-ngram:64",
+            "rag_chunk_size": 40,
+            "rag_chunk_overlap": 0,
+            **update,
+        }
+    )
+
+
+def _sync(kb_path, embeddings, backend, **settings):
+    persist_dir = kb_path / "chroma_db"
+    persist_dir.mkdir(exist_ok=True)
+    if backend == "numpy":
+        index = NumpyVectorStore(persist_dir, embeddings)
+    else:
+        index = ChromaIndex(
+            Chroma(persist_directory=str(persist_dir), embedding_function=embeddings)
+        )
+    settings = _settings(rag_vector_store=backend, **settings)
+    return index, sync_index(index, embeddings, kb_path, persist_dir, settings)
+
+
+def _texts(index):
+    if isinstance(index, ChromaIndex):
+        return sorted(index.store.get()["documents"])
+    return sorted(d["page_content"] for d in index._documents)
+
+
+def _documents(index, source):
+    """Indexed chunks (Documents) of one source file."""
+    if isinstance(index, ChromaIndex):
+        data = index.store.get(include=["documents", "metadatas"])
+        entries = zip(data["documents"], data["metadatas"], strict=True)
+    else:
+        entries = ((d["page_content"], d["metadata"]) for d in index._documents)
+    return [
+        Document(page_content=text, metadata=metadata)
+        for text, metadata in entries
+        if metadata["source"] == str(source)
+    ]
+
+
+def _file_stamps(persist_dir):
+    """(inode, mtime) of the index files; a rewrite (temp file + replace) changes both."""
+    return {
+        path.name: (path.stat().st_ino, path.stat().st_mtime_ns)
+        for path in (persist_dir / MANIFEST_NAME, persist_dir / VECTORS_NAME)
+        if path.exists()
+    }
+
+
+def _write_kb(kb_path):
+    (kb_path / "stride").mkdir()
+    (kb_path / "stride" / "spoofing.md").write_text(
+        "Spoofing: attackers impersonate users.\n\nUse strong authentication.",
+        encoding="utf-8",
+    )
+    (kb_path / "tampering.md").write_text(
+        "Tampering: data modified in transit.\n\nEnforce TLS on every hop.",
+        encoding="utf-8",
+    )
+
+
+@pytest.mark.parametrize("backend", ["chroma", "numpy"])
+class TestSyncIndex:
+    def test_initial_build_then_unchanged_restart_embeds_nothing(
+        self, tmp_path, backend
+    ):
+        _write_kb(tmp_path)
+        embeddings = CountingEmbeddings()
+        index, manifest = _sync(tmp_path, embeddings, backend)
+        assert len(embeddings.embedded) == 4
+        assert len(index.indexed_ids()) == 4
+        assert set(manifest["files"]) == {"stride/spoofing.md", "tampering.md"}
+        assert load_manifest(tmp_path / "chroma_db") == manifest
+
+        persist_dir = tmp_path / "chroma_db"
+        written = _file_stamps(persist_dir)
+        restarted = CountingEmbeddings()
+        index, again = _sync(tmp_path, restarted, backend)
+        assert restarted.embedded == []
+        assert index_version(again) == index_version(manifest)
+        # a no-op restart rewrites neither the manifest nor vectors.npy
+        assert _file_stamps(persist_dir) == written
+
+    def test_only_changed_chunks_are_embedded_or_deleted(self, tmp_path, backend):
+        _write_kb(tmp_path)
+        _, before = _sync(tmp_path, CountingEmbeddings(), backend)
+        (tmp_path / "tampering.md").write_text(
+            "Tampering: data modified in transit.\n\nSign messages with HMAC.",
+            encoding="utf-8",
+        )
+        (tmp_path / "stride" / "spoofing.md").unlink()
+
+        embeddings = CountingEmbeddings()
+        index, after = _sync(tmp_path, embeddings, backend)
+        assert embeddings.embedded == ["Sign messages with HMAC."]
+        assert _texts(index) == [
+            "Sign messages with HMAC.",
+            "Tampering: data modified in transit.",
+        ]
+        assert set(after["files"]) == {"tampering.md"}
+        assert index_version(after) != index_version(before)
+
+    def test_edit_refreshes_offsets_of_unchanged_chunks(self, tmp_path, backend):
+        _write_kb(tmp_path)
+        _, before = _sync(tmp_path, CountingEmbeddings(), backend)
+        source = tmp_path / "tampering.md"
+        text = "Tamper-proof logs.\n\n" + source.read_text(encoding="utf-8")
+        source.write_text(text, encoding="utf-8")
+
+        embeddings = CountingEmbeddings()
+        index, after = _sync(tmp_path, embeddings, backend)
+        assert embeddings.embedded == ["Tamper-proof logs."]
+        docs = _documents(index, source)
+        assert len(docs) == 3
+        for doc in docs:
+            start = doc.metadata["start_index"]
+            assert text[start : start + len(doc.page_content)] == doc.page_content
+        # stale offsets would overlap the new first chunk and drop text here
+        assert pack_context([(doc, 1.0) for doc in docs], max_tokens=1000) == (
+            "Tamper-proof logs.\nTampering: data modified in transit.\n"
+            "Enforce TLS on every hop."
+        )
+        assert index_version(after) != index_version(before)
+
+    def test_config_change_or_missing_manifest_rebuilds(self, tmp_path, backend):
+        _write_kb(tmp_path)
+        _sync(tmp_path, CountingEmbeddings(), backend)
+        embeddings = CountingEmbeddings()
+        index, _ = _sync(tmp_path, embeddings, backend, rag_chunk_size=1000)
+        assert len(embeddings.embedded) == 2
+        assert len(index.indexed_ids()) == 2
+
+        (tmp_path / "chroma_db" / MANIFEST_NAME).unlink()
+        embeddings = CountingEmbeddings()
+        index, _ = _sync(tmp_path, embeddings, backend, rag_chunk_size=1000)
+        assert len(embeddings.embedded) == 2
+        assert len(index.indexed_ids()) == 2
+
+
+def test_index_missing_manifest_chunks_is_rebuilt(tmp_path):
+    _write_kb(tmp_path)
+    _sync(tmp_path, CountingEmbeddings(), "numpy")
+    (tmp_path / "chroma_db" / VECTORS_NAME).unlink()
+    embeddings = CountingEmbeddings()
+    index, _ = _sync(tmp_path, embeddings, "numpy")
+    assert len(embeddings.embedded) == 4
+    assert len(index.indexed_ids()) == 4
+
+
+def test_scan_sources_skips_index_directories(tmp_path):
+    _write_kb(tmp_path)
+    (tmp_path / "chroma_db-local-hashed-ngram").mkdir()
+    (tmp_path / "chroma_db-local-hashed-ngram" / "notes.md").write_text("x")
+    assert list(scan_sources(tmp_path)) == ["stride/spoofing.md", "tampering.md"]
+
+
+def test_embed_batches_keeps_order_with_bounded_workers():
+    embeddings = CountingEmbeddings()
+    texts = [f"text {i}" for i in range(10)]
+    vectors = embed_batches(embeddings, texts, batch_size=3, concurrency=2)
+    assert vectors == HashedNgramEmbeddings(dimensions=64).embed_documents(texts)
+    assert len(embeddings.threads) <= 2
+    assert all(name.startswith("rag-index") for name in embeddings.threads)
+
+
+def test_lexical_index_is_reused_until_sources_change(tmp_path):
+    _write_kb(tmp_path)
+    persist_dir = tmp_path / "chroma_db"
+    index = load_or_build_lexical_index(tmp_path, persist_dir, _settings())
+    assert len(index.documents) == 4
+    assert (persist_dir / LEXICAL_INDEX_NAME).exists()
+    (tls,) = index.search("TLS", 1)
+    assert tls.page_content == "Enforce TLS on every hop."
+    assert tls.metadata["start_index"] == len(
+        "Tampering: data modified in transit.\n\n"
+    )
+
+    (persist_dir / LEXICAL_INDEX_NAME).touch()
+    reused = load_or_build_lexical_index(tmp_path, persist_dir, _settings())
+    assert reused.postings == index.postings
+
+    (tmp_path / "tampering.md").write_text("Tampering: sign with HMAC.")
+    rebuilt = load_or_build_lexical_index(tmp_path, persist_dir, _settings())
+    assert rebuilt.search("hmac", 1)[0].page_content == "Tampering: sign with HMAC."
+    assert (
+        load_or_build_lexical_index(tmp_path / "stride" / "x", persist_dir, _settings())
+        is None
+    )
@@ -0,0 +1,425 @@
+"""Unit tests for app.services.rag_service."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.documents import Document
+
+from app.config import get_settings
+from app.services import rag_service
+from app.services.rag_service import (
+    RAGService,
+    get_rag_service,
+    shutdown_rag_services,
+)
+from app.threat_analysis.llm.metrics import collect_llm_metrics
+
+
+def _doc(text):
+    return MagicMock(page_content=text)
+
+
+class FakeCache:
+    """Shared cache backend stand-in (LLMCacheService get/set)."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, prefix, *parts):
+        return self.data.get((prefix, *parts))
+
+    def set(self, prefix, value, *parts):
+        self.data[(prefix, *parts)] = value
+
+
+def _service(results, cache=None, **settings):
+    """RAGService over a fake store: query vector [i] -> results[i]."""
+    service = RAGService(
+        get_settings().model_copy(update={"rag_retrieval_mode": "vector", **settings})
+    )
+    service._cache = cache or FakeCache()
+    service._vectorstore = MagicMock()
+    service._vectorstore.similarity_search_by_vector.side_effect = lambda vector, k: (
+        results[vector[0]][:k]
+    )
+    service._embeddings = MagicMock()
+    service._embeddings.embed_documents.side_effect = lambda texts, task_type: [
+        [int(t.split()[-1])] for t in texts
+    ]
+    return service
+
+
+class TestRAGServiceRetrieve:
+    def test_batches_query_embeddings_and_caches_vectors(self):
+        service = _service({0: [_doc("a")], 1: [_doc("b")], 2: [_doc("c")]})
+        service.retrieve(["q 0", "q 1"], k=1)
+        service.retrieve(["q 1", "q 2", "q 2"], k=1)
+        calls = service._embeddings.embed_documents.call_args_list
+        assert [c.args[0] for c in calls] == [["q 0", "q 1"], ["q 2"]]
+        assert calls[0].kwargs == {"task_type": "retrieval_query"}
+
+    def test_interleaves_ranks_and_drops_duplicate_chunks(self):
+        service = _service(
+            {
+                0: [_doc("Spoofing  risks"), _doc("tls")],
+                1: [_doc("spoofing risks"), _doc("sql injection")],
+            }
+        )
+        docs = service.retrieve(["q 0", "q 1"], k=2)
+        assert [d.page_content for d in docs] == [
+            "Spoofing  risks",
+            "tls",
+            "sql injection",
+        ]
+
+    def test_scores_sum_reciprocal_ranks_across_queries(self):
+        service = _service(
+            {
+                0: [_doc("tls"), _doc("spoofing")],
+                1: [_doc("sql injection"), _doc("spoofing")],
+            }
+        )
+        scored = service.retrieve_scored(["q 0", "q 1"], k=2)
+        assert [(d.page_content, round(s * 62, 3)) for d, s in scored] == [
+            ("spoofing", 2.0),
+            ("tls", round(62 / 61, 3)),
+            ("sql injection", round(62 / 61, 3)),
+        ]
+
+    def test_warm_path_skips_embedding_and_search(self):
+        results = {0: [_doc("a"), _doc("b")]}
+        service = _service(results)
+        first = service.retrieve(["q 0"], k=2)
+        second = service.retrieve(["Q  0 "], k=2)
+        assert [d.page_content for d in second] == [d.page_content for d in first]
+        assert service._embeddings.embed_documents.call_count == 1
+        assert service._vectorstore.similarity_search_by_vector.call_count == 1
+        service.retrieve(["q 0"], k=1)  # different k: new search, cached vector
+        assert service._embeddings.embed_documents.call_count == 1
+        assert service._vectorstore.similarity_search_by_vector.call_count == 2
+
+    def test_shared_cache_serves_other_workers(self):
+        cache = FakeCache()
+        tls = Document(page_content="tls", metadata={"source": "x.md"})
+        _service({0: [tls]}, cache).retrieve(["q 0"])
+        warm = _service({}, cache)
+        (doc,) = warm.retrieve(["q 0"])
+        assert (doc.page_content, doc.metadata) == ("tls", {"source": "x.md"})
+        warm._embeddings.embed_documents.assert_not_called()
+
+    def test_index_version_change_invalidates_results(self):
+        service = _service({0: [_doc("a")]})
+        service.retrieve(["q 0"], k=1)
+        service._index_version = "rebuilt"
+        service.retrieve(["q 0"], k=1)
+        assert service._vectorstore.similarity_search_by_vector.call_count == 2
+        assert service._embeddings.embed_documents.call_count == 1
+
+    def test_memory_caches_are_bounded_and_thread_safe(self):
+        results = {i: [Document(page_content=f"chunk {i}")] for i in range(8)}
+        service = _service(results)
+        service._query_vectors = rag_service._MemoryCache(size=1)
+        service._results = rag_service._MemoryCache(size=1)
+        # more queries per call than the cache holds: vectors are not looked up
+        # again after insertion, so eviction cannot lose them
+        docs = service.retrieve([f"q {i}" for i in range(8)], k=1)
+        assert [d.page_content for d in docs] == [f"chunk {i}" for i in range(8)]
+        errors = []
+
+        def worker(i):
+            try:
+                for _ in range(50):
+                    (doc,) = service.retrieve([f"q {i}"], k=1)
+                    assert doc.page_content == f"chunk {i}"
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert len(service._query_vectors) == len(service._results) == 1
+
+    def test_no_knowledge_base_returns_nothing(self):
+        service = RAGService(get_settings())
+        service.get_vectorstore = MagicMock(return_value=None)
+        assert service.retrieve(["q 0"]) == []
+
+
+class TestRAGServiceHybrid:
+    def _hybrid(self, vector_results, lexical_results):
+        service = _service([vector_results], rag_retrieval_mode="hybrid")
+        service._lexical_loaded = True
+        service._lexical = MagicMock()
+        service._lexical.search.side_effect = lambda query, k: [
+            Document(page_content=t) for t in lexical_results[:k]
+        ]
+        return service
+
+    def test_fuses_vector_and_lexical_rankings(self):
+        service = self._hybrid([_doc("a"), _doc("b"), _doc("c")], ["c", "d"])
+        docs = service.retrieve(["q 0"], k=2)
+        # "c" is in both lists, so it outranks the vector-only top hit
+        assert [d.page_content for d in docs] == ["c", "a"]
+        service._vectorstore.similarity_search_by_vector.assert_called_once_with(
+            [0], k=4
+        )
+
+    def test_falls_back_to_lexical_when_embedding_fails(self):
+        service = self._hybrid([_doc("a")], ["c", "d", "e"])
+        service._embeddings.embed_documents.side_effect = RuntimeError("no network")
+        docs = service.retrieve(["q 0"], k=2)
+        assert [d.page_content for d in docs] == ["c", "d"]
+
+    def test_lexical_mode_needs_no_embeddings(self, tmp_path):
+        (tmp_path / "sql.md").write_text(
+            "CWE-89: SQL injection; use parameterized queries.", encoding="utf-8"
+        )
+        (tmp_path / "tls.md").write_text(
+            "Plaintext HTTP allows tampering; enforce TLS.", encoding="utf-8"
+        )
+        settings = get_settings().model_copy(
+            update={
+                "knowledge_base_path": tmp_path,
+                "rag_retrieval_mode": "lexical",
+                "google_api_key": None,
+            }
+        )
+        service = RAGService(settings)
+        service.get_vectorstore = MagicMock()
+        docs = service.retrieve(["cwe-89"], k=2)
+        assert [d.page_content[:6] for d in docs] == ["CWE-89"]
+        service.get_vectorstore.assert_not_called()
+        assert (tmp_path / "chroma_db" / "bm25.json").exists()
+
+
+class TestRAGServiceLocalEmbeddings:
+    def test_builds_and_queries_index_offline(self, tmp_path):
+        (tmp_path / "sql.md").write_text(
+            "SQL injection in the database layer: use parameterized queries.",
+            encoding="utf-8",
+        )
+        (tmp_path / "tls.md").write_text(
+            "Unencrypted HTTP traffic allows tampering; enforce TLS.",
+            encoding="utf-8",
+        )
+        settings = get_settings().model_copy(
+            update={
+                "knowledge_base_path": tmp_path,
+                "rag_retrieval_mode": "vector",
+                "embedding_model": "local:hashed-ngram:256",
+                "google_api_key": None,
+            }
+        )
+        service = RAGService(settings)
+        service._cache = FakeCache()
+        docs = service.retrieve(["database SQL injection"], k=1)
+        assert "parameterized" in docs[0].page_content
+        assert (tmp_path / "chroma_db-local-hashed-ngram-256").is_dir()
+        # Local query vectors are not written to the shared cache
+        assert {key[0] for key in service._cache.data} == {"rag-results"}
+
+
+def test_numpy_vector_store_builds_and_queries_offline(tmp_path):
+    (tmp_path / "sql.md").write_text(
+        "SQL injection in the database layer.", encoding="utf-8"
+    )
+    (tmp_path / "tls.md").write_text("Enforce TLS on every hop.", encoding="utf-8")
+    settings = get_settings().model_copy(
+        update={
+            "knowledge_base_path": tmp_path,
+            "rag_retrieval_mode": "vector",
+            "rag_vector_store": "numpy",
+            "embedding_model": "local:hashed-ngram:256",
+        }
+    )
+    service = RAGService(settings)
+    service._cache = FakeCache()
+    docs = service.retrieve(["TLS hop"], k=1)
+    assert docs[0].page_content == "Enforce TLS on every hop."
+    persist_dir = tmp_path / "chroma_db-local-hashed-ngram-256"
+    assert (persist_dir / "vectors.npy").exists()
+    assert not (persist_dir / "chroma.sqlite3").exists()
+
+
+class TestRAGServiceAretrieve:
+    @pytest.fixture(autouse=True)
+    def _fresh_pool(self, monkeypatch):
+        monkeypatch.setattr(rag_service, "_executor", None)
+
+    def _slow_service(self, delay, **settings):
+        service = RAGService(get_settings().model_copy(update=settings))
+        threads = []
+
+        def retrieve(queries, k):
+            threads.append(threading.current_thread().name)
+            time.sleep(delay)
+            return [_doc(queries[0])]
+
+        service.retrieve = retrieve
+        return service, threads
+
+    def test_runs_in_bounded_pool_and_records_queue_wait(self):
+        service, threads = self._slow_service(0.05, rag_max_concurrency=1)
+
+        async def main():
+            return await asyncio.gather(
+                service.aretrieve(["a"]), service.aretrieve(["b"])
+            )
+
+        with collect_llm_metrics() as collector:
+            first, second = asyncio.run(main())
+        assert [first[0].page_content, second[0].page_content] == ["a", "b"]
+        assert all(name.startswith("rag") for name in threads)
+        retrieval = collector.build().retrieval
+        assert retrieval.calls == 2
+        assert retrieval.queue_wait_seconds >= 0.04  # second waited for the slot
+
+    def test_warming_without_loaded_index_returns_no_context(self):
+        service, threads = self._slow_service(0.3)
+        service._state = "warming"
+        with collect_llm_metrics() as collector:
+            assert asyncio.run(service.aretrieve(["a"])) == []
+        assert threads == []  # no pool thread waits for the warm-up
+        assert collector.build().retrieval.calls == 1
+
+    def test_warming_hybrid_uses_loaded_lexical_index(self):
+        service = RAGService(
+            get_settings().model_copy(update={"rag_retrieval_mode": "hybrid"})
+        )
+        service._state = "warming"
+        service._lexical_loaded = True
+        service._lexical = MagicMock()
+        service._lexical.search.return_value = [Document(page_content="CWE-89")]
+        service.get_vectorstore = MagicMock()  # would block on the vector sync
+        docs = asyncio.run(service.aretrieve(["sql"], k=1))
+        assert [d.page_content for d in docs] == ["CWE-89"]
+        service.get_vectorstore.assert_not_called()
+
+    def test_timeout(self):
+        service, _ = self._slow_service(0.3, rag_timeout_seconds=0.05)
+        with collect_llm_metrics() as collector:
+            with pytest.raises(asyncio.TimeoutError):
+                asyncio.run(service.aretrieve(["a"]))
+        assert collector.build().retrieval.timeouts == 1
+
+
+class TestRAGServiceLifecycle:
+    @pytest.fixture(autouse=True)
+    def _fresh_services(self):
+        shutdown_rag_services()
+        yield
+        shutdown_rag_services()
+
+    def test_shared_instance_per_configuration(self):
+        settings = get_settings()
+        assert get_rag_service() is get_rag_service(settings)
+        other = settings.model_copy(update={"rag_top_k": 7})
+        assert get_rag_service(other) is not get_rag_service()
+        assert get_rag_service(other) is get_rag_service(other.model_copy())
+
+    def test_background_warmup_reports_state(self, tmp_path):
+        (tmp_path / "sql.md").write_text("CWE-89 SQL injection.", encoding="utf-8")
+        settings = get_settings().model_copy(
+            update={"knowledge_base_path": tmp_path, "rag_retrieval_mode": "lexical"}
+        )
+        service = get_rag_service(settings)
+        assert service.status()["state"] == "idle"
+        loaded = threading.Event()
+        load = service._load_lexical_index
+
+        def slow_load():
+            loaded.wait(1)
+            return load()
+
+        service._load_lexical_index = slow_load
+
+        async def main():
+            warmup = service.start_warmup()
+            assert service.start_warmup() is warmup
+            warming = service.status()
+            loaded.set()
+            await warmup
+            return warming
+
+        warming = asyncio.run(main())
+        assert warming["state"] == "warming"
+        status = service.status()
+        assert status["state"] == "ready"
+        assert status["lexical_index"] is True
+        assert status["vector_store"] is False
+        assert status["warmup_seconds"] >= 0
+
+    def test_warmup_does_not_take_a_retrieval_thread(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(rag_service, "_executor", None)
+        (tmp_path / "sql.md").write_text("CWE-89 SQL injection.", encoding="utf-8")
+        service = RAGService(
+            get_settings().model_copy(
+                update={
+                    "knowledge_base_path": tmp_path,
+                    "rag_retrieval_mode": "hybrid",
+                    "rag_max_concurrency": 1,
+                    "rag_timeout_seconds": 2,
+                }
+            )
+        )
+        service._cache = FakeCache()
+        synced = threading.Event()
+
+        def blocked_sync():
+            synced.wait(5)
+            return None
+
+        service._load_vectorstore = blocked_sync
+
+        async def main():
+            warmup = service.start_warmup()
+            while not service._lexical_loaded:
+                await asyncio.sleep(0.01)
+            docs = await service.aretrieve(["CWE-89"], k=1)
+            state = service.status()["state"]
+            synced.set()
+            await warmup
+            return docs, state
+
+        docs, state = asyncio.run(main())
+        assert state == "warming"  # answered by BM25 while the sync was blocked
+        assert [d.page_content for d in docs] == ["CWE-89 SQL injection."]
+
+    def test_lexical_index_loads_while_vector_store_syncs(self, tmp_path):
+        (tmp_path / "sql.md").write_text("CWE-89 SQL injection.", encoding="utf-8")
+        service = RAGService(
+            get_settings().model_copy(update={"knowledge_base_path": tmp_path})
+        )
+        with service._load_lock:  # vector store sync in progress
+            loader = threading.Thread(target=service.get_lexical_index)
+            loader.start()
+            loader.join(timeout=5)
+            assert not loader.is_alive()
+        assert service.status()["lexical_index"] is True
+
+    def test_warmup_without_knowledge_base_is_unavailable(self):
+        service = RAGService(get_settings())
+        service.get_vectorstore = MagicMock(return_value=None)
+        service.get_lexical_index = MagicMock(return_value=None)
+        service.warm()
+        assert service.status()["state"] == "unavailable"
+
+    def test_warmup_failure_is_reported(self):
+        service = RAGService(get_settings())
+        service.get_vectorstore = MagicMock(side_effect=RuntimeError("disk"))
+        service.warm()
+        assert service.status()["state"] == "failed"
+        assert service.status()["error"] == "disk"
+
+    def test_shutdown_stops_pool_and_drops_instances(self):
+        service = get_rag_service()
+        rag_service._get_executor(1)
+        shutdown_rag_services()
+        assert rag_service._executor is None
+        assert get_rag_service() is not service
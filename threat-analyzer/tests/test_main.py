@@ -4,7 +4,9 @@ import asyncio
 import json
 from unittest.mock import MagicMock, patch
 
-from app.main import _handle_exception, _lifespan
+from fastapi.testclient import TestClient
+
+from app.main import _handle_exception, _lifespan, app
 from app.threat_analysis.exceptions import (
     ArchitectureDiagramValidationError,
     InvalidFileTypeError,
@@ -13,11 +15,7 @@ from app.threat_analysis.exceptions import (
 
 
 async def _consume_lifespan(app):
-    gen = _lifespan(app)
-    await gen.__anext__()
-    try:
-        await gen.__anext__()
-    except StopAsyncIteration:
+    async with _lifespan(app):
         pass
 
 
@@ -29,14 +27,29 @@ class TestLifespan:
         with (
             patch("app.main.setup_logging") as setup_logging,
             patch("app.main.logger") as logger,
-            patch("app.main.RAGService") as RAGService,
+            patch("app.main.get_rag_service") as get_rag_service,
+            patch("app.main.shutdown_rag_services") as shutdown_rag_services,
         ):
             asyncio.run(_consume_lifespan(app))
             setup_logging.assert_called_once()
             logger.info.assert_called()
-            RAGService.assert_called_once()
+            get_rag_service.return_value.start_warmup.assert_called_once()
+            shutdown_rag_services.assert_called_once()
             assert logger.info.call_count >= 2
 
+    def test_app_uses_lifespan_and_reports_rag_readiness(self):
+        with (
+            patch("app.main.get_rag_service") as get_rag_service,
+            patch("app.main.shutdown_rag_services"),
+        ):
+            get_rag_service.return_value.status.return_value = {"state": "warming"}
+            with TestClient(app) as client:
+                get_rag_service.return_value.start_warmup.assert_called_once()
+                r = client.get("/health/ready")
+        assert r.status_code == 200
+        assert r.json()["status"] == "ready"
+        assert r.json()["rag"] == {"state": "warming"}
+
 
 class TestHandleException:
     """Test generic exception handler mapping."""
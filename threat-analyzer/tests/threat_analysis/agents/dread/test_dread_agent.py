@@ -5,6 +5,7 @@ from unittest.mock import AsyncMock, patch
 
 from app.config import get_settings
 from app.threat_analysis.agents.dread.agent import DreadAgent, _validate_dread_result
+from app.threat_analysis.llm import PartialJSONArray
 
 
 def test_validate_dread_result():
@@ -102,3 +103,24 @@ def test_analyze_clamps_dread_score():
         agent = DreadAgent(get_settings())
         result = asyncio.run(agent.analyze(threats))
     assert result[0]["dread_score"] == 10
+
+
+def test_analyze_partial_result_keeps_unscored_threats():
+    threats = [
+        {"component_id": f"c{i}", "threat_type": "S", "description": "d"}
+        for i in range(3)
+    ]
+    partial = PartialJSONArray([{**threats[0], "dread_score": 6.0}], raw_prefix="[...]")
+    with (
+        patch("app.threat_analysis.agents.dread.agent.LLMCacheService"),
+        patch(
+            "app.threat_analysis.agents.dread.agent.run_text_with_fallback",
+            new_callable=AsyncMock,
+            return_value=partial,
+        ),
+    ):
+        agent = DreadAgent(get_settings())
+        result = asyncio.run(agent.analyze(threats))
+    assert len(result) == 3
+    assert result[0]["dread_score"] == 6.0
+    assert result[1:] == threats[1:]
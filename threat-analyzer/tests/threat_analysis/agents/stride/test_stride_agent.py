@@ -1,10 +1,17 @@
 """Unit tests for app.threat_analysis.agents.stride.agent."""
 
 import asyncio
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, patch
+
+from langchain_core.documents import Document
 
 from app.config import get_settings
-from app.threat_analysis.agents.stride.agent import StrideAgent, _validate_stride_result
+from app.threat_analysis.agents.stride.agent import (
+    GENERIC_RAG_QUERY,
+    STRIDE_SYSTEM_PROMPT,
+    StrideAgent,
+    _validate_stride_result,
+)
 
 
 def test_validate_stride_result():
@@ -41,15 +48,17 @@ def test_analyze_success_returns_threats():
     ]
     with (
         patch("app.threat_analysis.agents.stride.agent.LLMCacheService"),
-        patch("app.threat_analysis.agents.stride.agent.RAGService") as mock_rag,
+        patch("app.threat_analysis.agents.stride.agent.get_rag_service") as mock_rag,
         patch(
             "app.threat_analysis.agents.stride.agent.run_text_with_fallback",
             new_callable=AsyncMock,
             return_value=threats,
         ),
     ):
-        mock_rag.return_value.get_retriever.return_value = None
-        agent = StrideAgent(get_settings())
+        mock_rag.return_value.aretrieve = AsyncMock(return_value=[])
+        agent = StrideAgent(
+            get_settings().model_copy(update={"stride_rule_mode": "off"})
+        )
         result = asyncio.run(agent.analyze(diagram_data))
     assert result == threats
 
@@ -58,46 +67,86 @@ def test_analyze_error_returns_empty_list():
     diagram_data = {"components": [], "connections": [], "boundaries": []}
     with (
         patch("app.threat_analysis.agents.stride.agent.LLMCacheService"),
-        patch("app.threat_analysis.agents.stride.agent.RAGService") as mock_rag,
+        patch("app.threat_analysis.agents.stride.agent.get_rag_service") as mock_rag,
         patch(
             "app.threat_analysis.agents.stride.agent.run_text_with_fallback",
             new_callable=AsyncMock,
             return_value={"error": "All failed"},
         ),
     ):
-        mock_rag.return_value.get_retriever.return_value = None
+        mock_rag.return_value.aretrieve = AsyncMock(return_value=[])
         agent = StrideAgent(get_settings())
         result = asyncio.run(agent.analyze(diagram_data))
     assert result == []
 
 
-def test_analyze_with_retriever_uses_rag_context():
-    diagram_data = {"components": [], "connections": [], "boundaries": []}
-    mock_retriever = MagicMock()
-    mock_retriever.get_relevant_documents.return_value = [
-        MagicMock(page_content="Spoofing: identity verification"),
+def test_analyze_retrieves_per_component_type_and_protocol():
+    diagram_data = {
+        "components": [
+            {"id": "api", "type": "API", "name": "Orders"},
+            {"id": "db", "type": "Database", "name": "Orders DB"},
+            {"id": "x", "type": "Mainframe", "name": "Core"},
+        ],
+        "connections": [
+            {"from": "api", "to": "db", "protocol": "tcp"},
+            {"from": "api", "to": "x", "protocol": "HTTPS"},
+        ],
+    }
+    run = AsyncMock(return_value=[])
+    with (
+        patch("app.threat_analysis.agents.stride.agent.LLMCacheService"),
+        patch("app.threat_analysis.agents.stride.agent.get_rag_service") as mock_rag,
+        patch("app.threat_analysis.agents.stride.agent.run_text_with_fallback", run),
+    ):
+        mock_rag.return_value.aretrieve = AsyncMock(
+            return_value=[
+                (Document(page_content="Spoofing: identity verification"), 0.5),
+                (Document(page_content="SQL injection: parameterized queries"), 0.4),
+                (Document(page_content="spoofing: identity  verification"), 0.3),
+            ]
+        )
+        settings = get_settings().model_copy(update={"rag_max_queries": 4})
+        asyncio.run(StrideAgent(settings).analyze(diagram_data))
+    call = mock_rag.return_value.aretrieve.call_args
+    assert call.kwargs["scored"] is True
+    queries = call.args[0]
+    assert queries == [
+        "STRIDE threats and mitigations for API components",
+        "STRIDE threats and mitigations for Database components",
+        "STRIDE threats and mitigations for Mainframe components",
+        "Security threats of HTTPS connections",
     ]
+    system, user = run.call_args.kwargs["messages"]
+    # the context goes with the diagram; the system prompt stays static
+    assert system["content"] == STRIDE_SYSTEM_PROMPT
+    assert user["content"].endswith(
+        "Relevant context:\nSpoofing: identity verification\n"
+        "SQL injection: parameterized queries"
+    )
+
+
+def test_empty_diagram_uses_generic_rag_query():
     with (
         patch("app.threat_analysis.agents.stride.agent.LLMCacheService"),
-        patch("app.threat_analysis.agents.stride.agent.RAGService") as mock_rag,
+        patch("app.threat_analysis.agents.stride.agent.get_rag_service") as mock_rag,
         patch(
             "app.threat_analysis.agents.stride.agent.run_text_with_fallback",
             new_callable=AsyncMock,
             return_value=[],
         ),
     ):
-        mock_rag.return_value.get_retriever.return_value = mock_retriever
-        agent = StrideAgent(get_settings())
-        asyncio.run(agent.analyze(diagram_data))
-    mock_retriever.get_relevant_documents.assert_called_once()
+        mock_rag.return_value.aretrieve = AsyncMock(return_value=[])
+        asyncio.run(StrideAgent(get_settings()).analyze({"components": []}))
+    queries = mock_rag.return_value.aretrieve.call_args.args[0]
+    assert queries == [GENERIC_RAG_QUERY]
 
 
 def test_format_components():
     with (
         patch("app.threat_analysis.agents.stride.agent.LLMCacheService"),
-        patch("app.threat_analysis.agents.stride.agent.RAGService") as mock_rag,
+        patch("app.threat_analysis.agents.stride.agent.get_rag_service") as mock_rag,
     ):
-        mock_rag.return_value.get_retriever.return_value = None
+        mock_rag.return_value.aretrieve = AsyncMock(return_value=[])
         agent = StrideAgent(get_settings())
     out = agent._format_components([{"id": "c1", "type": "Server", "name": "API"}])
     assert "c1" in out and "Server" in out and "API" in out
@@ -107,10 +156,153 @@ def test_format_components():
 def test_format_connections():
     with (
         patch("app.threat_analysis.agents.stride.agent.LLMCacheService"),
-        patch("app.threat_analysis.agents.stride.agent.RAGService") as mock_rag,
+        patch("app.threat_analysis.agents.stride.agent.get_rag_service") as mock_rag,
     ):
-        mock_rag.return_value.get_retriever.return_value = None
+        mock_rag.return_value.aretrieve = AsyncMock(return_value=[])
         agent = StrideAgent(get_settings())
     out = agent._format_connections([{"from": "a", "to": "b", "protocol": "HTTPS"}])
     assert "a" in out and "b" in out
     assert agent._format_connections([]) == "None identified"
+
+
+def test_static_prompt_prefix_is_identical_across_diagrams():
+    """System prompt (cacheable prefix) does not depend on the diagram; data comes last."""
+    diagrams = [
+        {"components": [{"id": "c1", "type": "Server", "name": "API"}]},
+        {"components": [{"id": "db", "type": "Database", "name": "Users"}]},
+    ]
+    run = AsyncMock(return_value=[])
+    with (
+        patch("app.threat_analysis.agents.stride.agent.LLMCacheService"),
+        patch("app.threat_analysis.agents.stride.agent.get_rag_service") as mock_rag,
+        patch("app.threat_analysis.agents.stride.agent.run_text_with_fallback", run),
+    ):
+        mock_rag.return_value.aretrieve = AsyncMock(return_value=[])
+        agent = StrideAgent(get_settings())
+        for diagram in diagrams:
+            asyncio.run(agent.analyze(diagram))
+    first, second = (call.kwargs["messages"] for call in run.call_args_list)
+    assert first[0] == second[0]
+    assert first[0]["role"] == "system"
+    assert "[c1] Server: API" in first[-1]["content"]
+    assert "[db] Database: Users" in second[-1]["content"]
+
+
+def test_rule_baseline_modes():
+    """merge: baseline + full LLM analysis; delta: the prompt lists the baseline."""
+    diagram_data = {
+        "components": [{"id": "db", "type": "Database", "name": "Orders"}],
+        "connections": [],
+    }
+    llm_threats = [
+        {
+            "component_id": "db",
+            "threat_type": "Repudiation",
+            "description": "d",
+            "mitigation": "m",
+        }
+    ]
+    results, prompts = {}, {}
+    for mode in ("off", "merge", "delta"):
+        run = AsyncMock(return_value=list(llm_threats))
+        with (
+            patch("app.threat_analysis.agents.stride.agent.LLMCacheService"),
+            patch(
+                "app.threat_analysis.agents.stride.agent.get_rag_service"
+            ) as mock_rag,
+            patch(
+                "app.threat_analysis.agents.stride.agent.run_text_with_fallback", run
+            ),
+        ):
+            mock_rag.return_value.aretrieve = AsyncMock(return_value=[])
+            settings = get_settings().model_copy(update={"stride_rule_mode": mode})
+            results[mode] = asyncio.run(StrideAgent(settings).analyze(diagram_data))
+        prompts[mode] = run.call_args.kwargs["messages"][-1]["content"]
+    assert results["off"] == llm_threats
+    assert results["merge"] == results["delta"]
+    assert len(results["merge"]) == 3 and results["merge"][-1] == llm_threats[0]
+    assert "Baseline threats" not in prompts["merge"]
+    assert "[db] Information Disclosure:" in prompts["delta"]
+
+
+def test_rule_baseline_kept_when_llm_fails():
+    diagram_data = {"components": [{"id": "db", "type": "Database", "name": "Orders"}]}
+    with (
+        patch("app.threat_analysis.agents.stride.agent.LLMCacheService"),
+        patch("app.threat_analysis.agents.stride.agent.get_rag_service") as mock_rag,
+        patch(
+            "app.threat_analysis.agents.stride.agent.run_text_with_fallback",
+            new_callable=AsyncMock,
+            return_value={"error": "All failed"},
+        ),
+    ):
+        mock_rag.return_value.aretrieve = AsyncMock(return_value=[])
+        result = asyncio.run(StrideAgent(get_settings()).analyze(diagram_data))
+    assert {t["threat_type"] for t in result} == {"Information Disclosure", "Tampering"}
+
+
+def test_format_boundaries_with_and_without_members():
+    with (
+        patch("app.threat_analysis.agents.stride.agent.LLMCacheService"),
+        patch("app.threat_analysis.agents.stride.agent.get_rag_service"),
+    ):
+        agent = StrideAgent(get_settings())
+    boundaries = [{"name": "VPC", "components": ["api", "db"]}, {"name": "DMZ"}]
+    assert agent._format_boundaries(boundaries) == "VPC: api, db; DMZ"
+    assert agent._format_boundaries(["Internet", "VPC"]) == "Internet; VPC"
+    assert agent._format_boundaries([]) == "None identified"
+
+
+def test_graph_focus_annotates_or_restricts_the_prompt():
+    """annotate: zone / entry point / fan facts and riskiest connections first;
+    restrict: only high-risk edges and the components around them."""
+    diagram_data = {
+        "components": [
+            {"id": "u", "type": "User", "name": "Customer"},
+            {"id": "gw", "type": "Gateway", "name": "Edge"},
+            {"id": "api", "type": "API", "name": "Orders"},
+            {"id": "db", "type": "Database", "name": "Orders DB"},
+        ],
+        "connections": [
+            {"from": "api", "to": "db", "protocol": "HTTPS"},
+            {"from": "u", "to": "gw", "protocol": "HTTP"},
+        ],
+        "boundaries": [{"name": "VPC", "components": ["gw", "api", "db"]}],
+    }
+    prompts = {}
+    for focus, min_components in (("off", 30), ("annotate", 30), ("restrict", 2)):
+        run = AsyncMock(return_value=[])
+        with (
+            patch("app.threat_analysis.agents.stride.agent.LLMCacheService"),
+            patch(
+                "app.threat_analysis.agents.stride.agent.get_rag_service"
+            ) as mock_rag,
+            patch(
+                "app.threat_analysis.agents.stride.agent.run_text_with_fallback", run
+            ),
+        ):
+            mock_rag.return_value.aretrieve = AsyncMock(return_value=[])
+            settings = get_settings().model_copy(
+                update={
+                    "stride_rule_mode": "off",
+                    "stride_graph_focus": focus,
+                    "stride_focus_min_components": min_components,
+                }
+            )
+            asyncio.run(StrideAgent(settings).analyze(diagram_data))
+        prompts[focus] = run.call_args.kwargs["messages"][-1]["content"]
+    assert "- api -> db (HTTPS)\n- u -> gw (HTTP)" in prompts["off"]
+    annotated = prompts["annotate"]
+    assert (
+        "- [gw] Gateway: Edge (zone: VPC; entry point; fan-in 1, fan-out 0)"
+        in annotated
+    )
+    assert (
+        "- u -> gw (HTTP) [crosses boundary: outside -> VPC, unencrypted]\n"
+        "- api -> db (HTTPS)" in annotated
+    )
+    assert "VPC: gw, api, db" in annotated
+    restricted = prompts["restrict"]
+    assert "[u] User" in restricted and "[gw] Gateway" in restricted
+    assert "[api]" not in restricted and "api -> db" not in restricted
+    assert "(Omitted: 2 components, 1 lower-risk connections)" in restricted
@@ -0,0 +1,377 @@
+"""Unit tests for app.threat_analysis.llm.base."""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    HumanMessage,
+    SystemMessage,
+)
+
+from app.config import get_settings
+from app.threat_analysis.deadline import Deadline, deadline_scope
+from app.threat_analysis.llm import gemini_connection
+from app.threat_analysis.llm.base import LLMConnection
+from app.threat_analysis.llm.gemini_connection import GeminiConnection
+from app.threat_analysis.llm.json_extraction import is_partial_result
+from app.threat_analysis.llm.metrics import collect_llm_metrics, llm_stage
+from app.threat_analysis.llm.ollama_connection import OllamaConnection
+from app.threat_analysis.llm.openai_connection import OpenAIConnection
+from app.threat_analysis.llm.structured_output import STRIDE_OUTPUT
+
+
+class TestParseJson:
+    def test_parses_prefixed_json(self):
+        conn = OllamaConnection(get_settings())
+        assert conn._parse_json('Here you go: [{"a": 1}]') == [{"a": 1}]
+
+    def test_empty_response(self):
+        conn = OllamaConnection(get_settings())
+        result = conn._parse_json("")
+        assert result["error_type"] == "empty"
+        assert result["service"] == "Ollama"
+
+    def test_invalid_json(self):
+        conn = OllamaConnection(get_settings())
+        result = conn._parse_json("not json at all")
+        assert result["error_type"] == "invalid_json"
+
+    def test_truncated_array_is_salvaged(self):
+        conn = OllamaConnection(get_settings())
+        result = conn._parse_json('[{"a": 1}, {"b": 2}, {"c": ')
+        assert result == [{"a": 1}, {"b": 2}]
+        assert is_partial_result(result)
+
+
+class _FakeLLM:
+    """Records calls; structured (bound) calls return/raise structured_response."""
+
+    def __init__(self, text_response, structured_response=None):
+        self.text_response = text_response
+        self.structured_response = structured_response
+        self.bound_kwargs = None
+        self.calls = []
+
+    def bind(self, **kwargs):
+        self.bound_kwargs = kwargs
+        fake = self
+
+        class _Bound:
+            async def ainvoke(self, messages):
+                fake.calls.append("structured")
+                if isinstance(fake.structured_response, Exception):
+                    raise fake.structured_response
+                return AIMessage(content=fake.structured_response)
+
+        return _Bound()
+
+    async def ainvoke(self, messages):
+        self.calls.append("text")
+        return AIMessage(content=self.text_response)
+
+
+class TestStructuredOutput:
+    def _conn(self, llm, **settings):
+        conn = OllamaConnection(get_settings().model_copy(update=settings))
+        conn._llm = llm
+        return conn
+
+    def test_structured_mode_unwraps_root_key(self):
+        llm = _FakeLLM("[]", structured_response='{"threats": [{"a": 1}]}')
+        conn = self._conn(llm)
+        result = asyncio.run(
+            conn.invoke_text(
+                [{"role": "user", "content": "x"}], structured_output=STRIDE_OUTPUT
+            )
+        )
+        assert result == [{"a": 1}]
+        assert llm.calls == ["structured"]
+        assert llm.bound_kwargs == {"format": STRIDE_OUTPUT.schema}
+
+    def test_falls_back_to_text_mode_when_rejected(self):
+        llm = _FakeLLM('[{"b": 2}]', structured_response=RuntimeError("bad format"))
+        conn = self._conn(llm)
+        result = asyncio.run(
+            conn.invoke_text(
+                [{"role": "user", "content": "x"}], structured_output=STRIDE_OUTPUT
+            )
+        )
+        assert result == [{"b": 2}]
+        assert llm.calls == ["structured", "text"]
+
+    def test_disabled_by_setting(self):
+        llm = _FakeLLM('{"threats": [{"c": 3}]}', structured_response="unused")
+        conn = self._conn(llm, llm_structured_output=False)
+        result = asyncio.run(
+            conn.invoke_text(
+                [{"role": "user", "content": "x"}], structured_output=STRIDE_OUTPUT
+            )
+        )
+        assert result == [{"c": 3}]
+        assert llm.calls == ["text"]
+
+    def test_base_binding_is_a_no_op(self):
+        llm = _FakeLLM("[]")
+        conn = self._conn(llm)
+        assert LLMConnection._bind_structured(conn, llm, STRIDE_OUTPUT) is llm
+
+    def test_text_mode_prefers_stage_root_type(self):
+        llm = _FakeLLM('Scale {"max": 10}: [{"d": 4}]', structured_response="unused")
+        conn = self._conn(llm, llm_structured_output=False)
+        result = asyncio.run(
+            conn.invoke_text(
+                [{"role": "user", "content": "x"}], structured_output=STRIDE_OUTPUT
+            )
+        )
+        assert result == [{"d": 4}]
+
+    def test_truncated_wrapped_array_is_salvaged(self):
+        llm = _FakeLLM("[]", structured_response='{"threats": [{"a": 1}, {"b":')
+        conn = self._conn(llm)
+        result = asyncio.run(
+            conn.invoke_text(
+                [{"role": "user", "content": "x"}], structured_output=STRIDE_OUTPUT
+            )
+        )
+        assert result == [{"a": 1}]
+        assert is_partial_result(result)
+
+
+class TestModelTier:
+    def test_primary_tier_models(self):
+        settings = get_settings()
+        assert GeminiConnection(settings).model_name == settings.primary_model
+        assert OpenAIConnection(settings).model_name == settings.fallback_model
+        assert OllamaConnection(settings).model_name == settings.ollama_model
+
+    def test_fast_tier_models(self):
+        settings = get_settings().model_copy(
+            update={"fast_model": "g-fast", "openai_fast_model": "o-fast"}
+        )
+        assert GeminiConnection(settings, model_tier="fast").model_name == "g-fast"
+        assert OpenAIConnection(settings, model_tier="fast").model_name == "o-fast"
+
+    def test_ollama_fast_tier_defaults_to_ollama_model(self):
+        settings = get_settings().model_copy(update={"ollama_fast_model": None})
+        conn = OllamaConnection(settings, model_tier="fast")
+        assert conn.model_name == settings.ollama_model
+        settings = settings.model_copy(update={"ollama_fast_model": "small-vl"})
+        assert OllamaConnection(settings, model_tier="fast").model_name == "small-vl"
+
+
+class _StreamingLLM:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def astream(self, messages):
+        for content, usage in self.chunks:
+            yield AIMessageChunk(content=content, usage_metadata=usage)
+
+
+class TestCallMetrics:
+    def test_streamed_call_records_usage_and_ttft(self):
+        conn = OllamaConnection(get_settings().model_copy(update={"llm_stream": True}))
+        conn._llm = _StreamingLLM(
+            [
+                ('[{"a": ', None),
+                ("1}]", {"input_tokens": 12, "output_tokens": 5, "total_tokens": 17}),
+            ]
+        )
+        with collect_llm_metrics() as collector, llm_stage("stride"):
+            result = asyncio.run(conn.invoke_text([{"role": "user", "content": "x"}]))
+        assert result == [{"a": 1}]
+        (call,) = collector.calls
+        assert call.stage == "stride"
+        assert call.provider == "Ollama"
+        assert call.mode == "text"
+        assert call.outcome == "ok"
+        assert (call.input_tokens, call.output_tokens) == (12, 5)
+        assert call.time_to_first_token_seconds is not None
+        assert call.latency_seconds >= call.queue_wait_seconds
+
+    def test_stream_chunks_are_merged_once(self):
+        conn = OllamaConnection(get_settings().model_copy(update={"llm_stream": True}))
+        text = json.dumps([{"id": i} for i in range(500)])
+        usage = {"input_tokens": 3, "output_tokens": 1, "total_tokens": 4}
+        conn._llm = _StreamingLLM([(char, usage) for char in text])
+        with collect_llm_metrics() as collector:
+            result = asyncio.run(conn.invoke_text([{"role": "user", "content": "x"}]))
+        assert result == [{"id": i} for i in range(500)]
+        assert collector.calls[0].output_tokens == len(text)
+
+    def test_failed_call_is_recorded_with_outcome(self):
+        llm = _FakeLLM("not json at all")
+        conn = OllamaConnection(get_settings())
+        conn._llm = llm
+        with collect_llm_metrics() as collector:
+            asyncio.run(conn.invoke_text([{"role": "user", "content": "x"}]))
+        assert [c.outcome for c in collector.calls] == ["invalid_json"]
+        assert collector.calls[0].time_to_first_token_seconds is None
+
+    def test_concurrency_slot_bounds_parallel_calls(self):
+        class _SlowLLM:
+            async def ainvoke(self, messages):
+                await asyncio.sleep(0.05)
+                return AIMessage(content="[]")
+
+        conn = OllamaConnection(
+            get_settings().model_copy(
+                update={"llm_max_concurrency": 1, "llm_stream": False}
+            )
+        )
+        conn._llm = _SlowLLM()
+
+        async def run_two():
+            messages = [{"role": "user", "content": "x"}]
+            await asyncio.gather(conn.invoke_text(messages), conn.invoke_text(messages))
+
+        with collect_llm_metrics() as collector:
+            asyncio.run(run_two())
+        waits = sorted(c.queue_wait_seconds for c in collector.calls)
+        assert waits[0] < 0.04 <= waits[1]
+
+
+class TestGeminiContextCache:
+    def _conn(self, **settings):
+        base = {
+            "google_api_key": "k",
+            "gemini_context_cache": True,
+            "gemini_context_cache_min_chars": 10,
+        }
+        conn = GeminiConnection(get_settings().model_copy(update={**base, **settings}))
+        conn._create_context_cache = AsyncMock(return_value="cachedContents/abc")
+        return conn
+
+    def _messages(self, system="static system prompt"):
+        return [SystemMessage(content=system), HumanMessage(content="diagram")]
+
+    def test_system_prompt_served_from_cached_content(self):
+        gemini_connection._context_caches.clear()
+        conn = self._conn()
+        llm = MagicMock()
+        bound, messages = asyncio.run(conn._apply_prefix_cache(llm, self._messages()))
+        llm.bind.assert_called_once_with(cached_content="cachedContents/abc")
+        assert bound is llm.bind.return_value
+        assert messages == [HumanMessage(content="diagram")]
+
+    def test_cache_created_once_per_prompt(self):
+        gemini_connection._context_caches.clear()
+        conn = self._conn()
+        for _ in range(3):
+            asyncio.run(conn._apply_prefix_cache(MagicMock(), self._messages()))
+        conn._create_context_cache.assert_awaited_once()
+
+    def test_cache_registry_is_bounded(self):
+        gemini_connection._context_caches.clear()
+        conn = self._conn()
+        limit = gemini_connection._MAX_CONTEXT_CACHES
+        for i in range(limit + 5):
+            asyncio.run(
+                conn._apply_prefix_cache(MagicMock(), self._messages(f"prompt {i:04d}"))
+            )
+        assert len(gemini_connection._context_caches) == limit
+
+    def test_short_prompt_or_disabled_is_untouched(self):
+        gemini_connection._context_caches.clear()
+        for conn, system in (
+            (self._conn(), "short"),
+            (self._conn(gemini_context_cache=False), "static system prompt"),
+        ):
+            llm = MagicMock()
+            messages = self._messages(system)
+            assert asyncio.run(conn._apply_prefix_cache(llm, messages)) == (
+                llm,
+                messages,
+            )
+            conn._create_context_cache.assert_not_awaited()
+
+    def test_creation_failure_falls_back_to_full_prompt(self):
+        gemini_connection._context_caches.clear()
+        conn = self._conn()
+        conn._create_context_cache = AsyncMock(side_effect=RuntimeError("too small"))
+        llm = MagicMock()
+        messages = self._messages()
+        for _ in range(2):
+            assert asyncio.run(conn._apply_prefix_cache(llm, messages)) == (
+                llm,
+                messages,
+            )
+        conn._create_context_cache.assert_awaited_once()
+
+    def test_cached_tokens_recorded(self):
+        conn = OllamaConnection(get_settings().model_copy(update={"llm_stream": True}))
+        usage = {
+            "input_tokens": 100,
+            "output_tokens": 5,
+            "total_tokens": 105,
+            "input_token_details": {"cache_read": 80},
+        }
+        conn._llm = _StreamingLLM([("[]", usage)])
+        with collect_llm_metrics() as collector, llm_stage("dread"):
+            asyncio.run(conn.invoke_text([{"role": "user", "content": "x"}]))
+        assert collector.calls[0].cached_input_tokens == 80
+        assert collector.build().stages["dread"].cached_token_ratio == 0.8
+
+
+class _FlakyLLM:
+    def __init__(self, errors, text="[]"):
+        self.errors = list(errors)
+        self.text = text
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return AIMessage(content=self.text)
+
+
+class TestTransientRetry:
+    def _conn(self, llm, **settings):
+        base = {
+            "llm_stream": False,
+            "llm_max_retries": 2,
+            "llm_retry_base_delay_seconds": 0.01,
+            "llm_retry_max_delay_seconds": 0.02,
+        }
+        conn = OllamaConnection(get_settings().model_copy(update={**base, **settings}))
+        conn._llm = llm
+        return conn
+
+    def _invoke(self, conn):
+        return asyncio.run(conn.invoke_text([{"role": "user", "content": "x"}]))
+
+    def test_transient_error_retried_on_same_provider(self):
+        llm = _FlakyLLM(
+            [ConnectionResetError("reset"), RuntimeError("503 UNAVAILABLE")]
+        )
+        assert self._invoke(self._conn(llm)) == []
+        assert llm.calls == 3
+
+    def test_gives_up_after_max_retries(self):
+        llm = _FlakyLLM([ConnectionResetError("reset")] * 5)
+        result = self._invoke(self._conn(llm, llm_max_retries=1))
+        assert result["error_type"] == "transient"
+        assert llm.calls == 2
+
+    def test_auth_error_not_retried(self):
+        llm = _FlakyLLM([RuntimeError("401 API key not valid")])
+        result = self._invoke(self._conn(llm))
+        assert result["error_type"] == "auth"
+        assert llm.calls == 1
+
+    def test_retry_after_beyond_deadline_fails_over(self):
+        llm = _FlakyLLM([RuntimeError("429 RESOURCE_EXHAUSTED 'retryDelay': '30s'")])
+        conn = self._conn(llm)
+
+        async def run():
+            with deadline_scope(Deadline.after(1)):
+                return await conn.invoke_text([{"role": "user", "content": "x"}])
+
+        result = asyncio.run(run())
+        assert result["error_type"] == "rate_limit"
+        assert result["retry_after"] == 30.0
+        assert llm.calls == 1
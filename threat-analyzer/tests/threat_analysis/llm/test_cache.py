@@ -71,6 +71,13 @@ class TestLLMCacheServiceWithMockBackend:
         assert k1 == k2
         assert k1.startswith("llm:p:")
 
+    def test_empty_redis_url_disables_cache(self):
+        with patch("app.threat_analysis.llm.cache.get_cache_backend") as factory:
+            cache = LLMCacheService(redis_url="")
+            cache.set("p", {"a": 1}, "x")
+            assert cache.get("p", "x") is None
+        factory.assert_not_called()
+
     def test_ttl_constant(self):
         assert CACHE_TTL_SECONDS == 2 * 60 * 60
 
@@ -0,0 +1,144 @@
+"""Unit tests for app.threat_analysis.llm.cassette."""
+
+import asyncio
+import json
+import threading
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from app.config import get_settings
+from app.threat_analysis.llm.cassette import (
+    CassetteStore,
+    cassette_store,
+    request_fingerprint,
+)
+from app.threat_analysis.llm.metrics import collect_llm_metrics
+from app.threat_analysis.llm.ollama_connection import OllamaConnection
+
+MESSAGES = [{"role": "system", "content": "sys"}, {"role": "user", "content": "x"}]
+USAGE = {"input_tokens": 10, "output_tokens": 4, "total_tokens": 14}
+
+
+class _RecordingLLM:
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return AIMessage(content=self.text, usage_metadata=USAGE)
+
+
+def _conn(tmp_path, mode, llm=None, **settings):
+    conn = OllamaConnection(
+        get_settings().model_copy(
+            update={
+                "llm_stream": False,
+                "llm_cassette_mode": mode,
+                "llm_cassette_dir": tmp_path,
+                **settings,
+            }
+        )
+    )
+    conn._llm = llm or _RecordingLLM("unused")
+    return conn
+
+
+class TestFingerprint:
+    def test_stable_and_sensitive_to_request(self):
+        messages = [SystemMessage(content="sys"), HumanMessage(content="x")]
+        key = request_fingerprint("Gemini", "m", "text", messages)
+        assert key == request_fingerprint("Gemini", "m", "text", list(messages))
+        assert key != request_fingerprint("Gemini", "m", "structured", messages)
+        assert key != request_fingerprint("OpenAI", "m", "text", messages)
+        assert key != request_fingerprint(
+            "Gemini", "m", "text", [SystemMessage(content="sys"), HumanMessage("y")]
+        )
+
+
+class TestRecordReplay:
+    def test_record_then_replay_without_calling_provider(self, tmp_path):
+        llm = _RecordingLLM('[{"a": 1}]')
+        assert asyncio.run(_conn(tmp_path, "record", llm).invoke_text(MESSAGES)) == [
+            {"a": 1}
+        ]
+        (cassette,) = tmp_path.glob("*.json")
+        entry = json.loads(cassette.read_text())
+        assert entry["provider"] == "Ollama"
+        assert entry["response"]["content"] == '[{"a": 1}]'
+
+        replay_llm = _RecordingLLM("should not be used")
+        with collect_llm_metrics() as collector:
+            result = asyncio.run(
+                _conn(tmp_path, "replay", replay_llm).invoke_text(MESSAGES)
+            )
+        assert result == [{"a": 1}]
+        assert replay_llm.calls == 0
+        (call,) = collector.calls
+        assert (call.outcome, call.input_tokens, call.output_tokens) == ("ok", 10, 4)
+
+    def test_concurrent_identical_requests_record_one_cassette(self, tmp_path):
+        store = CassetteStore(tmp_path, "record")
+        errors = []
+
+        def record():
+            try:
+                for _ in range(20):
+                    store.record(
+                        "abc",
+                        provider="Ollama",
+                        model="m",
+                        mode="text",
+                        stage="stride",
+                        messages=[HumanMessage(content="x")],
+                        response=AIMessage(content="[]"),
+                        ttft=None,
+                        latency=0.1,
+                    )
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+
+        threads = [threading.Thread(target=record) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert [p.name for p in tmp_path.iterdir()] == ["abc.json"]
+        assert json.loads(store.path("abc").read_text())["response"]["content"] == "[]"
+
+    def test_failed_recording_keeps_the_response(self, tmp_path):
+        blocked = tmp_path / "cassettes"
+        blocked.write_text("not a directory")
+        llm = _RecordingLLM('[{"a": 1}]')
+        result = asyncio.run(_conn(blocked, "record", llm).invoke_text(MESSAGES))
+        assert result == [{"a": 1}]
+        assert llm.calls == 1
+
+    def test_replay_miss_is_an_error_result(self, tmp_path):
+        result = asyncio.run(_conn(tmp_path, "replay").invoke_text(MESSAGES))
+        assert result["error_type"] == "cassette_miss"
+        assert result["service"] == "Ollama"
+
+    def test_replay_scales_recorded_latency(self, tmp_path):
+        store = CassetteStore(tmp_path, "replay", latency_scale=0.5)
+        store.directory.mkdir(exist_ok=True)
+        store.path("abc").write_text(
+            json.dumps(
+                {
+                    "response": {"content": "[]", "usage_metadata": None},
+                    "time_to_first_token_seconds": 0.04,
+                    "latency_seconds": 0.2,
+                }
+            )
+        )
+        start = time.perf_counter()
+        response, ttft = asyncio.run(store.replay("abc"))
+        elapsed = time.perf_counter() - start
+        assert response.content == "[]"
+        assert 0.09 <= elapsed < 0.2
+        assert 0.015 <= ttft < 0.1
+
+    def test_off_by_default(self):
+        assert cassette_store(get_settings()) is None
@@ -1,14 +1,18 @@
 """Unit tests for app.threat_analysis.llm.fallback."""
 
 import asyncio
+import time
 from unittest.mock import MagicMock
 
+from app.threat_analysis.deadline import Deadline, deadline_scope
 from app.threat_analysis.llm.base import LLMConnection
 from app.threat_analysis.llm.fallback import (
+    CONTINUATION_PROMPT,
     is_error_result,
     run_text_with_fallback,
     run_vision_with_fallback,
 )
+from app.threat_analysis.llm.json_extraction import PartialJSONArray, is_partial_result
 
 
 def test_is_error_result():
@@ -18,9 +22,16 @@ def test_is_error_result():
 
 class MockConnection(LLMConnection):
     def __init__(
-        self, settings, name="Mock", configured=True, result=None, raise_err=None
+        self,
+        settings,
+        name="Mock",
+        configured=True,
+        result=None,
+        raise_err=None,
+        model_tier="primary",
     ):
         self.settings = settings
+        self._model_tier = model_tier
         self._name = name
         self._configured = configured
         self._result = result or {"components": [], "connections": []}
@@ -72,7 +83,7 @@ class TestRunVisionWithFallback:
         valid = {"components": [{"id": "1"}], "connections": []}
 
         class MockOk(MockConnection):
-            def __init__(self, s):
+            def __init__(self, s, **kwargs):
                 super().__init__(s, result=valid)
 
         result = asyncio.run(
@@ -87,7 +98,7 @@ class TestRunVisionWithFallback:
 
     def test_all_fail_returns_aggregated_errors(self):
         class MockFail(MockConnection):
-            def __init__(self, s):
+            def __init__(self, s, **kwargs):
                 super().__init__(s, result={"error": "failed"}, configured=True)
 
         result = asyncio.run(
@@ -125,7 +136,7 @@ class TestRunTextWithFallback:
         valid = [{"threat_type": "Spoofing", "description": "d"}]
 
         class MockOk(MockConnection):
-            def __init__(self, s):
+            def __init__(self, s, **kwargs):
                 super().__init__(s, result=valid)
 
         result = asyncio.run(
@@ -139,7 +150,7 @@ class TestRunTextWithFallback:
 
     def test_all_fail_returns_aggregated_errors(self):
         class MockFail(MockConnection):
-            def __init__(self, s):
+            def __init__(self, s, **kwargs):
                 super().__init__(s, result={"error": "failed"}, configured=True)
 
         result = asyncio.run(
@@ -152,3 +163,213 @@ class TestRunTextWithFallback:
         assert "error" in result
         assert "All LLM providers failed" in result["error"]
         assert "engine_errors" in result
+
+
+class TestPartialContinuation:
+    def _partial_then(self, continuation):
+        calls = []
+
+        class MockTruncated(MockConnection):
+            def __init__(self, s, **kwargs):
+                super().__init__(s)
+
+            async def invoke_text(self, messages, **kwargs):
+                calls.append(messages)
+                if len(calls) == 1:
+                    return PartialJSONArray([{"id": 1}], raw_prefix='[{"id": 1}')
+                return continuation
+
+        return MockTruncated, calls
+
+    def test_continuation_completes_array(self):
+        conn_cls, calls = self._partial_then([{"id": 2}])
+        cache_set = MagicMock()
+        result = asyncio.run(
+            run_text_with_fallback(
+                connections=[conn_cls],
+                settings=MagicMock(),
+                messages=[{"role": "user", "content": "x"}],
+                cache_set=cache_set,
+                validate=lambda r: isinstance(r, list),
+                max_continuations=1,
+            )
+        )
+        assert result == [{"id": 1}, {"id": 2}]
+        assert not is_partial_result(result)
+        assert calls[1][-2] == {"role": "assistant", "content": '[{"id": 1}'}
+        assert calls[1][-1]["content"] == CONTINUATION_PROMPT
+        cache_set.assert_called_once()
+
+    def test_partial_result_returned_without_continuation_and_not_cached(self):
+        conn_cls, calls = self._partial_then([{"id": 2}])
+        cache_set = MagicMock()
+        result = asyncio.run(
+            run_text_with_fallback(
+                connections=[conn_cls],
+                settings=MagicMock(),
+                messages=[{"role": "user", "content": "x"}],
+                cache_set=cache_set,
+                validate=lambda r: isinstance(r, list),
+            )
+        )
+        assert result == [{"id": 1}]
+        assert is_partial_result(result)
+        assert len(calls) == 1
+        cache_set.assert_not_called()
+
+    def test_failed_continuation_keeps_salvaged_elements(self):
+        conn_cls, _ = self._partial_then({"error": "boom"})
+        result = asyncio.run(
+            run_text_with_fallback(
+                connections=[conn_cls],
+                settings=MagicMock(),
+                messages=[{"role": "user", "content": "x"}],
+                validate=lambda r: isinstance(r, list),
+                max_continuations=2,
+            )
+        )
+        assert result == [{"id": 1}]
+        assert is_partial_result(result)
+
+
+class TestModelTierEscalation:
+    def _tiered(self, fast_result, fast_model="fast-model"):
+        tiers = []
+
+        class MockTiered(MockConnection):
+            def __init__(self, s, model_tier="primary"):
+                result = fast_result if model_tier == "fast" else [{"id": "p"}]
+                super().__init__(s, result=result, model_tier=model_tier)
+                tiers.append(model_tier)
+
+            @property
+            def model_name(self):
+                return fast_model if self._model_tier == "fast" else "primary-model"
+
+        return MockTiered, tiers
+
+    def _run(self, conn_cls, settings=None):
+        return asyncio.run(
+            run_text_with_fallback(
+                connections=[conn_cls],
+                settings=settings or MagicMock(llm_escalate_on_invalid=True),
+                messages=[{"role": "user", "content": "x"}],
+                validate=lambda r: isinstance(r, list),
+                model_tier="fast",
+            )
+        )
+
+    def test_fast_tier_result_used_when_valid(self):
+        conn_cls, tiers = self._tiered([{"id": "f"}])
+        assert self._run(conn_cls) == [{"id": "f"}]
+        assert tiers == ["fast"]
+
+    def test_invalid_fast_output_escalates_to_primary(self):
+        conn_cls, tiers = self._tiered({"error": "bad", "error_type": "invalid_json"})
+        assert self._run(conn_cls) == [{"id": "p"}]
+        assert tiers == ["fast", "primary"]
+
+    def test_wrong_shape_escalates_to_primary(self):
+        conn_cls, tiers = self._tiered({"threats": "not a list"})
+        assert self._run(conn_cls) == [{"id": "p"}]
+        assert tiers == ["fast", "primary"]
+
+    def test_provider_error_does_not_escalate(self):
+        conn_cls, tiers = self._tiered(
+            {"error": "down", "error_type": "processing_error"}
+        )
+        result = self._run(conn_cls)
+        assert "All LLM providers failed" in result["error"]
+        assert tiers == ["fast"]
+
+    def test_same_model_on_both_tiers_does_not_escalate(self):
+        conn_cls, tiers = self._tiered(
+            {"error": "bad", "error_type": "invalid_json"}, fast_model="primary-model"
+        )
+        result = self._run(conn_cls)
+        assert "All LLM providers failed" in result["error"]
+        assert tiers == ["fast", "primary"]  # built to compare, never invoked
+
+    def test_escalation_disabled(self):
+        conn_cls, tiers = self._tiered({"error": "bad", "error_type": "invalid_json"})
+        result = self._run(conn_cls, MagicMock(llm_escalate_on_invalid=False))
+        assert "error" in result
+        assert tiers == ["fast"]
+
+    def test_vision_escalates(self):
+        conn_cls, tiers = self._tiered({"error": "bad", "error_type": "empty"})
+        result = asyncio.run(
+            run_vision_with_fallback(
+                connections=[conn_cls],
+                settings=MagicMock(llm_escalate_on_invalid=True),
+                prompt="p",
+                image_bytes=b"x",
+                validate=lambda r: isinstance(r, list),
+                model_tier="fast",
+            )
+        )
+        assert result == [{"id": "p"}]
+        assert tiers == ["fast", "primary"]
+
+
+class TestDeadlineBudget:
+    def _slow(self, delay, result):
+        calls = []
+
+        class MockSlow(MockConnection):
+            def __init__(self, s, **kwargs):
+                super().__init__(s, name=f"Slow{delay}", result=result)
+
+            async def invoke_text(self, messages, **kwargs):
+                calls.append(self.name)
+                await asyncio.sleep(delay)
+                return self._result
+
+        return MockSlow, calls
+
+    def _run(self, connections, budget):
+        async def run():
+            with deadline_scope(Deadline.after(budget)):
+                return await run_text_with_fallback(
+                    connections=connections,
+                    settings=MagicMock(llm_attempt_budget_fraction=0.5),
+                    messages=[{"role": "user", "content": "x"}],
+                    validate=lambda r: isinstance(r, list),
+                )
+
+        return asyncio.run(run())
+
+    def test_slow_provider_is_cancelled_and_next_one_answers(self):
+        slow, slow_calls = self._slow(5, [{"id": "slow"}])
+        fast, fast_calls = self._slow(0, [{"id": "fast"}])
+        start = time.perf_counter()
+        result = self._run([slow, fast], budget=0.4)
+        assert result == [{"id": "fast"}]
+        assert time.perf_counter() - start < 1
+        assert slow_calls and fast_calls
+
+    def test_timeout_reported_when_every_provider_is_slow(self):
+        slow, _ = self._slow(5, [{"id": "slow"}])
+        result = self._run([slow, slow], budget=0.2)
+        assert [e["error_type"] for e in result["engine_errors"]] == [
+            "timeout",
+            "timeout",
+        ]
+
+    def test_expired_deadline_skips_providers(self):
+        fast, calls = self._slow(0, [{"id": "fast"}])
+        result = self._run([fast], budget=0)
+        assert result["engine_errors"][0]["error_type"] == "deadline_exceeded"
+        assert calls == []
+
+    def test_no_deadline_means_no_timeout(self):
+        fast, _ = self._slow(0.05, [{"id": "ok"}])
+        result = asyncio.run(
+            run_text_with_fallback(
+                connections=[fast],
+                settings=MagicMock(),
+                messages=[{"role": "user", "content": "x"}],
+                validate=lambda r: isinstance(r, list),
+            )
+        )
+        assert result == [{"id": "ok"}]
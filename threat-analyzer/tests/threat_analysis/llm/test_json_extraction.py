@@ -0,0 +1,129 @@
+"""Unit tests for app.threat_analysis.llm.json_extraction."""
+
+import json
+import time
+
+import pytest
+
+from app.threat_analysis.exceptions import JSONParsingError
+from app.threat_analysis.llm.json_extraction import (
+    PartialJSONArray,
+    extract_json,
+    extract_json_text,
+    is_partial_result,
+    loads,
+    salvage_json_array,
+)
+
+
+class TestExtractJson:
+    def test_raw_object(self):
+        assert extract_json('  {"a": 1}  ') == {"a": 1}
+
+    def test_raw_array(self):
+        assert extract_json("[1, 2]") == [1, 2]
+
+    def test_json_fence(self):
+        assert extract_json('Here:\n```json\n{"x": 1}\n```\nDone.') == {"x": 1}
+
+    def test_generic_fence(self):
+        assert extract_json('```\n[{"y": 2}]\n```') == [{"y": 2}]
+
+    def test_prefers_fence_over_earlier_json_in_prose(self):
+        text = 'Schema is [1]. Result:\n```json\n{"ok": true}\n```'
+        assert extract_json(text) == {"ok": True}
+
+    def test_skips_bracketed_prose_before_json(self):
+        text = 'Sure! Here [DREAD, 1-10] are {the scores}: [{"a": 1}] Bye.'
+        assert extract_json(text) == [{"a": 1}]
+
+    def test_brackets_inside_strings_are_ignored(self):
+        text = 'Result: {"d": "x } y ] z", "e": "say \\"hi\\""} trailing'
+        assert extract_json(text) == {"d": "x } y ] z", "e": 'say "hi"'}
+
+    def test_array_is_not_reduced_to_first_element(self):
+        assert extract_json('[{"a": 1}, {"b": 2}]') == [{"a": 1}, {"b": 2}]
+
+    def test_stray_open_bracket_in_prose(self):
+        assert extract_json('[see below {"a": 1}') == {"a": 1}
+
+    def test_mismatched_closer_resumes_scan(self):
+        assert extract_json('{ ] then {"ok": true}') == {"ok": True}
+
+    def test_citation_before_object_is_skipped(self):
+        text = 'As noted in [1]: {"components": [], "connections": []}'
+        assert extract_json(text) == {"components": [], "connections": []}
+
+    def test_expected_root_type_wins(self):
+        text = 'Legend {"scale": 10}, result: [{"id": "t1"}]'
+        assert extract_json(text) == {"scale": 10}
+        assert extract_json(text, expect=list) == [{"id": "t1"}]
+        assert extract_json("see [1]: no object here", expect=dict) == [1]
+
+    def test_truncated_array_raises(self):
+        with pytest.raises(JSONParsingError):
+            extract_json('[{"a": 1}, {"b": 2')
+
+    def test_empty_raises(self):
+        with pytest.raises(JSONParsingError):
+            extract_json("")
+
+    def test_no_json_raises(self):
+        with pytest.raises(JSONParsingError):
+            extract_json("I cannot analyze this image.")
+
+    def test_brackets_in_strings_stay_linear(self):
+        """String-unaware scanners re-parse a growing prefix at every '][' in a string."""
+        items = [
+            {"id": f"c{i}", "description": "indexes 0] and [1 overlap"}
+            for i in range(5000)
+        ]
+        text = "Threats:\n" + json.dumps(items) + "\nEnd."
+        start = time.perf_counter()
+        result = extract_json(text)
+        assert time.perf_counter() - start < 1.0
+        assert len(result) == 5000
+
+
+class TestExtractJsonText:
+    def test_returns_substring(self):
+        assert extract_json_text('prefix {"z": 3} suffix') == '{"z": 3}'
+
+    def test_returns_none_when_missing(self):
+        assert extract_json_text("no json") is None
+
+
+def test_loads_raises_value_error():
+    with pytest.raises(ValueError):
+        loads("{not json}")
+
+
+class TestSalvageJsonArray:
+    def test_recovers_complete_elements(self):
+        result = salvage_json_array('```json\n[{"a": 1}, {"b": "x ] y"}, {"c": "tru')
+        assert result == [{"a": 1}, {"b": "x ] y"}]
+        assert is_partial_result(result)
+        assert result.raw_prefix == '[{"a": 1}, {"b": "x ] y"}'
+
+    def test_drops_possibly_cut_scalar(self):
+        assert salvage_json_array("[1, 2, 3") == [1, 2]
+
+    def test_skips_closed_array_in_prose(self):
+        assert salvage_json_array('Scores [1-10]: [{"a": 1}, {"b"') == [{"a": 1}]
+
+    def test_complete_array_is_not_salvaged(self):
+        assert salvage_json_array('[{"a": 1}]') is None
+
+    def test_truncated_object_is_not_salvaged(self):
+        assert salvage_json_array('{"components": [{"id": "c1"}, {"id"') is None
+
+    def test_nothing_complete_returns_none(self):
+        assert salvage_json_array('[{"a": 1') is None
+        assert salvage_json_array("") is None
+
+
+def test_partial_json_array_is_a_list():
+    partial = PartialJSONArray([1], raw_prefix="[1")
+    assert partial == [1]
+    assert partial.partial is True
+    assert not is_partial_result([1])
@@ -0,0 +1,98 @@
+"""Unit tests for app.threat_analysis.llm.metrics."""
+
+from app.threat_analysis.llm.metrics import (
+    LLMMetricsRegistry,
+    collect_llm_metrics,
+    current_stage,
+    llm_stage,
+    record_llm_call,
+    record_retrieval,
+)
+from app.threat_analysis.schemas.metrics import LLMCallMetrics
+
+
+def _call(stage="stride", **overrides):
+    values = {
+        "stage": stage,
+        "provider": "Gemini",
+        "model": "gemini-1.5-pro",
+        "mode": "structured",
+        "outcome": "ok",
+        "input_tokens": 100,
+        "output_tokens": 40,
+        "queue_wait_seconds": 0.5,
+        "time_to_first_token_seconds": 0.2,
+        "latency_seconds": 2.0,
+        **overrides,
+    }
+    return LLMCallMetrics(**values)
+
+
+class TestCollector:
+    def test_aggregates_per_stage(self):
+        with collect_llm_metrics() as collector:
+            record_llm_call(_call("diagram"))
+            record_llm_call(_call("stride"))
+            record_llm_call(_call("stride", input_tokens=None, mode="text"))
+        metrics = collector.build()
+        assert metrics.llm_calls == 3
+        assert metrics.input_tokens == 200
+        assert metrics.output_tokens == 120
+        assert metrics.stages["stride"].calls == 2
+        assert metrics.stages["stride"].latency_seconds == 4.0
+        assert metrics.latency_seconds == 6.0
+        assert len(metrics.calls) == 3
+
+    def test_calls_outside_analysis_are_not_collected(self):
+        record_llm_call(_call())
+        with collect_llm_metrics() as collector:
+            pass
+        assert collector.build().llm_calls == 0
+
+    def test_retrievals_aggregated_separately(self):
+        with collect_llm_metrics() as collector:
+            record_retrieval(0.25, 1.0)
+            record_retrieval(0.5, 2.0, "timeout")
+        retrieval = collector.build().retrieval
+        assert (retrieval.calls, retrieval.timeouts) == (2, 1)
+        assert retrieval.queue_wait_seconds == 0.75
+        assert retrieval.latency_seconds == 3.0
+        with collect_llm_metrics() as collector:
+            pass
+        assert collector.build().retrieval is None
+
+    def test_stage_label_is_scoped(self):
+        assert current_stage() == "unknown"
+        with llm_stage("dread"):
+            assert current_stage() == "dread"
+        assert current_stage() == "unknown"
+
+
+class TestRegistry:
+    def test_render_prometheus_text(self):
+        registry = LLMMetricsRegistry()
+        registry.observe(_call())
+        registry.observe(_call(time_to_first_token_seconds=None))
+        text = registry.render()
+        labels = (
+            'stage="stride",provider="Gemini",model="gemini-1.5-pro",'
+            'mode="structured",outcome="ok"'
+        )
+        assert "# TYPE llm_calls_total counter" in text
+        assert f"llm_calls_total{{{labels}}} 2" in text
+        assert f"llm_input_tokens_total{{{labels}}} 200" in text
+        assert f"llm_latency_seconds_count{{{labels}}} 2" in text
+        assert f"llm_time_to_first_token_seconds_count{{{labels}}} 1" in text
+
+    def test_render_retrieval_summaries(self):
+        registry = LLMMetricsRegistry()
+        registry.observe_retrieval(0.5, 1.5, "ok")
+        text = registry.render()
+        assert 'rag_retrieval_queue_wait_seconds_sum{outcome="ok"} 0.500000' in text
+        assert 'rag_retrieval_latency_seconds_count{outcome="ok"} 1' in text
+
+    def test_reset(self):
+        registry = LLMMetricsRegistry()
+        registry.observe(_call())
+        registry.reset()
+        assert "llm_calls_total{" not in registry.render()
@@ -0,0 +1,93 @@
+"""Unit tests for app.threat_analysis.llm.retry."""
+
+import httpx
+import openai
+import pytest
+from google.genai import errors as genai_errors
+
+from app.threat_analysis.exceptions import CassetteMissError
+from app.threat_analysis.llm.retry import (
+    backoff_delay,
+    classify_exception,
+    error_details,
+    retry_after_seconds,
+)
+
+
+def _openai_error(cls, status, headers=None):
+    response = httpx.Response(
+        status, headers=headers or {}, request=httpx.Request("POST", "http://x")
+    )
+    return cls("boom", response=response, body=None)
+
+
+class TestClassifyException:
+    @pytest.mark.parametrize(
+        ("exc", "expected"),
+        [
+            (_openai_error(openai.RateLimitError, 429), "rate_limit"),
+            (_openai_error(openai.InternalServerError, 503), "transient"),
+            (_openai_error(openai.AuthenticationError, 401), "auth"),
+            (_openai_error(openai.BadRequestError, 400), "processing_error"),
+            (
+                genai_errors.ServerError(
+                    503, {"error": {"code": 503, "status": "UNAVAILABLE"}}
+                ),
+                "transient",
+            ),
+            (
+                genai_errors.ClientError(
+                    429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}}
+                ),
+                "rate_limit",
+            ),
+            (httpx.ConnectError("connection refused"), "transient"),
+            (ConnectionResetError("reset by peer"), "transient"),
+            (ValueError("API key not valid"), "auth"),
+            (RuntimeError("unexpected"), "processing_error"),
+            (RuntimeError("Error code: 503 - {'error': 'busy'}"), "transient"),
+            (RuntimeError("model crashed (status code: 500)"), "transient"),
+            (RuntimeError("HTTP/1.1 502 Bad Gateway"), "transient"),
+            (RuntimeError("429 Too Many Requests"), "rate_limit"),
+            (RuntimeError("max_tokens must be <= 4096, got 500"), "processing_error"),
+            (RuntimeError("prompt has 429 tokens, limit 401"), "processing_error"),
+        ],
+    )
+    def test_classification(self, exc, expected):
+        assert classify_exception(exc) == expected
+
+    def test_wrapped_cause_is_inspected(self):
+        try:
+            try:
+                raise _openai_error(openai.InternalServerError, 502)
+            except openai.InternalServerError as inner:
+                raise RuntimeError("client wrapper") from inner
+        except RuntimeError as outer:
+            assert classify_exception(outer) == "transient"
+
+    def test_explicit_error_type_wins(self):
+        assert classify_exception(CassetteMissError("abc", "/tmp/c")) == "cassette_miss"
+
+
+class TestRetryAfter:
+    def test_header_seconds(self):
+        exc = _openai_error(openai.RateLimitError, 429, {"retry-after": "3"})
+        assert retry_after_seconds(exc) == 3.0
+        assert error_details(exc) == {"error_type": "rate_limit", "retry_after": 3.0}
+
+    def test_gemini_retry_delay_in_message(self):
+        exc = RuntimeError("429 RESOURCE_EXHAUSTED ... 'retryDelay': '12s'")
+        assert retry_after_seconds(exc) == 12.0
+
+    def test_absent(self):
+        assert retry_after_seconds(RuntimeError("nope")) is None
+
+
+class TestBackoffDelay:
+    def test_jitter_bounded_by_exponential_cap(self):
+        for attempt in range(6):
+            delay = backoff_delay(attempt, base=0.5, cap=4.0)
+            assert 0 <= delay <= min(4.0, 0.5 * 2**attempt)
+
+    def test_retry_after_is_lower_bound(self):
+        assert backoff_delay(0, base=0.1, cap=1.0, retry_after=5.0) == 5.0
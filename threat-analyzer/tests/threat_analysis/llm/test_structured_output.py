@@ -0,0 +1,52 @@
+"""Unit tests for app.threat_analysis.llm.structured_output."""
+
+import json
+
+from app.threat_analysis.llm.structured_output import (
+    DIAGRAM_OUTPUT,
+    DREAD_OUTPUT,
+    GUARDRAIL_OUTPUT,
+    STRIDE_OUTPUT,
+    StructuredOutput,
+)
+
+
+def test_schemas_are_self_contained():
+    for output in (GUARDRAIL_OUTPUT, DIAGRAM_OUTPUT, STRIDE_OUTPUT, DREAD_OUTPUT):
+        dumped = json.dumps(output.schema)
+        assert "$ref" not in dumped
+        assert "$defs" not in dumped
+        assert output.schema["type"] == "object"
+
+
+def test_diagram_schema_uses_aliases():
+    connection = DIAGRAM_OUTPUT.schema["properties"]["connections"]["items"]
+    assert connection["required"] == ["from", "to"]
+    assert connection["properties"]["encrypted"]["type"] == "boolean"
+
+
+def test_stride_schema_wraps_threat_list():
+    item = STRIDE_OUTPUT.schema["properties"]["threats"]["items"]
+    assert STRIDE_OUTPUT.root_key == "threats"
+    assert set(item["properties"]) == {
+        "component_id",
+        "threat_type",
+        "description",
+        "mitigation",
+    }
+    assert "Denial of Service" in item["properties"]["threat_type"]["enum"]
+
+
+def test_dread_schema_requires_scores():
+    item = DREAD_OUTPUT.schema["properties"]["threats"]["items"]
+    assert "dread_details" in item["required"]
+    details = item["properties"]["dread_details"]
+    assert details["properties"]["damage"]["maximum"] == 10
+
+
+def test_unwrap():
+    output = StructuredOutput(name="x", schema={}, root_key="threats")
+    assert output.unwrap({"threats": [1]}) == [1]
+    assert output.unwrap([1]) == [1]
+    assert output.unwrap({"error": "e"}) == {"error": "e"}
+    assert GUARDRAIL_OUTPUT.unwrap({"a": 1}) == {"a": 1}
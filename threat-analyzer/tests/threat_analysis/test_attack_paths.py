@@ -0,0 +1,115 @@
+"""Unit tests for app.threat_analysis.attack_paths."""
+
+import math
+
+import pytest
+
+from app.threat_analysis.attack_paths import (
+    find_attack_paths,
+    node_likelihoods,
+    path_risk_score,
+)
+from app.threat_analysis.stride_rules import get_rule_engine
+from tests.benchmarks.generators import synthetic_diagram
+
+
+def _graph(components, connections, boundaries=()):
+    return get_rule_engine().graph(
+        {
+            "components": [
+                {"id": cid, "type": ctype, "name": cid} for cid, ctype in components
+            ],
+            "connections": [
+                {"from": a, "to": b, "protocol": p} for a, b, p in connections
+            ],
+            "boundaries": list(boundaries),
+        }
+    )
+
+
+def _threat(component_id, score):
+    return {
+        "component_id": component_id,
+        "threat_type": "Tampering",
+        "dread_score": score,
+    }
+
+
+SHOP = _graph(
+    [
+        ("u", "User"),
+        ("gw", "Gateway"),
+        ("api", "API"),
+        ("admin", "Service"),
+        ("db", "Database"),
+        ("s3", "Storage"),
+    ],
+    [
+        ("u", "gw", "HTTPS"),
+        ("gw", "api", "HTTPS"),
+        ("gw", "admin", "HTTP"),
+        ("api", "db", "HTTPS"),
+        ("admin", "db", "HTTPS"),
+        ("api", "s3", "HTTPS"),
+        ("db", "api", "HTTPS"),
+    ],
+    [{"name": "VPC", "components": ["gw", "api", "admin", "db", "s3"]}],
+)
+SHOP_THREATS = [
+    _threat("gw", 8.0),
+    _threat("api", 6.0),
+    _threat("api", 4.0),
+    _threat("admin", 9.0),
+    _threat("db", 7.0),
+    _threat("s3", 5.0),
+]
+
+
+class TestAttackPaths:
+    def test_node_likelihood_is_highest_dread_with_floor(self):
+        likelihood = node_likelihoods(SHOP, SHOP_THREATS)
+        assert likelihood["api"] == 0.6
+        assert likelihood["u"] == 0.1  # no threats
+
+    def test_paths_ranked_by_propagated_likelihood(self):
+        paths = find_attack_paths(SHOP, SHOP_THREATS, k=5)
+        assert [p["component_ids"] for p in paths] == [
+            ["u", "gw", "admin", "db"],
+            ["u", "gw", "api", "db"],
+            ["u", "gw", "api", "s3"],
+        ]
+        top = paths[0]
+        # u->gw crosses into the VPC (factor 0.8); gw->admin is plaintext (0.8)
+        expected = (0.8 * 0.8) * (0.8 * 0.9) * (0.6 * 0.7)
+        assert top["likelihood"] == pytest.approx(expected, abs=1e-4)
+        assert top["risk_score"] == round(10 * expected, 2)
+        assert top["boundary_crossings"] == 1
+        assert (top["entry_point"], top["target"]) == ("u", "db")
+
+    def test_k_and_max_hops_bound_the_search(self):
+        assert len(find_attack_paths(SHOP, SHOP_THREATS, k=1)) == 1
+        assert find_attack_paths(SHOP, SHOP_THREATS, max_hops=2) == []
+
+    def test_no_entry_points_or_assets(self):
+        graph = _graph([("api", "API"), ("db", "Database")], [("api", "db", "TCP")])
+        assert find_attack_paths(graph, []) == []
+        assert path_risk_score([]) == 0.0
+
+    def test_path_risk_score_combines_paths(self):
+        paths = [{"likelihood": 0.5}, {"likelihood": 0.5}]
+        assert path_risk_score(paths) == 7.5
+
+    def test_large_diagram_paths_are_simple_and_sorted(self):
+        diagram = synthetic_diagram(500)
+        graph = get_rule_engine().graph(diagram)
+        threats = [_threat(c["id"], 5.0) for c in diagram["components"]]
+        paths = find_attack_paths(graph, threats, k=10)
+        assert len(paths) == 10
+        scores = [p["likelihood"] for p in paths]
+        assert scores == sorted(scores, reverse=True)
+        for path in paths:
+            ids = path["component_ids"]
+            assert len(set(ids)) == len(ids) and len(ids) <= 9
+            assert graph.types[ids[0]] in ("User", "ExternalService")
+            assert graph.types[ids[-1]] in ("Database", "Storage")
+        assert not math.isnan(path_risk_score(paths))
@@ -0,0 +1,95 @@
+"""Unit tests for app.threat_analysis.consolidation."""
+
+from app.threat_analysis.consolidation import (
+    _permutations,
+    consolidate_threats,
+    jaccard,
+    minhash_signature,
+    shingles,
+)
+
+
+def _threat(description, component_id="c1", threat_type="Tampering"):
+    return {
+        "component_id": component_id,
+        "threat_type": threat_type,
+        "description": description,
+        "mitigation": "Use parameterized queries",
+    }
+
+
+class TestShingles:
+    def test_lowercases_and_drops_stopwords(self):
+        assert shingles("SQL injection in the API") == {"sql", "injection", "api"}
+
+    def test_word_ngrams(self):
+        assert shingles("SQL injection API", size=2) == {
+            "sql injection",
+            "injection api",
+        }
+        assert shingles("injection", size=2) == {"injection"}
+        assert shingles("of the", size=2) == set()
+
+
+class TestMinHash:
+    def test_signature_agreement_estimates_jaccard(self):
+        permutations = _permutations(256)
+        left = {f"w{i}" for i in range(40)}
+        right = {f"w{i}" for i in range(20, 60)}
+        a = minhash_signature(left, permutations)
+        b = minhash_signature(right, permutations)
+        estimate = sum(x == y for x, y in zip(a, b, strict=True)) / len(permutations)
+        assert abs(estimate - jaccard(left, right)) < 0.12
+
+    def test_signature_is_deterministic(self):
+        assert minhash_signature({"a", "b"}, _permutations(8)) == minhash_signature(
+            {"b", "a"}, _permutations(8)
+        )
+
+
+class TestConsolidateThreats:
+    def test_merges_paraphrased_duplicates(self):
+        threats = [
+            _threat("SQL injection in API"),
+            _threat("API is vulnerable to SQL injection"),
+            _threat("Tampering with audit logs stored on disk"),
+        ]
+        assert consolidate_threats(threats) == [threats[0], threats[2]]
+
+    def test_merged_threat_keeps_distinct_mitigations(self):
+        threats = [
+            _threat("SQL injection in API"),
+            {
+                **_threat("API is vulnerable to SQL injection"),
+                "mitigation": "Use a WAF",
+            },
+            {
+                **_threat("SQL injection on the API"),
+                "mitigation": "use  parameterized queries",
+            },
+        ]
+        (merged,) = consolidate_threats(threats)
+        assert merged["description"] == "SQL injection in API"
+        assert merged["mitigation"] == "Use parameterized queries\nUse a WAF"
+        assert threats[0]["mitigation"] == "Use parameterized queries"
+
+    def test_keeps_same_text_for_other_component_or_type(self):
+        threats = [
+            _threat("SQL injection in API"),
+            _threat("SQL injection in API", component_id="c2"),
+            _threat("SQL injection in API", threat_type="Information Disclosure"),
+        ]
+        assert consolidate_threats(threats) == threats
+
+    def test_threshold_controls_merging(self):
+        threats = [
+            _threat("Attacker modifies orders in transit"),
+            _threat("Attacker modifies payments in transit"),
+        ]
+        # Jaccard 0.6: different assets, kept apart by the default threshold
+        assert len(consolidate_threats(threats)) == 2
+        assert len(consolidate_threats(threats, threshold=0.5)) == 1
+
+    def test_threats_without_description_are_kept(self):
+        threats = [_threat(""), _threat(None), _threat("of the")]
+        assert consolidate_threats(threats) == threats
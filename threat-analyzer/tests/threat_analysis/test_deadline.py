@@ -0,0 +1,25 @@
+"""Unit tests for app.threat_analysis.deadline."""
+
+import time
+
+from app.threat_analysis.deadline import Deadline, current_deadline, deadline_scope
+
+
+class TestDeadline:
+    def test_remaining_and_expired(self):
+        assert 9 < Deadline.after(10).remaining() <= 10
+        assert Deadline.after(-1).remaining() == 0.0
+        assert Deadline(time.monotonic() - 1).expired is True
+
+    def test_slice_is_fraction_of_remaining(self):
+        deadline = Deadline.after(100)
+        part = deadline.slice(0.25)
+        assert 24 < part.remaining() <= 25
+        assert deadline.slice(2).expires_at <= deadline.expires_at + 1e-3
+
+    def test_scope_sets_and_restores_current_deadline(self):
+        assert current_deadline() is None
+        deadline = Deadline.after(5)
+        with deadline_scope(deadline):
+            assert current_deadline() is deadline
+        assert current_deadline() is None
@@ -0,0 +1,102 @@
+"""Unit tests for app.threat_analysis.dread_prescorer."""
+
+import random
+
+import pytest
+
+from app.threat_analysis.dread_prescorer import (
+    DIMENSIONS,
+    DreadPrescorer,
+    fit,
+    get_prescorer,
+)
+
+DIAGRAM = {
+    "components": [
+        {"id": "u", "type": "User", "name": "Customer"},
+        {"id": "api", "type": "API", "name": "Orders API"},
+        {"id": "db", "type": "Database", "name": "Orders DB"},
+        {"id": "x", "type": "Mainframe", "name": "Legacy"},
+    ],
+    "connections": [
+        {"from": "u", "to": "api", "protocol": "HTTP"},
+        {"from": "api", "to": "db", "protocol": "SQL"},
+    ],
+}
+
+
+def _threat(component_id, threat_type):
+    return {
+        "component_id": component_id,
+        "threat_type": threat_type,
+        "description": "d",
+        "mitigation": "m",
+    }
+
+
+class TestDreadPrescorer:
+    def test_scores_are_integers_in_range_and_context_sensitive(self):
+        threats = [
+            _threat("api", "Information Disclosure"),
+            _threat("db", "Information Disclosure"),
+        ]
+        scores, confidence = get_prescorer().predict(threats, DIAGRAM)
+        assert scores.shape == (2, len(DIMENSIONS))
+        assert scores.min() >= 1 and scores.max() <= 10
+        # Plaintext boundary crossing raises exploitability of the API threat
+        assert scores[0][2] > scores[1][2]
+        assert confidence[0] > confidence[1]  # db: SQL encryption unknown
+
+    def test_split_scores_confident_threats_and_defers_the_rest(self):
+        threats = [
+            _threat("api", "Denial of Service"),
+            _threat("api", "Elevation of Privilege"),
+            _threat("x", "Tampering"),
+            _threat("api", "Phishing"),
+        ]
+        scored, uncertain = get_prescorer().split(threats, DIAGRAM, 0.7)
+        assert [t["threat_type"] for t in scored] == ["Denial of Service"]
+        assert uncertain == threats[1:]
+        (local,) = scored
+        assert set(local["dread_details"]) == set(DIMENSIONS)
+        assert local["dread_score"] == round(
+            sum(local["dread_details"].values()) / 5, 2
+        )
+        assert "dread_score" not in threats[0]
+
+    def test_min_confidence_zero_scores_known_categories(self):
+        threats = [_threat("x", "Tampering"), _threat("x", "Unknown")]
+        scored, uncertain = get_prescorer().split(threats, DIAGRAM, 0.0)
+        assert len(scored) == 2 and uncertain == []
+
+    def test_empty(self):
+        assert get_prescorer().split([], DIAGRAM, 0.7) == ([], [])
+
+
+class TestFit:
+    def test_recovers_linear_scores_and_confidence(self):
+        rng = random.Random(0)
+        categories = ["Spoofing", "Tampering", "Denial of Service"]
+        samples = []
+        for _ in range(30):
+            threats = []
+            for component in ("api", "db"):
+                category = rng.choice(categories)
+                value = 8 if component == "db" else 4
+                threat = _threat(component, category)
+                threat["dread_details"] = dict.fromkeys(DIMENSIONS, value)
+                threats.append(threat)
+            samples.append((DIAGRAM, threats))
+        model = fit(samples, ridge=0.01)
+        assert model["samples"] == 60
+        scorer = DreadPrescorer(model)
+        scores, _ = scorer.predict([_threat("db", "Spoofing")], DIAGRAM)
+        assert scores.tolist() == [[8] * 5]
+        confidence = model["confidence"]
+        assert confidence["threat_type=Spoofing"] > 0.9
+        assert confidence["threat_type=Repudiation"] == 0.0  # no samples
+        assert confidence["unknown_component"] == 0.7
+
+    def test_requires_scored_threats(self):
+        with pytest.raises(ValueError):
+            fit([(DIAGRAM, [_threat("api", "Spoofing")])])
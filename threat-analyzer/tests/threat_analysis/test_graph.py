@@ -0,0 +1,65 @@
+"""Unit tests for app.threat_analysis.graph."""
+
+from app.threat_analysis.graph import DiagramGraph
+from app.threat_analysis.stride_rules import get_rule_engine
+
+COMPONENTS = [
+    {"id": "u", "type": "User", "name": "Customer"},
+    {"id": "gw", "type": "Gateway", "name": "Edge"},
+    {"id": "api", "type": "API", "name": "Orders API"},
+    {"id": "db", "type": "Database", "name": "Orders DB"},
+]
+CONNECTIONS = [
+    {"from": "u", "to": "gw", "protocol": "HTTPS"},
+    {"from": "gw", "to": "api", "protocol": "HTTP"},
+    {"from": "api", "to": "db", "protocol": "gRPC"},
+    {"from": "api", "to": "missing", "protocol": "HTTPS"},
+]
+
+
+def _graph(boundaries):
+    diagram = {
+        "components": COMPONENTS,
+        "connections": CONNECTIONS,
+        "boundaries": boundaries,
+    }
+    return DiagramGraph.from_diagram(diagram, get_rule_engine())
+
+
+class TestDiagramGraph:
+    def test_crossings_from_boundary_membership(self):
+        graph = _graph(
+            [
+                {"name": "DMZ", "components": ["gw"]},
+                {"name": "VPC", "components": ["api", "db", "unknown"]},
+            ]
+        )
+        assert graph.boundaries == {"DMZ": ["gw"], "VPC": ["api", "db"]}
+        assert [(e.source, e.target) for e in graph.crossing_edges] == [
+            ("u", "gw"),
+            ("gw", "api"),
+        ]
+        assert graph.zone_label("u") == "outside"
+        assert graph.entry_points == {"gw"}
+
+    def test_names_only_fall_back_to_external_types(self):
+        graph = _graph(["DMZ", "VPC"])
+        assert graph.boundaries == {"DMZ": [], "VPC": []}
+        assert [(e.source, e.target) for e in graph.crossing_edges] == [("u", "gw")]
+        assert graph.zone_label("u") == "external"
+        assert graph.external == {"u"}
+
+    def test_adjacency_and_fan_in_out(self):
+        graph = _graph([])
+        assert len(graph.edges) == 3  # dangling connection dropped
+        assert graph.fan_out("api") == 1 and graph.fan_in("api") == 1
+        assert [e.target for e in graph.incident("gw")] == ["gw", "api"]
+        assert graph.fan_in("u") == 0
+
+    def test_high_risk_edges_riskiest_first(self):
+        graph = _graph([{"name": "VPC", "components": ["gw", "api", "db"]}])
+        edges = graph.high_risk_edges
+        # api -> db is internal with unknown encryption: not high risk
+        assert [(e.source, e.target) for e in edges] == [("u", "gw"), ("gw", "api")]
+        assert edges[0].encrypted is True and edges[1].encrypted is False
+        assert [e.risk for e in graph.edges] == [2, 2, 1]
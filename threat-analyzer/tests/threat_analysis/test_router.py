@@ -31,7 +31,7 @@ def override_service_with_mock():
         return mock_service
 
     app.dependency_overrides[get_threat_model_service] = _get_service
-    yield
+    yield mock_service
     app.dependency_overrides.pop(get_threat_model_service, None)
 
 
@@ -61,6 +61,18 @@ class TestAnalyzeEndpoint:
         assert "threats" in data
         assert "risk_level" in data
 
+    def test_analyze_uses_request_timeout_header(
+        self, client, sample_png, override_service_with_mock
+    ):
+        r = client.post(
+            "/api/v1/threat-model/analyze",
+            files={"file": ("diagram.png", BytesIO(sample_png), "image/png")},
+            headers={"X-Request-Timeout": "42"},
+        )
+        assert r.status_code == 200
+        call = override_service_with_mock.run_full_analysis.call_args
+        assert 41 < call.kwargs["deadline"].remaining() <= 42
+
     def test_analyze_invalid_content_type(self, client, sample_png):
         r = client.post(
             "/api/v1/threat-model/analyze",
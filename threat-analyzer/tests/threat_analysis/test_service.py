@@ -6,6 +6,8 @@ from unittest.mock import AsyncMock, patch
 import pytest
 
 from app.config import get_settings
+from app.threat_analysis.deadline import Deadline
+from app.threat_analysis.graph import DiagramGraph
 from app.threat_analysis.service import ThreatModelService
 
 
@@ -69,6 +71,116 @@ class TestThreatModelService:
         assert result.risk_level is not None
         assert result.threat_count == 1
         assert result.component_count == 1
+        assert result.metrics is not None
+        assert result.metrics.llm_calls == 0
+
+    def test_near_duplicate_threats_consolidated_before_dread(self, sample_png_bytes):
+        service = ThreatModelService(get_settings())
+        threats = [
+            {"component_id": "c1", "threat_type": "Tampering", "description": d}
+            for d in ("SQL injection in API", "API is vulnerable to SQL injection")
+        ]
+        mock_dread = AsyncMock(side_effect=lambda t: t)
+        with (
+            patch(
+                "app.threat_analysis.service.validate_architecture_diagram",
+                new_callable=AsyncMock,
+            ),
+            patch("app.threat_analysis.service.DiagramAgent") as diagram_cls,
+            patch("app.threat_analysis.service.StrideAgent") as stride_cls,
+            patch("app.threat_analysis.service.DreadAgent") as dread_cls,
+        ):
+            diagram_cls.return_value.analyze = AsyncMock(return_value={})
+            stride_cls.return_value.analyze = AsyncMock(return_value=threats)
+            dread_cls.return_value.analyze = mock_dread
+            result = asyncio.run(service.run_full_analysis(sample_png_bytes))
+        mock_dread.assert_awaited_once_with(threats[:1])
+        assert result.threat_count == 1
+
+    def test_confident_threats_prescored_locally(self, sample_png_bytes):
+        service = ThreatModelService(
+            get_settings().model_copy(update={"dread_prescore": True})
+        )
+        diagram = {
+            "components": [{"id": "api", "type": "API", "name": "Orders"}],
+            "connections": [],
+        }
+        threats = [
+            {"component_id": "api", "threat_type": t, "description": t}
+            for t in ("Denial of Service", "Elevation of Privilege")
+        ]
+        mock_dread = AsyncMock(
+            side_effect=lambda t: [{**x, "dread_score": 9.0} for x in t]
+        )
+        with (
+            patch(
+                "app.threat_analysis.service.validate_architecture_diagram",
+                new_callable=AsyncMock,
+            ),
+            patch("app.threat_analysis.service.DiagramAgent") as diagram_cls,
+            patch("app.threat_analysis.service.StrideAgent") as stride_cls,
+            patch("app.threat_analysis.service.DreadAgent") as dread_cls,
+        ):
+            diagram_cls.return_value.analyze = AsyncMock(return_value=diagram)
+            stride_cls.return_value.analyze = AsyncMock(return_value=threats)
+            dread_cls.return_value.analyze = mock_dread
+            with patch.object(
+                DiagramGraph, "from_diagram", wraps=DiagramGraph.from_diagram
+            ) as build_graph:
+                result = asyncio.run(service.run_full_analysis(sample_png_bytes))
+        # one graph shared by STRIDE, the pre-scorer and the attack-path search
+        build_graph.assert_called_once()
+        graph = stride_cls.return_value.analyze.await_args.args[1]
+        assert isinstance(graph, DiagramGraph)
+        assert graph.types == {"api": "API"}
+        mock_dread.assert_awaited_once_with(threats[1:])
+        local = next(t for t in result.threats if t.threat_type == "Denial of Service")
+        assert local.dread_details is not None
+        assert result.threat_count == 2
+
+    def test_attack_paths_in_response(self, sample_png_bytes):
+        service = ThreatModelService(get_settings())
+        diagram = {
+            "components": [
+                {"id": "u", "type": "User", "name": "Customer"},
+                {"id": "api", "type": "API", "name": "Orders"},
+                {"id": "db", "type": "Database", "name": "Orders DB"},
+            ],
+            "connections": [
+                {"from": "u", "to": "api", "protocol": "HTTP"},
+                {"from": "api", "to": "db", "protocol": "HTTPS"},
+            ],
+        }
+        threats = [
+            {"component_id": cid, "threat_type": "Tampering", "description": cid}
+            for cid in ("api", "db")
+        ]
+        with (
+            patch(
+                "app.threat_analysis.service.validate_architecture_diagram",
+                new_callable=AsyncMock,
+            ),
+            patch("app.threat_analysis.service.DiagramAgent") as diagram_cls,
+            patch("app.threat_analysis.service.StrideAgent") as stride_cls,
+            patch("app.threat_analysis.service.DreadAgent") as dread_cls,
+        ):
+            diagram_cls.return_value.analyze = AsyncMock(return_value=diagram)
+            stride_cls.return_value.analyze = AsyncMock(return_value=threats)
+            dread_cls.return_value.analyze = AsyncMock(
+                side_effect=lambda t: [{**x, "dread_score": 8.0} for x in t]
+            )
+            result = asyncio.run(service.run_full_analysis(sample_png_bytes))
+        (path,) = result.attack_paths
+        assert path.component_ids == ["u", "api", "db"]
+        assert path.boundary_crossings == 1
+        assert result.path_risk_score == path.risk_score > 0
+
+    def test_stage_deadlines_split_remaining_budget(self):
+        deadline = Deadline.after(100)
+        guardrail = ThreatModelService._stage_deadline(deadline, "guardrail")
+        dread = ThreatModelService._stage_deadline(deadline, "dread")
+        assert 9 < guardrail.remaining() <= 10
+        assert 99 < dread.remaining() <= 100
 
     def test_calculate_risk_score_empty(self):
         settings = get_settings()
@@ -119,7 +231,11 @@ class TestThreatModelService:
             "dread_score": 7.4,
             "dread_details": None,
         }
-        threats = [duplicate_threat.copy(), duplicate_threat.copy(), duplicate_threat.copy()]
+        threats = [
+            duplicate_threat.copy(),
+            duplicate_threat.copy(),
+            duplicate_threat.copy(),
+        ]
         result = service._parse_threats(threats)
         assert len(result) == 1
         assert result[0].threat_type == "Information Disclosure"
@@ -128,7 +244,10 @@ class TestThreatModelService:
     def test_threat_dedup_key_normalizes_type_and_description(self):
         """_threat_dedup_key normalizes threat_type and description for consistent dedup."""
         key1 = ThreatModelService._threat_dedup_key(
-            {"threat_type": "  information disclosure  ", "description": "  Foo   Bar  "}
+            {
+                "threat_type": "  information disclosure  ",
+                "description": "  Foo   Bar  ",
+            }
         )
         key2 = ThreatModelService._threat_dedup_key(
             {"threat_type": "Information Disclosure", "description": "foo bar"}
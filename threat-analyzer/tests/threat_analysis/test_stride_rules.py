@@ -0,0 +1,122 @@
+"""Unit tests for app.threat_analysis.stride_rules."""
+
+from app.threat_analysis.stride_rules import StrideRuleEngine, get_rule_engine
+
+
+def _diagram(components, connections=()):
+    return {
+        "components": [
+            {"id": cid, "type": ctype, "name": name} for cid, ctype, name in components
+        ],
+        "connections": list(connections),
+    }
+
+
+def _kinds(threats):
+    return {(t["component_id"], t["threat_type"]) for t in threats}
+
+
+class TestStrideRuleEngine:
+    def test_component_type_aliases(self):
+        engine = get_rule_engine()
+        assert engine.component_type("Load Balancer") == "LoadBalancer"
+        assert engine.component_type("RDS") == "Database"
+        assert engine.component_type("api") == "API"
+        assert engine.component_type("Mainframe") is None
+
+    def test_encryption_from_flag_or_protocol(self):
+        engine = get_rule_engine()
+        assert engine.encrypted({"protocol": "HTTPS"}) is True
+        assert engine.encrypted({"protocol": "http"}) is False
+        assert engine.encrypted({"protocol": "HTTP", "encrypted": True}) is True
+        assert engine.encrypted({"protocol": "gRPC"}) is None
+        # Transport protocols say nothing about TLS on top (e.g. TCP/443)
+        assert engine.encrypted({"protocol": "TCP"}) is None
+        assert engine.encrypted({"protocol": "udp"}) is None
+
+    def test_component_rules_by_type(self):
+        threats = get_rule_engine().baseline(_diagram([("db", "Database", "Orders")]))
+        assert _kinds(threats) == {
+            ("db", "Information Disclosure"),
+            ("db", "Tampering"),
+        }
+        assert all("Orders" in t["description"] for t in threats)
+
+    def test_unencrypted_boundary_crossing(self):
+        diagram = _diagram(
+            [("u", "User", "Customer"), ("x", "Mainframe", "Core")],
+            [{"from": "u", "to": "x", "protocol": "HTTP"}],
+        )
+        threats = [
+            t for t in get_rule_engine().baseline(diagram) if t["component_id"] == "x"
+        ]
+        assert _kinds(threats) == {("x", "Information Disclosure"), ("x", "Tampering")}
+        assert "Customer" in threats[0]["description"]
+
+    def test_encrypted_or_internal_connection_has_no_transit_threats(self):
+        diagram = _diagram(
+            [
+                ("u", "User", "Customer"),
+                ("a", "Mainframe", "A"),
+                ("b", "Mainframe", "B"),
+            ],
+            [
+                {"from": "u", "to": "a", "protocol": "HTTPS"},
+                {"from": "a", "to": "b", "protocol": "HTTP"},
+            ],
+        )
+        baseline = get_rule_engine().baseline(diagram)
+        assert {t["component_id"] for t in baseline} == {"u"}
+
+    def test_database_reachable_from_user(self):
+        direct = _diagram(
+            [("c", "Client", "SPA"), ("db", "Database", "Users")],
+            [{"from": "c", "to": "db", "protocol": "HTTPS"}],
+        )
+        via_api = _diagram(
+            [
+                ("c", "Client", "SPA"),
+                ("api", "API", "Api"),
+                ("db", "Database", "Users"),
+            ],
+            [
+                {"from": "c", "to": "api", "protocol": "HTTPS"},
+                {"from": "api", "to": "db", "protocol": "HTTPS"},
+            ],
+        )
+        engine = get_rule_engine()
+        assert ("db", "Elevation of Privilege") in _kinds(engine.baseline(direct))
+        assert ("db", "Elevation of Privilege") not in _kinds(engine.baseline(via_api))
+
+    def test_protocol_indexed_rule(self):
+        diagram = _diagram(
+            [("a", "Server", "Batch"), ("f", "Storage", "Files")],
+            [{"from": "a", "to": "f", "protocol": "FTP"}],
+        )
+        assert ("f", "Spoofing") in _kinds(get_rule_engine().baseline(diagram))
+
+    def test_custom_rules_and_dangling_connections(self):
+        engine = StrideRuleEngine(
+            {
+                "type_aliases": {"kafka": "Queue"},
+                "component_rules": {
+                    "Queue": [
+                        {
+                            "id": "q",
+                            "threat_type": "Repudiation",
+                            "description": "{name} ({id})",
+                            "mitigation": "m",
+                        }
+                    ]
+                },
+            }
+        )
+        diagram = _diagram([("q1", "kafka", "Events")], [{"from": "q1", "to": "zz"}])
+        assert engine.baseline(diagram) == [
+            {
+                "component_id": "q1",
+                "threat_type": "Repudiation",
+                "description": "Events (q1)",
+                "mitigation": "m",
+            }
+        ]
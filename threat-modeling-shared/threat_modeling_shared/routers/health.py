@@ -13,6 +13,7 @@ def create_health_router(
     system_name: str,
     check_database: bool = False,
     db_check: Callable[[], bool] | None = None,
+    readiness_details: Callable[[], dict[str, Any]] | None = None,
 ) -> APIRouter:
     """Create health router with standard endpoints.
 
@@ -20,6 +21,8 @@ def create_health_router(
         system_name: Name of the service (e.g. "Threat Modeling AI")
         check_database: Whether to check database connectivity
         db_check: Callable that returns True if DB is OK. Required if check_database=True.
+        readiness_details: Optional callable whose dict is added to /health/ready
+            (informational, e.g. background warm-up state; does not affect status)
 
     Returns:
         APIRouter with /, /health, /health/ready, /health/live
@@ -58,6 +61,9 @@ def create_health_router(
         "/health/", health_check_handler, methods=["GET"], name="health-slash"
     )
 
+    def details() -> dict[str, Any]:
+        return readiness_details() if readiness_details is not None else {}
+
     @router.get("/health/ready", response_model=None)
     async def readiness_check(request: Request):
         if check_database and db_check is not None:
@@ -68,6 +74,7 @@ def create_health_router(
                     "system_name": system_name,
                     "timestamp": datetime.now(timezone.utc).isoformat(),
                     "endpoint": "/health/ready",
+                    **details(),
                 }
             except Exception as e:
                 return JSONResponse(
@@ -78,6 +85,7 @@ def create_health_router(
                         "error": str(e),
                         "timestamp": datetime.now(timezone.utc).isoformat(),
                         "endpoint": "/health/ready",
+                        **details(),
                     },
                 )
         return {
@@ -85,6 +93,7 @@ def create_health_router(
             "system_name": system_name,
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "endpoint": "/health/ready",
+            **details(),
         }
 
     @router.get("/health/live")
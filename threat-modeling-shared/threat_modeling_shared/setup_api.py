@@ -27,6 +27,7 @@ def create_app(
     health_system_name: str | None = None,
     check_database: bool | None = None,
     db_check: Callable[[], bool] | None = None,
+    readiness_details: Callable[[], dict[str, Any]] | None = None,
     exception_handlers: list[tuple[type[Exception], Callable]] | None = None,
     custom_error_handler: tuple[type[Exception], str] | None = None,
     exception_pass_through: (
@@ -47,6 +48,7 @@ def create_app(
         health_system_name: Name for health endpoints (default: title)
         check_database: Whether health checks database
         db_check: Callable for DB check (required if check_database=True)
+        readiness_details: Optional callable whose dict is added to /health/ready
         exception_handlers: Optional list of (exception_class, handler) for app.exception_handler
         custom_error_handler: Optional (exception_class, log_title) for a built-in handler that logs
             "log_title exc.message" and returns JSONResponse(500, {"error": exc.message, "details": exc.details}).
@@ -61,6 +63,7 @@ def create_app(
         check_database = bool(getattr(settings, "database_url", "") or "")
     if check_database and db_check is None:
         from threat_modeling_shared.database import db_check as _db_check_sync
+
         db_check = lambda: _db_check_sync(settings)
 
     @asynccontextmanager
@@ -126,7 +129,10 @@ def create_app(
     health_name = health_system_name or title
     app.include_router(
         create_health_router(
-            health_name, check_database=check_database, db_check=db_check
+            health_name,
+            check_database=check_database,
+            db_check=db_check,
+            readiness_details=readiness_details,
         )
     )
 
@@ -18,10 +18,20 @@ class AnalysisServiceError(Exception):
 class AnalysisService:
     """Encapsulates connection and calls to the threat-analyzer service endpoints."""
 
+    # The analyzer budgets its pipeline stages and LLM attempts within this header,
+    # sent slightly below the HTTP timeout so it answers before the client gives up.
+    REQUEST_TIMEOUT_HEADER = "X-Request-Timeout"
+    DEADLINE_MARGIN_SECONDS = 10.0
+
     def __init__(self, base_url: str, timeout: float = 300.0) -> None:
         self._base_url = base_url.rstrip("/")
         self._timeout = timeout
 
+    @property
+    def request_headers(self) -> dict[str, str]:
+        budget = max(self._timeout - self.DEADLINE_MARGIN_SECONDS, self._timeout / 2)
+        return {self.REQUEST_TIMEOUT_HEADER: f"{budget:.0f}"}
+
     @property
     def analyze_endpoint(self) -> str:
         return f"{self._base_url}/api/v1/threat-model/analyze"
@@ -56,6 +66,7 @@ class AnalysisService:
                 response = client.post(
                     self.analyze_endpoint,
                     files={"file": (image_filename, image_bytes, content_type)},
+                    headers=self.request_headers,
                 )
                 response.raise_for_status()
                 return response.json()
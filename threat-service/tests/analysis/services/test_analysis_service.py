@@ -0,0 +1,28 @@
+"""Unit tests for app.analysis.services.analysis_service."""
+
+from unittest.mock import MagicMock, patch
+
+from app.analysis.services.analysis_service import AnalysisService
+
+
+class TestAnalysisService:
+    def test_request_timeout_header_below_http_timeout(self):
+        service = AnalysisService("http://analyzer:8000/", timeout=300.0)
+        assert service.request_headers == {"X-Request-Timeout": "290"}
+
+    def test_short_timeout_keeps_half_the_budget(self):
+        service = AnalysisService("http://analyzer:8000", timeout=12.0)
+        assert service.request_headers == {"X-Request-Timeout": "6"}
+
+    def test_analyze_sends_deadline_header(self, tmp_path):
+        image = tmp_path / "diagram.png"
+        image.write_bytes(b"png")
+        client = MagicMock()
+        client.__enter__.return_value = client
+        client.post.return_value.json.return_value = {"threats": []}
+        with patch(
+            "app.analysis.services.analysis_service.httpx.Client", return_value=client
+        ):
+            result = AnalysisService("http://analyzer:8000").analyze(image, "d.png")
+        assert result == {"threats": []}
+        assert client.post.call_args.kwargs["headers"] == {"X-Request-Timeout": "290"}